@@ -0,0 +1,13 @@
+"""
+Замеры скорости и памяти csv_reader.
+
+- generate - детерминированный генератор csv файлов
+- scenarios - запросы для каждого режима командной строки
+- measure - замер одного запроса в отдельном процессе
+- run - запуск сценариев, запись JSON и сравнение с прошлым запуском
+- startup - время импорта и запуска короткого запроса
+
+Запуск из корня проекта:
+    python3 -m benchmarks.run --rows 1e6 --output results.json
+    python3 -m benchmarks.run --rows 1e6 --baseline results.json
+"""
@@ -0,0 +1,82 @@
+"""
+Детерминированный генератор csv файлов для замеров.
+
+Запуск из корня проекта:
+    python3 -m benchmarks.generate --rows 1e7 --output big.csv
+
+Одинаковые --rows, --columns, --cardinality и --seed дают побайтно
+одинаковый файл, поэтому замеры разных запусков сравнимы.
+"""
+
+import argparse
+import random
+
+BATCH_ROWS = 10000
+BASE_COLUMNS = ["id", "brand", "price", "rating"]
+
+
+def count(text) -> int:
+    """Число строк из аргумента вида 1e6 или 1000000"""
+    value = float(text)
+    if value < 0 or value != int(value):
+        raise argparse.ArgumentTypeError(f"Неверное число строк: {text}")
+    return int(value)
+
+
+def headers(columns) -> list[str]:
+    """
+    Заголовки файла: id, brand, price, rating и дополнительные
+    столбцы c4, c5, ... до columns столбцов
+    """
+    return BASE_COLUMNS + [f"c{index}"
+                           for index in range(len(BASE_COLUMNS), columns)]
+
+
+def generate(file, rows, columns=len(BASE_COLUMNS), cardinality=50,
+             seed=0) -> None:
+    """
+    Запись csv файла в file.
+    - id - номер строки
+    - brand - текст, cardinality разных значений
+    - price - целое от 1 до 2000
+    - rating - число от 1.0 до 5.0 с одним знаком
+    - дополнительные столбцы - по очереди целые числа и текст
+      с cardinality значениями
+    """
+    generator = random.Random(seed)
+    brands = [f"brand{index}" for index in range(cardinality)]
+    extra = len(headers(columns)) - len(BASE_COLUMNS)
+    file.write(",".join(headers(columns)) + "\n")
+    for start in range(0, rows, BATCH_ROWS):
+        lines = []
+        for row in range(start, min(start + BATCH_ROWS, rows)):
+            cells = [str(row), generator.choice(brands),
+                     str(generator.randint(1, 2000)),
+                     str(generator.randint(10, 50) / 10)]
+            for index in range(extra):
+                if index % 2:
+                    cells.append(generator.choice(brands))
+                else:
+                    cells.append(str(generator.randrange(1_000_000)))
+            lines.append(",".join(cells))
+        file.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=count, default=10000,
+                        help="Число строк, например, 1e6")
+    parser.add_argument("--columns", type=int, default=len(BASE_COLUMNS),
+                        help="Число столбцов, не меньше 4")
+    parser.add_argument("--cardinality", type=int, default=50,
+                        help="Число разных значений текстовых столбцов")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True, help="Путь к csv файлу")
+    args = parser.parse_args()
+
+    with open(args.output, "w", encoding="utf-8", newline="") as file:
+        generate(file, args.rows, args.columns, args.cardinality, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Замер одного запроса. Запускается в отдельном процессе
+(python3 -m benchmarks.measure '<json>'), чтобы пиковая память
+относилась только к этому запросу. Печатает результат в JSON.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from csv_reader import DEFAULT_OPTIONS, CSVReader  # noqa: E402
+from stats import peak_rss_bytes  # noqa: E402
+
+
+class FirstWrite:
+    """
+    Вывод в никуда, запоминающий время первой записи.
+    Так время до первой строки считается для любого формата вывода,
+    в том числе для tabulate, который печатает все сразу.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.first = None
+
+    def write(self, text):
+        if self.first is None and text:
+            self.first = time.perf_counter()
+        return self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+
+
+def peak_rss_kb() -> int | None:
+    """Пиковая память процесса в КБ или None, если ее не узнать"""
+    peak = peak_rss_bytes()
+    return None if peak is None else peak // 1024
+
+
+def measure(path, options, rows) -> dict:
+    """
+    Выполнение запроса options к файлу path с выводом в никуда.
+    rows - число строк файла для расчета скорости.
+    """
+    args = argparse.Namespace(**{**DEFAULT_OPTIONS, "cache": False,
+                                 **options})
+    stdout = sys.stdout
+    with open(os.devnull, "w") as devnull:
+        output = FirstWrite(devnull)
+        sys.stdout = output
+        try:
+            start = time.perf_counter()
+            cpu = time.process_time()
+            CSVReader(path, args).read()
+            seconds = time.perf_counter() - start
+            cpu = time.process_time() - cpu
+        finally:
+            sys.stdout = stdout
+    return {
+        "seconds": seconds,
+        "cpu_seconds": cpu,
+        "rows_per_second": rows / seconds if seconds else None,
+        "first_row_seconds": (output.first - start
+                              if output.first is not None else None),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def main():
+    task = json.loads(sys.argv[1])
+    print(json.dumps(measure(task["path"], task["options"], task["rows"])))
+
+
+if __name__ == "__main__":
+    main()
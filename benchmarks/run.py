@@ -0,0 +1,150 @@
+"""
+Запуск сценариев замеров (benchmarks.scenarios) на сгенерированном
+или указанном файле. Каждый сценарий выполняется в отдельном процессе
+--repeat раз, сохраняется лучший по времени результат.
+
+Запуск из корня проекта:
+    python3 -m benchmarks.run --rows 1e6 --output results.json
+    python3 -m benchmarks.run --rows 1e6 --baseline results.json
+
+С --baseline результаты сравниваются с прошлым запуском: если скорость
+упала или память и время до первой строки выросли больше чем
+на --tolerance, печатается список регрессий и код выхода 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from tabulate import tabulate
+
+from benchmarks.generate import count, generate
+from benchmarks.scenarios import SCENARIOS
+
+ROOT = Path(__file__).parent.parent
+
+# Метрика -> лучше ли большее значение
+METRICS = {
+    "rows_per_second": True,
+    "first_row_seconds": False,
+    "peak_rss_kb": False,
+}
+
+
+def run_scenario(path, options, rows, repeat) -> dict:
+    """Лучший из repeat замеров сценария, каждый в новом процессе"""
+    results = []
+    for _ in range(repeat):
+        task = json.dumps({"path": path, "options": options, "rows": rows})
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.measure", task],
+            cwd=ROOT, capture_output=True, text=True, check=True)
+        results.append(json.loads(completed.stdout))
+    return min(results, key=lambda result: result["seconds"])
+
+
+def compare(baseline, current, tolerance) -> list[str]:
+    """
+    Регрессии current относительно baseline: сценарии, в которых
+    метрика из METRICS стала хуже больше чем на долю tolerance
+    """
+    problems = []
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            if (change < -tolerance if higher_is_better
+                    else change > tolerance):
+                problems.append(f"{name}: {metric} {old:.4g} -> {new:.4g} "
+                                f"({change:+.0%})")
+    return problems
+
+
+def count_rows(path) -> int:
+    """Число строк данных в файле без заголовков"""
+    with open(path, "rb") as file:
+        return max(sum(1 for _ in file) - 1, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--file", help="csv файл вместо сгенерированного")
+    parser.add_argument("--rows", type=count, default=100000,
+                        help="Число строк сгенерированного файла, "
+                             "от 1e4 до 1e8")
+    parser.add_argument("--columns", type=int, default=4)
+    parser.add_argument("--cardinality", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="Сценарии через запятую")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Куда записать результаты в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого запуска")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Допустимое ухудшение, доля (0.2 - 20%%)")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",")]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Неизвестные сценарии: {', '.join(unknown)}")
+
+    path = args.file
+    if path is None:
+        descriptor, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(descriptor, "w", encoding="utf-8", newline="") as file:
+            generate(file, args.rows, args.columns, args.cardinality,
+                     args.seed)
+    try:
+        rows = count_rows(path) if args.file else args.rows
+        report = {
+            "meta": {
+                "file": args.file, "rows": rows, "columns": args.columns,
+                "cardinality": args.cardinality, "seed": args.seed,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "scenarios": {
+                name: run_scenario(path, SCENARIOS[name], rows, args.repeat)
+                for name in names},
+        }
+    finally:
+        if args.file is None:
+            os.unlink(path)
+
+    print(tabulate(
+        [[name, result["seconds"], result["rows_per_second"],
+          result["first_row_seconds"], result["peak_rss_kb"]]
+         for name, result in report["scenarios"].items()],
+        headers=["scenario", "seconds", "rows/s", "first row, s",
+                 "peak RSS, KB"],
+        tablefmt="grid", floatfmt=".4g"))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline["meta"]["rows"] != rows:
+            print("Число строк отличается от прошлого запуска, "
+                  "сравнение неточное", file=sys.stderr)
+        problems = compare(baseline, report, args.tolerance)
+        if problems:
+            print("Регрессии:")
+            print("\n".join(problems))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
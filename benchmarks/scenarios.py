@@ -0,0 +1,37 @@
+"""
+Сценарии замеров: параметры запроса, как у аргументов main.py.
+Неуказанные параметры берутся из csv_reader.DEFAULT_OPTIONS,
+кеш таблиц выключен, чтобы замер не зависел от прошлых запусков.
+"""
+
+SCENARIOS = {
+    # Печать всей таблицы через tabulate и по мере чтения
+    "print": {},
+    "print_stream": {"stream": True},
+    "print_csv": {"format": "csv"},
+    # Фильтры
+    "where_numeric": {"where": ["price>1500"]},
+    "where_text": {"where": ["brand=brand7"]},
+    "where_text_mmap": {"where": ["brand=brand7"], "mmap": True},
+    # С --mmap строки без "brand7" и "brand9" не разбираются на поля
+    "where_in_aggregate": {"where": ["brand IN (brand7, brand9)"],
+                           "aggregate": ["price=avg"]},
+    "where_in_aggregate_mmap": {"where": ["brand IN (brand7, brand9)"],
+                                "aggregate": ["price=avg"], "mmap": True},
+    # Агрегация
+    "aggregate": {"aggregate": ["price=avg"]},
+    "aggregate_mmap": {"aggregate": ["price=avg"], "mmap": True},
+    "aggregate_columnar": {"aggregate": ["price=avg"], "engine": "columnar"},
+    "aggregate_jobs": {"aggregate": ["price=avg"], "jobs": 4},
+    # Строки из процессов выводятся по мере обработки диапазонов
+    "where_csv_jobs": {"where": ["price>500"], "format": "csv", "jobs": 4},
+    # Фильтр, группировка, сортировка и лимит вместе
+    "combined": {
+        "where": ["price>500 AND rating>=4.5"],
+        "group_by": "brand",
+        "aggregate": ["price=avg", "rating=max"],
+        "order_by": "price=avg:desc",
+        "limit": 10,
+    },
+    "top_n": {"where": ["rating>=4"], "order_by": "price:desc", "limit": 10},
+}
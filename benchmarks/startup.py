@@ -0,0 +1,137 @@
+"""
+Замер запуска: сколько стоит импорт csv_reader и короткий запрос
+целиком (новый процесс python3 main.py), как у задач по расписанию.
+Время импорта берется из python -X importtime, запуск повторяется
+--repeat раз, сохраняется лучший результат.
+
+Запуск из корня проекта:
+    python3 -m benchmarks.startup
+    python3 -m benchmarks.startup --budget-ms 100 --output startup.json
+
+Код выхода 1, если импорт csv_reader дольше --budget-ms, при
+запросе загружен модуль из LAZY_MODULES или обычный запрос PLAIN_QUERY
+загрузил модуль из PLAIN_LAZY_MODULES.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.generate import generate
+
+ROOT = Path(__file__).parent.parent
+SRC = ROOT / "src"
+
+# Запрос: агрегат из одной ячейки без таблицы tabulate
+QUERY = ["--aggregate", "price=max", "--format", "csv"]
+
+# Модули, которые короткий запрос загружать не должен
+LAZY_MODULES = ("tabulate", "numpy", "pyarrow", "multiprocessing", "cProfile")
+
+# Обычный запрос к csv файлу: столбцы без агрегации и --where
+PLAIN_QUERY = ["--select", "brand,price", "--format", "csv"]
+
+# Модули для отдельных параметров и форматов файлов: колоночного
+# и сжатого файла, индексов, групп, --stats, кеша, --sample и --follow.
+# Обычный запрос загружать их не должен
+PLAIN_LAZY_MODULES = ("column_file", "indexes", "compression", "grouping",
+                      "stats", "table_cache", "sampling", "follow")
+
+# Бюджет импорта csv_reader по умолчанию, миллисекунды
+BUDGET_MS = 100
+
+
+def parse_importtime(text) -> dict[str, tuple[int, int]]:
+    """
+    Разбор вывода -X importtime: модуль -> (собственное время,
+    время вместе с вложенными импортами), микросекунды
+    """
+    modules = {}
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue
+        modules[name.strip()] = (int(own), int(cumulative))
+    return modules
+
+
+def measure_startup(path, query=QUERY, lazy=LAZY_MODULES) -> dict:
+    """
+    Один запуск python3 -X importtime main.py с запросом query
+    к файлу path: время процесса и импортов и загруженные модули
+    из lazy
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py", "--file", path,
+         *query], cwd=SRC, capture_output=True, text=True, check=True)
+    seconds = time.perf_counter() - start
+    modules = parse_importtime(completed.stderr)
+    return {
+        "process_ms": seconds * 1000,
+        "import_ms": modules["csv_reader"][1] / 1000,
+        "lazy_loaded": [name for name in lazy if name in modules],
+        "slowest": sorted(
+            ((name, cumulative / 1000)
+             for name, (_, cumulative) in modules.items()),
+            key=lambda item: item[1], reverse=True)[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS,
+                        help="Допустимое время импорта csv_reader, мс")
+    parser.add_argument("--output", help="Куда записать результат в JSON")
+    args = parser.parse_args()
+
+    descriptor, path = tempfile.mkstemp(suffix=".csv")
+    with os.fdopen(descriptor, "w", encoding="utf-8", newline="") as file:
+        generate(file, 100)
+    try:
+        results = [measure_startup(path) for _ in range(args.repeat)]
+        plain = measure_startup(path, PLAIN_QUERY,
+                                LAZY_MODULES + PLAIN_LAZY_MODULES)
+    finally:
+        os.unlink(path)
+    result = min(results, key=lambda result: result["import_ms"])
+    result["budget_ms"] = args.budget_ms
+    result["plain_lazy_loaded"] = plain["lazy_loaded"]
+
+    print(f"Импорт csv_reader: {result['import_ms']:.1f} мс "
+          f"(бюджет {args.budget_ms:g} мс)")
+    print(f"Процесс целиком: {result['process_ms']:.1f} мс")
+    print("Самые долгие импорты, мс:")
+    for name, milliseconds in result["slowest"]:
+        print(f"  {name:<30} {milliseconds:8.1f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+
+    problems = []
+    if result["import_ms"] > args.budget_ms:
+        problems.append(f"импорт csv_reader {result['import_ms']:.1f} мс "
+                        f"больше бюджета {args.budget_ms:g} мс")
+    if result["lazy_loaded"]:
+        problems.append("загружены модули: " +
+                        ", ".join(result["lazy_loaded"]))
+    if result["plain_lazy_loaded"]:
+        problems.append("обычный запрос загрузил модули: " +
+                        ", ".join(result["plain_lazy_loaded"]))
+    if problems:
+        print("Регрессии:")
+        print("\n".join(problems))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
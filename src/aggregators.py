@@ -0,0 +1,353 @@
+import math
+import re
+
+
+class NotNumericError(ValueError):
+    """Числовой агрегации передано значение, которое не число"""
+
+
+# Аккумуляторы для агрегации за один проход
+class Aggregator:
+    """
+    Базовый класс аккумулятора.
+    Аккумулятор получает значения по одному через add, хранит
+    состояние постоянного размера и отдает ответ через result.
+    Состояния двух аккумуляторов можно объединить через merge,
+    например, если файл обрабатывался по частям.
+
+    Атрибуты:
+    - numeric: bool - нужны ли аккумулятору числа, а не строки
+
+    Чтобы добавить новую агрегацию, нужно унаследоваться от Aggregator
+    и зарегистрировать класс в словаре AGGREGATORS.
+    """
+    numeric = True
+
+    def add(self, value) -> None:
+        raise NotImplementedError
+
+    def merge(self, other) -> None:
+        raise NotImplementedError
+
+    def result(self):
+        """
+        Результат агрегации или None, если значений не было
+        """
+        raise NotImplementedError
+
+
+class MinAggregator(Aggregator):
+    """Минимальное значение"""
+    def __init__(self):
+        self.value = None
+
+    def add(self, value) -> None:
+        if self.value is None or value < self.value:
+            self.value = value
+
+    def merge(self, other) -> None:
+        if other.value is not None:
+            self.add(other.value)
+
+    def result(self):
+        return self.value
+
+
+class MaxAggregator(Aggregator):
+    """Максимальное значение"""
+    def __init__(self):
+        self.value = None
+
+    def add(self, value) -> None:
+        if self.value is None or value > self.value:
+            self.value = value
+
+    def merge(self, other) -> None:
+        if other.value is not None:
+            self.add(other.value)
+
+    def result(self):
+        return self.value
+
+
+class SumAggregator(Aggregator):
+    """Сумма значений"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value) -> None:
+        self.count += 1
+        self.total += value
+
+    def merge(self, other) -> None:
+        self.count += other.count
+        self.total += other.total
+
+    def result(self):
+        return self.total if self.count else None
+
+
+class AvgAggregator(SumAggregator):
+    """Среднее значение, округленное до двух знаков"""
+    def result(self):
+        return round(self.total / self.count, 2) if self.count else None
+
+
+class CountAggregator(Aggregator):
+    """Количество значений"""
+    numeric = False
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, value) -> None:
+        self.count += 1
+
+    def merge(self, other) -> None:
+        self.count += other.count
+
+    def result(self):
+        return self.count
+
+
+class CountDistinctAggregator(Aggregator):
+    """
+    Точное количество уникальных значений.
+    Память растет с числом уникальных значений, для столбцов
+    с большой кардинальностью лучше approx_distinct.
+    """
+    numeric = False
+
+    def __init__(self):
+        self.values = set()
+
+    def add(self, value) -> None:
+        self.values.add(value)
+
+    def merge(self, other) -> None:
+        self.values |= other.values
+
+    def result(self):
+        return len(self.values)
+
+
+class ApproxCountDistinctAggregator(Aggregator):
+    """
+    Приблизительное количество уникальных значений (HyperLogLog).
+    Хранит 2^precision однобайтовых регистров, при precision=14
+    это 16 КБ и стандартная ошибка около 0.8%.
+    """
+    numeric = False
+
+    def __init__(self, precision=14):
+        # hashlib нужен только этому агрегатору, импорт здесь
+        # не замедляет загрузку модуля для остальных запросов
+        import hashlib
+
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self.blake2b = hashlib.blake2b
+
+    def add(self, value) -> None:
+        if not isinstance(value, bytes):
+            value = str(value).encode("utf-8")
+        digest = self.blake2b(value, digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other) -> None:
+        self.registers = bytearray(
+            max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def result(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(
+            2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        # Для малых значений точнее линейный подсчет
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+
+class VarianceAggregator(Aggregator):
+    """
+    Дисперсия выборки по алгоритму Велфорда.
+    Устойчив к ошибкам округления и не хранит значения.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other) -> None:
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def result(self):
+        return round(self.variance(), 2) if self.count else None
+
+
+class StddevAggregator(VarianceAggregator):
+    """Стандартное отклонение выборки"""
+    def result(self):
+        return round(math.sqrt(self.variance()), 2) if self.count else None
+
+
+class PercentileAggregator(Aggregator):
+    """
+    Приблизительный перцентиль (t-digest).
+    Значения копятся в буфере и периодически сжимаются в центроиды,
+    число центроидов ограничено параметром compression.
+    """
+    def __init__(self, percent, compression=100):
+        self.quantile = percent / 100
+        self.compression = compression
+        self.centroids = []
+        self.buffer = []
+        self.count = 0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value) -> None:
+        self.buffer.append((value, 1))
+        self.count += 1
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        if len(self.buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other) -> None:
+        if not other.count:
+            return
+        self.buffer.extend(other.centroids)
+        self.buffer.extend(other.buffer)
+        self.count += other.count
+        if self.minimum is None or other.minimum < self.minimum:
+            self.minimum = other.minimum
+        if self.maximum is None or other.maximum > self.maximum:
+            self.maximum = other.maximum
+        self._compress()
+
+    def _compress(self) -> None:
+        """
+        Сливает буфер с центроидами. Соседние центроиды объединяются,
+        пока их вес меньше допустимого для этого места распределения:
+        на хвостах центроиды мельче, поэтому крайние перцентили точнее.
+        """
+        points = sorted(self.centroids + self.buffer)
+        self.buffer = []
+        if not points:
+            return
+        merged = []
+        mean, weight = points[0]
+        seen = 0
+        for next_mean, next_weight in points[1:]:
+            q = (seen + weight + next_weight / 2) / self.count
+            limit = 4 * self.count * q * (1 - q) / self.compression
+            if weight + next_weight <= max(limit, 1):
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append((mean, weight))
+                seen += weight
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def result(self):
+        if not self.count:
+            return None
+        self._compress()
+        # Ищем центроиды вокруг нужного ранга и интерполируем между
+        # их центрами. Края распределения - точные минимум и максимум.
+        rank = self.quantile * self.count
+        previous_rank, previous_mean = 0.0, self.minimum
+        seen = 0
+        for mean, weight in self.centroids:
+            center = seen + weight / 2
+            if rank <= center:
+                return round(self._interpolate(
+                    rank, previous_rank, previous_mean, center, mean), 2)
+            previous_rank, previous_mean = center, mean
+            seen += weight
+        return round(self._interpolate(
+            rank, previous_rank, previous_mean, self.count, self.maximum), 2)
+
+    @staticmethod
+    def _interpolate(rank, left_rank, left_value, right_rank, right_value):
+        if right_rank <= left_rank:
+            return right_value
+        share = (rank - left_rank) / (right_rank - left_rank)
+        return left_value + share * (right_value - left_value)
+
+
+AGGREGATORS = {
+    "min": MinAggregator,
+    "avg": AvgAggregator,
+    "max": MaxAggregator,
+    "sum": SumAggregator,
+    "count": CountAggregator,
+    "count_distinct": CountDistinctAggregator,
+    "approx_distinct": ApproxCountDistinctAggregator,
+    "var": VarianceAggregator,
+    "stddev": StddevAggregator,
+    "median": lambda: PercentileAggregator(50),
+}
+
+PERCENTILE_PATTERN = re.compile(r"^p(?P<percent>\d{1,2}|100)$")
+
+
+def create_aggregator(name) -> Aggregator:
+    """
+    Создание аккумулятора по названию агрегации.
+    Кроме словаря AGGREGATORS поддерживаются перцентили p0-p100.
+    """
+    if name in AGGREGATORS:
+        return AGGREGATORS[name]()
+    match = PERCENTILE_PATTERN.match(name)
+    if match:
+        return PercentileAggregator(int(match.group("percent")))
+    raise ValueError(f"Агрегация {name} не поддерживается")
+
+
+def accumulate(aggregator, rows, index) -> Aggregator:
+    """
+    Передача аккумулятору значений столбца index из строк rows.
+    Для числовых агрегаций значения переводятся в float,
+    если значение не число - NotNumericError.
+    """
+    add = aggregator.add
+    if not aggregator.numeric:
+        for row in rows:
+            add(row[index])
+        return aggregator
+    for row in rows:
+        try:
+            number = float(row[index])
+        except ValueError:
+            raise NotNumericError(row[index]) from None
+        add(number)
+    return aggregator
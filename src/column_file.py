@@ -0,0 +1,354 @@
+import argparse
+import csv
+import json
+import math
+import os
+import struct
+import sys
+from itertools import islice, repeat
+
+from columnar import CHUNK_SIZE, ColumnTable, restore_column
+from compression import open_text
+from filters import Condition, InCondition
+from formats import COLUMN_MAGIC, detect_format
+from indexes import ZoneMap, node_blocks
+
+MAGIC = COLUMN_MAGIC
+SUFFIX = ".csvc"
+VERSION = 1
+LENGTH = struct.Struct("<Q")
+
+
+# Колоночный файл из блоков строк (main.py convert)
+class TextRange:
+    """
+    Минимум и максимум текста в блоке для столбцов str и bool.
+    Помогает для =, IN и сравнений < и > со строкой: строки
+    сравниваются монотонно, поэтому в блоке есть подходящее
+    значение, только если подходит один из концов отрезка.
+    Интерфейс тот же, что у indexes.ZoneMap.
+
+    Атрибуты:
+    - minimums: list[str | None] - минимум блока
+    - maximums: list[str | None] - максимум блока
+    """
+    def __init__(self, minimums, maximums):
+        self.minimums = minimums
+        self.maximums = maximums
+
+    def blocks(self, node) -> int | None:
+        overlaps = self._overlaps(node)
+        if overlaps is None:
+            return None
+        result = 0
+        for block, (low, high) in enumerate(zip(self.minimums,
+                                                self.maximums)):
+            if low is not None and overlaps(low, high):
+                result |= 1 << block
+        return result
+
+    @staticmethod
+    def _overlaps(node):
+        """
+        Проверка отрезка [минимум, максимум] для условия node
+        или None, если по отрезку ничего не сказать
+        """
+        if isinstance(node, InCondition):
+            values = node.values
+            return lambda low, high: any(low <= value <= high
+                                         for value in values)
+        if not isinstance(node, Condition) or node.operator == "!=":
+            return None
+        if node.operator == "=":
+            value = node.value
+            return lambda low, high: low <= value <= high
+        if node.number is not None:
+            # Ячейка сравнивается как число, если она число
+            return None
+        test = node.text_test()
+        return lambda low, high: test(low) or test(high)
+
+
+class MissingColumn:
+    """
+    Столбец, который запрос не читает: пустые ячейки.
+    Нужен, чтобы индексы столбцов блока совпадали с заголовками.
+    """
+    kind = None
+
+    def __init__(self, length):
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def texts(self, selection=None):
+        return repeat("", self.length if selection is None
+                      else len(selection))
+
+
+class ChunkTable(ColumnTable):
+    """
+    Блок колоночного файла: прочитаны только нужные столбцы,
+    на месте остальных MissingColumn
+    """
+    def __init__(self, headers, columns, row_count):
+        super().__init__(headers, columns)
+        self.rows = row_count
+
+    @property
+    def row_count(self) -> int:
+        return self.rows
+
+
+def column_statistics(column) -> tuple:
+    """
+    Минимум и максимум значений столбца блока: числа для int
+    и float (без nan), текст для str и bool
+    """
+    if column.kind == "str":
+        values = column.dictionary
+    elif column.kind == "bool":
+        values = [column.to_text(value) for value in set(column.values)]
+    else:
+        values = [value for value in column.values if not math.isnan(value)]
+    if not values:
+        return None, None
+    return min(values), max(values)
+
+
+def write_column_file(file, headers, rows, chunk_rows=CHUNK_SIZE) -> dict:
+    """
+    Запись строк в колоночный файл: MAGIC, затем блоки по chunk_rows
+    строк, затем описание в JSON, его длина и снова MAGIC.
+    Каждый блок - это столбцы с типами (модуль columnar): буфер
+    значений и для строк словарь в JSON. В описании для каждого
+    блока и столбца - тип, смещения, минимум и максимум.
+    Числа пишутся в порядке байт little-endian.
+    Возвращает описание.
+    """
+    file.write(MAGIC)
+    position = len(MAGIC)
+    chunks = []
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            break
+        table = ColumnTable.from_rows(headers, chunk)
+        columns = []
+        for column in table.columns:
+            values = column.values
+            if sys.byteorder != "little":
+                values = type(values)(values.typecode, values)
+                values.byteswap()
+            data = values.tobytes()
+            spec = {"kind": column.kind, "offset": position,
+                    "size": len(data), "dictionary": None}
+            file.write(data)
+            position += len(data)
+            if column.kind == "str":
+                encoded = json.dumps(column.dictionary,
+                                     ensure_ascii=False).encode("utf-8")
+                spec["dictionary"] = [position, len(encoded)]
+                file.write(encoded)
+                position += len(encoded)
+            spec["min"], spec["max"] = column_statistics(column)
+            columns.append(spec)
+        chunks.append({"rows": len(chunk), "columns": columns})
+    meta = {"version": VERSION, "byteorder": "little", "headers": headers,
+            "rows": sum(chunk["rows"] for chunk in chunks), "chunks": chunks}
+    encoded = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    file.write(encoded)
+    file.write(LENGTH.pack(len(encoded)))
+    file.write(MAGIC)
+    return meta
+
+
+def is_column_file(path) -> bool:
+    """
+    Колоночный ли это файл (по первым байтам)
+    """
+    try:
+        return detect_format(path) == "column"
+    except OSError:
+        return False
+
+
+class ColumnFile:
+    """
+    Чтение колоночного файла, записанного write_column_file.
+    При создании читается только описание в конце файла, затем для
+    запроса - только нужные столбцы блоков, которые могут
+    содержать подходящие строки. Файл открывается на время
+    чтения блока, поэтому закрывать ColumnFile не нужно.
+
+    Атрибуты:
+    - path: str - путь к файлу
+    - headers: list[str] - заголовки столбцов
+    - row_count: int - число строк
+    - chunks: list[dict] - описание блоков
+    - bytes_read: int - сколько байт прочитано
+    """
+    def __init__(self, path):
+        self.path = path
+        self.bytes_read = 0
+        with open(path, "rb") as file:
+            meta = self._read_meta(file)
+        self.headers = meta["headers"]
+        self.row_count = meta["rows"]
+        self.chunks = meta["chunks"]
+        self.swap = meta["byteorder"] != sys.byteorder
+
+    def _read_meta(self, file) -> dict:
+        """
+        Описание из конца файла. Если файл обрезан или
+        не колоночный - ValueError.
+        """
+        tail = len(MAGIC) + LENGTH.size
+        size = file.seek(0, os.SEEK_END)
+        if size < len(MAGIC) + tail:
+            raise ValueError(f"Файл {self.path} поврежден")
+        file.seek(size - tail)
+        end = file.read(tail)
+        if end[LENGTH.size:] != MAGIC:
+            raise ValueError(f"Файл {self.path} поврежден")
+        (length,) = LENGTH.unpack(end[:LENGTH.size])
+        if length > size - tail - len(MAGIC):
+            raise ValueError(f"Файл {self.path} поврежден")
+        file.seek(size - tail - length)
+        try:
+            meta = json.loads(self._read(file, length).decode("utf-8"))
+        except ValueError:
+            raise ValueError(f"Файл {self.path} поврежден") from None
+        if not isinstance(meta, dict) or meta.get("version") != VERSION:
+            raise ValueError(f"Версия файла {self.path} не поддерживается")
+        return meta
+
+    def _read(self, file, size) -> bytes:
+        data = file.read(size)
+        if len(data) != size:
+            raise ValueError(f"Файл {self.path} поврежден")
+        self.bytes_read += size
+        return data
+
+    def statistics(self, number) -> dict:
+        """
+        Минимумы и максимумы столбцов блока number в виде индексов
+        для indexes.node_blocks
+        """
+        result = {}
+        for header, spec in zip(self.headers,
+                                self.chunks[number]["columns"]):
+            kind = ZoneMap if spec["kind"] in ("int", "float") else TextRange
+            result[header] = kind([spec["min"]], [spec["max"]])
+        return result
+
+    def may_match(self, number, node) -> bool:
+        """
+        Могут ли в блоке number быть строки, подходящие под node
+        """
+        return node_blocks(node, self.statistics(number)) != 0
+
+    def read_chunk(self, number, indexes=None) -> ChunkTable:
+        """
+        Блок number, в котором прочитаны только столбцы indexes
+        (None - все столбцы)
+        """
+        chunk = self.chunks[number]
+        wanted = set(range(len(self.headers)) if indexes is None
+                     else indexes)
+        columns = []
+        with open(self.path, "rb") as file:
+            for index, spec in enumerate(chunk["columns"]):
+                if index not in wanted:
+                    columns.append(MissingColumn(chunk["rows"]))
+                    continue
+                file.seek(spec["offset"])
+                data = self._read(file, spec["size"])
+                dictionary = None
+                if spec["dictionary"] is not None:
+                    offset, size = spec["dictionary"]
+                    file.seek(offset)
+                    dictionary = json.loads(
+                        self._read(file, size).decode("utf-8"))
+                column = restore_column(spec["kind"], data, dictionary)
+                if self.swap:
+                    column.values.byteswap()
+                if len(column) != chunk["rows"]:
+                    raise ValueError(f"Файл {self.path} поврежден")
+                columns.append(column)
+        return ChunkTable(self.headers, columns, chunk["rows"])
+
+    def describe(self) -> list[list[str]]:
+        """
+        Типы столбцов по блокам: столбец и типы через запятую
+        """
+        kinds = [dict.fromkeys(spec["kind"] for spec in specs)
+                 for specs in zip(*(chunk["columns"]
+                                    for chunk in self.chunks))]
+        return [[header, ",".join(column_kinds)]
+                for header, column_kinds in zip(self.headers, kinds)]
+
+
+def output_path(path) -> str:
+    """
+    Путь колоночного файла по умолчанию: data.csv(.gz) -> data.csvc
+    """
+    base = path
+    for suffix in (".gz", ".bz2", ".xz", ".zst", ".csv"):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    return base + SUFFIX
+
+
+def convert(path, output=None, chunk_rows=CHUNK_SIZE) -> str:
+    """
+    Перевод csv файла (можно сжатого) в колоночный файл.
+    Файл пишется во временный и переименовывается, поэтому
+    недописанный файл не прочитается. Возвращает путь к файлу.
+    """
+    output = output or output_path(path)
+    temporary = output + ".tmp"
+    try:
+        with open_text(path) as source, open(temporary, "wb") as file:
+            reader = csv.reader(source)
+            write_column_file(file, next(reader, []), reader, chunk_rows)
+        os.replace(temporary, output)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return output
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="main.py convert", add_help=False,
+        description="Перевод csv файла в колоночный файл: столбцы с типами "
+                    "по блокам строк, словари для строк, минимум и максимум "
+                    "каждого блока. Запросы к нему (--file data.csvc) "
+                    "читают только нужные столбцы и блоки")
+    parser.add_argument("-h", "--help", action="help", help="Показать справку")
+    parser.add_argument("file", help="csv файл, можно сжатый")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Куда записать (по умолчанию data.csvc "
+                             "рядом с data.csv)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_SIZE,
+                        help="Строк в блоке")
+    args = parser.parse_args(argv)
+    if args.chunk_rows < 1:
+        parser.error("--chunk-rows должно быть больше нуля")
+    if not os.path.exists(args.file):
+        print(f"Файл {args.file} не найден")
+        exit(1)
+
+    output = convert(args.file, args.output, args.chunk_rows)
+    column_file = ColumnFile(output)
+    from tabulate import tabulate
+    print(tabulate(column_file.describe(), headers=["column", "kind"],
+                   tablefmt="grid"))
+    print(f"{output}: строк {column_file.row_count}, "
+          f"блоков {len(column_file.chunks)}, "
+          f"{os.path.getsize(output)} байт "
+          f"(csv {os.path.getsize(args.file)} байт)")
@@ -0,0 +1,306 @@
+from array import array
+from itertools import compress, islice, repeat, zip_longest
+from operator import itemgetter
+
+SCHEMA_SAMPLE = 1000
+CHUNK_SIZE = 65536
+
+
+# Колоночное хранение данных с типами
+class Column:
+    """
+    Базовый класс столбца.
+    Значения хранятся в компактном буфере array.array, а исходный
+    текст ячейки всегда можно восстановить через to_text: типы
+    выбираются только для значений, которые переводятся в текст
+    и обратно без изменений (например, "4.9", но не "4.90").
+
+    Атрибуты:
+    - kind: str - тип столбца: int, float, bool, str
+    - values: array - значения или коды словаря
+    """
+    kind = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def extend(self, texts) -> "Column":
+        """
+        Добавление значений из текста.
+        Если значение не подходит под тип, столбец переводится в str:
+        возвращается новый столбец, который нужно сохранить вместо этого.
+        """
+        try:
+            self.values.extend(self.parse(texts))
+            return self
+        except (ValueError, OverflowError):
+            column = StringColumn()
+            column.extend(self.texts())
+            return column.extend(texts)
+
+    def parse(self, texts) -> array:
+        raise NotImplementedError
+
+    def to_text(self, value) -> str:
+        raise NotImplementedError
+
+    def texts(self, selection=None) -> list[str]:
+        """
+        Текст ячеек для строк selection (None - все строки)
+        """
+        values = self.values if selection is None else map(
+            self.values.__getitem__, selection)
+        return list(map(self.to_text, values))
+
+    def aggregate_values(self, selection=None) -> list:
+        """
+        Значения для агрегации: числа для числовых столбцов,
+        текст для остальных. float() от них дает тот же результат,
+        что и от исходного текста.
+        """
+        return self.texts(selection)
+
+    def select(self, node, candidates=None) -> list[int]:
+        """
+        Индексы строк из candidates (None - все строки), для которых
+        выполняется условие node на этот столбец.
+        Условие на текст проверяется один раз для каждого
+        уникального значения.
+        """
+        return select_indexes(
+            self.values, memoize(node.text_test(), self.to_text), candidates)
+
+
+class IntColumn(Column):
+    """Целые числа в array('q')"""
+    kind = "int"
+
+    def __init__(self):
+        self.values = array("q")
+
+    def parse(self, texts) -> array:
+        numbers = array("q", map(int, texts))
+        if list(map(str, numbers)) != texts:
+            raise ValueError("Число записано не в каноническом виде")
+        return numbers
+
+    def to_text(self, value) -> str:
+        return str(value)
+
+    def aggregate_values(self, selection=None) -> list:
+        if selection is None:
+            return self.values
+        return list(map(self.values.__getitem__, selection))
+
+    def select(self, node, candidates=None) -> list[int]:
+        test = node.number_test()
+        if test is None:
+            return super().select(node, candidates)
+        return select_indexes(self.values, test, candidates)
+
+
+class FloatColumn(IntColumn):
+    """Дробные числа в array('d')"""
+    kind = "float"
+
+    def __init__(self):
+        self.values = array("d")
+
+    def parse(self, texts) -> array:
+        numbers = array("d", map(float, texts))
+        if list(map(repr, numbers)) != texts:
+            raise ValueError("Число записано не в каноническом виде")
+        return numbers
+
+    def to_text(self, value) -> str:
+        return repr(value)
+
+
+class BoolColumn(Column):
+    """Значения true/false в array('b')"""
+    kind = "bool"
+    TEXTS = ("false", "true")
+
+    def __init__(self):
+        self.values = array("b")
+
+    def parse(self, texts) -> array:
+        return array("b", map(self.TEXTS.index, texts))
+
+    def to_text(self, value) -> str:
+        return self.TEXTS[value]
+
+
+class StringColumn(Column):
+    """
+    Строки со словарным кодированием.
+    Каждая уникальная строка хранится один раз в dictionary,
+    а в values лежат коды array('I').
+    """
+    kind = "str"
+
+    def __init__(self):
+        self.values = array("I")
+        self.lookup = {}
+        self.dictionary = []
+
+    def extend(self, texts) -> "Column":
+        lookup = self.lookup
+        codes = list(map(lookup.get, texts))
+        if None in codes:
+            # Новые значения добавляются в словарь по порядку появления
+            for position, code in enumerate(codes):
+                if code is None:
+                    codes[position] = lookup.setdefault(
+                        texts[position], len(lookup))
+            self.dictionary = list(lookup)
+        self.values.extend(codes)
+        return self
+
+    def to_text(self, value) -> str:
+        return self.dictionary[value]
+
+    def select(self, node, candidates=None) -> list[int]:
+        test = node.text_test()
+        matching = {code for code, text in enumerate(self.dictionary)
+                    if test(text)}
+        return select_indexes(self.values, matching.__contains__, candidates)
+
+
+COLUMN_TYPES = {
+    "int": IntColumn,
+    "float": FloatColumn,
+    "bool": BoolColumn,
+    "str": StringColumn,
+}
+
+
+def restore_column(kind, data, dictionary=None) -> Column:
+    """
+    Столбец из сохраненных байт буфера values и словаря строк
+    (см. table_cache)
+    """
+    column = COLUMN_TYPES[kind]()
+    column.values.frombytes(data)
+    if dictionary is not None:
+        column.dictionary = list(dictionary)
+        column.lookup = dict(zip(column.dictionary, range(len(dictionary))))
+    return column
+
+
+def select_indexes(values, test, candidates=None) -> list[int]:
+    """
+    Индексы значений, для которых test истинно.
+    Для всех строк используется itertools.compress без цикла Python.
+    """
+    if candidates is None:
+        return list(compress(range(len(values)), map(test, values)))
+    return [index for index in candidates if test(values[index])]
+
+
+def memoize(test, to_text):
+    """
+    Проверка значения через его текст с запоминанием результата
+    для каждого уникального значения
+    """
+    cache = {}
+
+    def cached(value):
+        result = cache.get(value)
+        if result is None:
+            result = cache[value] = test(to_text(value))
+        return result
+    return cached
+
+
+def infer_kind(texts) -> str:
+    """
+    Тип столбца по выборке значений: первый тип из bool, int,
+    float, для которого все значения переводятся без потерь, иначе str
+    """
+    if not texts:
+        return "str"
+    for kind in ("bool", "int", "float"):
+        try:
+            COLUMN_TYPES[kind]().parse(texts)
+            return kind
+        except (ValueError, OverflowError):
+            continue
+    return "str"
+
+
+def infer_schema(headers, sample) -> list[str]:
+    """
+    Типы столбцов по первым строкам файла
+    """
+    columns = list(zip_longest(*sample, fillvalue=""))
+    columns += [()] * (len(headers) - len(columns))
+    return [infer_kind(list(texts)) for texts in columns[:len(headers)]]
+
+
+class ColumnTable:
+    """
+    Таблица, хранящая данные по столбцам.
+
+    Атрибуты:
+    - headers: list[str] - заголовки столбцов
+    - columns: list[Column] - столбцы в порядке заголовков
+    - row_count: int - число строк
+    """
+    def __init__(self, headers, columns):
+        self.headers = headers
+        self.columns = columns
+
+    @property
+    def row_count(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    @property
+    def schema(self) -> dict[str, str]:
+        return {header: column.kind
+                for header, column in zip(self.headers, self.columns)}
+
+    @classmethod
+    def from_rows(cls, headers, rows, sample_size=SCHEMA_SAMPLE):
+        """
+        Загрузка строк из csv.reader.
+        Схема определяется по первым sample_size строкам, затем
+        строки переводятся в столбцы блоками по CHUNK_SIZE.
+        Столбец, в котором позже встретилось неподходящее значение,
+        переводится в str.
+        """
+        rows = iter(rows)
+        sample = list(islice(rows, sample_size))
+        columns = [COLUMN_TYPES[kind]()
+                   for kind in infer_schema(headers, sample)]
+        width = len(headers)
+        chunk = sample
+        while chunk:
+            if set(map(len, chunk)) != {width}:
+                # Короткие строки дополняются пустыми ячейками
+                chunk = [(row + [""] * width)[:width] for row in chunk]
+            columns = [column.extend(list(map(itemgetter(index), chunk)))
+                       for index, column in enumerate(columns)]
+            chunk = list(islice(rows, CHUNK_SIZE))
+        return cls(headers, columns)
+
+    def text_rows(self, selection=None, indexes=None) -> list[list[str]]:
+        """
+        Строки в виде текста для вывода.
+        selection - индексы строк, indexes - индексы столбцов.
+        """
+        if indexes is None:
+            indexes = range(len(self.columns))
+        texts = [self.columns[index].texts(selection) for index in indexes]
+        return list(map(list, zip(*texts)))
+
+    def aggregate_rows(self, selection=None, indexes=()):
+        """
+        Строки для агрегации: только столбцы indexes, на месте
+        остальных None. Индексы столбцов совпадают с заголовками.
+        """
+        count = self.row_count if selection is None else len(selection)
+        values = [repeat(None, count) for _ in self.columns]
+        for index in set(indexes):
+            values[index] = self.columns[index].aggregate_values(selection)
+        return zip(*values)
@@ -0,0 +1,133 @@
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+
+from formats import detect_format
+
+CHUNK_SIZE = 1 << 20
+QUEUE_DEPTH = 4
+POLL_SECONDS = 0.1
+
+
+# Чтение сжатых csv файлов без распаковки на диск
+def detect(path) -> str | None:
+    """
+    Формат сжатия файла по первым байтам (formats.detect_format):
+    gzip, bz2, xz, zstd или None для несжатого файла
+    """
+    kind = detect_format(path)
+    return None if kind == "column" else kind
+
+
+def available(kind) -> bool:
+    """
+    Можно ли распаковать формат kind: для zstd нужен zstandard
+    """
+    if kind != "zstd":
+        return True
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def open_binary(path, kind):
+    """
+    Поток распакованных байт файла path в формате kind
+    """
+    if kind == "gzip":
+        return gzip.open(path, "rb")
+    if kind == "bz2":
+        return bz2.open(path, "rb")
+    if kind == "xz":
+        return lzma.open(path, "rb")
+    import zstandard
+    return zstandard.ZstdDecompressor().stream_reader(
+        open(path, "rb"), closefd=True)
+
+
+def open_text(path):
+    """
+    Текстовый файл для csv.reader. Сжатый файл распаковывается
+    потоково в отдельном потоке (ThreadedReader): zlib, bz2, lzma
+    и zstandard отпускают GIL, поэтому распаковка идет одновременно
+    с разбором строк.
+    """
+    kind = detect(path)
+    if kind is None:
+        return open(path, "r", encoding="utf-8")
+    reader = ThreadedReader(open_binary(path, kind))
+    return io.TextIOWrapper(io.BufferedReader(reader, CHUNK_SIZE),
+                            encoding="utf-8")
+
+
+class ThreadedReader(io.RawIOBase):
+    """
+    Чтение из source в фоновом потоке кусками по CHUNK_SIZE.
+    В очереди не больше QUEUE_DEPTH кусков, поэтому память
+    не зависит от размера файла. Ошибка распаковки передается
+    через очередь и бросается при чтении.
+    При закрытии до конца файла поток останавливается.
+
+    Атрибуты:
+    - source - поток распакованных байт
+    """
+    def __init__(self, source, chunk_size=CHUNK_SIZE):
+        super().__init__()
+        self.source = source
+        self.chunk_size = chunk_size
+        self.queue = queue.Queue(QUEUE_DEPTH)
+        self.stopped = threading.Event()
+        self.pending = memoryview(b"")
+        self.finished = False
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+
+    def _produce(self) -> None:
+        try:
+            while not self.stopped.is_set():
+                chunk = self.source.read(self.chunk_size)
+                self._put(chunk)
+                if not chunk:
+                    return
+        except Exception as error:
+            self._put(error)
+
+    def _put(self, item) -> None:
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self.pending:
+            if self.finished:
+                return 0
+            item = self.queue.get()
+            if isinstance(item, Exception):
+                self.finished = True
+                raise item
+            if not item:
+                self.finished = True
+                return 0
+            self.pending = memoryview(item)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self.stopped.set()
+            self.thread.join()
+            self.source.close()
+        super().close()
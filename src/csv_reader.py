@@ -1,8 +1,88 @@
+import argparse
+import copy
 import csv
+import fnmatch
+import glob
 import os
 import re
+import sys
+import time
+import warnings
+from contextlib import contextmanager, nullcontext
+from itertools import chain, count, islice
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Iterator
 
-from tabulate import tabulate
+from aggregators import NotNumericError, create_aggregator
+from filters import (ColumnNotFoundError, ExpressionError, Node,
+                     compile_expression)
+from formats import detect_format
+from mmap_reader import decode_row, iter_records, open_mmap
+from ordering import top_rows
+from output import WRITERS, ArrowWriter, GridWriter, peek
+
+# Модули колоночного файла, сжатия, индексов, групп, --stats, кеша,
+# --sample и --follow загружаются в методах, которые их используют:
+# запрос к обычному csv файлу их не импортирует
+if TYPE_CHECKING:
+    from column_file import ColumnFile
+    from columnar import ColumnTable
+    from grouping import GroupedAggregation
+    from table_cache import MemoryTables, TableCache
+
+
+# Файлы, которые читаются из папки --file
+CSV_SUFFIXES = ("*.csv", "*.csv.gz", "*.csv.bz2", "*.csv.xz", "*.csv.zst")
+# Файлы, которые читаются по шаблону --file: еще колоночный файл
+# (column_file.SUFFIX), но не индексы .csv.index рядом с csv файлами
+PATTERN_SUFFIXES = CSV_SUFFIXES + ("*.csvc",)
+
+# Выражение --aggregate: column=value
+AGGREGATE_PATTERN = re.compile(
+    r"^(?P<column>[a-zA-Z0-9_ ]+)=(?P<value>[a-z0-9_]+)$")
+
+
+def tabulate(*args, **kwargs) -> str:
+    """
+    tabulate загружается при первом выводе таблицы, а не при импорте:
+    импорт tabulate дольше, чем короткий запрос с --format csv
+    """
+    from tabulate import tabulate as format_table
+    return format_table(*args, **kwargs)
+
+
+class QueryError(ValueError):
+    """Ошибка в запросе: неверное выражение, нет столбца или файла"""
+
+
+# Параметры запроса по умолчанию, как у аргументов main.py
+DEFAULT_OPTIONS = {
+    "where": None,
+    "aggregate": None,
+    "select": None,
+    "group_by": None,
+    "order_by": None,
+    "limit": None,
+    "max_groups": None,
+    "jobs": None,
+    "engine": "python",
+    "mmap": False,
+    "cache": True,
+    "cache_dir": None,
+    "stream": False,
+    "format": "grid",
+    "follow": False,
+    "interval": 1.0,
+    "stats": None,
+    "trace_memory": False,
+    "profile": None,
+    "sample": None,
+    "approx": False,
+    "seed": None,
+}
+
+# Доля файла для --approx без --sample
+APPROX_SAMPLE = "1%"
 
 
 # Класс для чтения CSV файлов
@@ -10,133 +90,1371 @@ class CSVReader:
     """
     Класс для чтения CSV файлов.
     Атрибуты:
-    - path: str - путь к csv файлу
+    - path: str | list[str] - путь к csv файлу, шаблон вида
+      "export-*.csv", папка или список из них
     - args: argparse.Namespace - аргументы командной строки
     - headers: list[str] - заголовки столбцов
     - data: list[list[str]] - данные из csv файла
+    - exit_on_error: bool - печатать ошибку и завершать программу
+      (командная строка) или бросать QueryError (библиотека)
+    - tables: MemoryTables | None - таблицы в памяти сервера (serve)
+    - sample: dict | None - сколько блоков и строк прочитано
+      с --sample или --approx
+
+    Использование из кода без argparse: методы where, select,
+    aggregate, group_by, order_by, limit и options возвращают новый
+    запрос, не читая файл. Файл читается за один проход только
+    в collect или iter_rows:
+
+        CSVReader("data.csv").where("price>500").group_by("brand") \
+            .aggregate("rating=avg").collect()
 
     Методы:
-    - __init__(self, path, args) - инициализация класса
+    - __init__(self, path, args, tables) - инициализация класса
+    - where, select, aggregate, group_by, order_by, limit, options -
+      построение запроса
+    - collect(self) - строки результата списком
+    - iter_rows(self) - строки результата по мере чтения
+    - columns(self) - заголовки результата
     - read(self) - чтение csv файла и печать в табличном виде
-    - _get_path(self) - получение пути к csv файлу
-    - _filter(self, expression) - фильтрация данных
-    - _aggregate(self, expression) - агрегация данных
+    - measured(self) - замер запроса (--stats) и профиль (--profile)
+    - _print_rows(self, rows) - печать строк в формате --format
+    - follow(self, updates) - слежение за дописываемым файлом (--follow)
+    - _follow_state(self) - пустое состояние агрегации для --follow
+    - _follow_rows(self, lines) - фильтр и выбор столбцов новых строк
+    - _print_new_rows(self, rows, force) - печать новых строк
+    - _output_writer(self) - потоковый вывод для --format и --stream
+    - _read_paths(self) - строки результата для всех файлов
+    - _read_rows(self, path) - строки результата выбранным способом
+    - _open_text(self, path) - текстовый файл, сжатый или нет
+    - _read_text(self, path) - потоковое чтение через csv.reader
+    - build_index(self, expression) - построение индексов столбцов
+    - _indexed_rows(self, path) - строки блоков, выбранных индексом
+    - _process(self, rows, raw) - фильтр, агрегация и выбор столбцов
+    - _read_parallel(self, paths, jobs) - чтение файлов в несколько процессов
+    - _read_mmap(self, path) - чтение файла через mmap без разбора
+      и декодирования отброшенных строк
+    - _sample_fraction(self) - доля файла для --sample и --approx
+    - _read_sample(self, paths) - чтение случайных блоков файлов
+    - _sample_rows(self, blocks, per_block) - строки выбранных блоков
+    - _add_block_totals(totals, part) - суммы агрегаций блока
+    - _sample_result(self, aggregation, totals, sampled, blocks) - оценки
+      агрегаций с доверительными интервалами
+    - _print_sample(self) - печать объема выборки в stderr
+    - sample_summary(self) - сколько прочитано в выборке
+    - _read_column_file(self, path) - запрос к колоночному файлу
+      (main.py convert)
+    - _column_chunks(self, column_file, node, indexes) - блоки
+      колоночного файла, в которых могут быть подходящие строки
+    - _read_columnar(self, path) - чтение в колоночную таблицу с типами
+      (с --engine numpy фильтр и агрегация векторные)
+    - _load_table(self, path) - загрузка колоночной таблицы через кеш
+    - _table_cache(self) - кеш таблиц на диске или в памяти сервера
+    - _order_selection(self, table, selection) - сортировка строк таблицы
+    - _parse_columns(self, expression, argument) - разбор списка столбцов
+    - _parse_order(self, expression, headers) - разбор --order-by
+    - _limit(self) - проверка --limit
+    - _order_rows(self, rows) - сортировка потока строк и --limit
+    - _order_result(self, data) - сортировка результата агрегации
+    - _project(rows, indexes) - выбор столбцов из строк
+    - _output_headers(self) - заголовки таблицы для вывода
+    - _get_paths(self) - пути к csv файлам после раскрытия шаблонов и папок
+    - _get_path(self) - получение пути к csv файлу (первому из них)
+    - _filter(self, expression, data) - фильтрация данных (список)
+    - _iter_filter(self, expression, rows) - потоковая фильтрация строк
+    - _compile_filter(self, expression, raw) - разбор выражения фильтра
+    - _aggregate(self, expression, rows, raw) - агрегация данных за один
+      проход (аккумуляторы из модуля aggregators, группы из grouping)
+    - _build_aggregation(self, expression) - разбор --aggregate и --group-by
+    - _run_aggregation(self, aggregation, rows, raw) - агрегация строк
+    - _run_vectorized(self, aggregation, table, selection) - векторная
+      агрегация колоночной таблицы
+
+    Строки читаются потоково: фильтр - это генератор поверх csv.reader,
+    а агрегация потребляет его, не сохраняя строки в памяти.
+    Весь результат в памяти собирается только для вывода таблицы
+    через tabulate, с --stream строки печатаются по мере чтения.
 
     Чтобы расширить функционал, нужно добавить новые внутренние методы.
     Затем добавить их в метод read.
     """
-    def __init__(self, path, args):
+    def __init__(self, path, args=None, tables=None):
         self.path = path
-        self.args = args
+        self.headers = None
+        self.stats = None
+        # Таблицы в памяти сервера (table_cache.MemoryTables) вместо
+        # кеша на диске для --engine columnar и numpy
+        self.tables = tables
+        self.sample = None
+        # Без аргументов командной строки это запрос из кода:
+        # ошибки не завершают программу, а бросаются как QueryError
+        self.exit_on_error = args is not None
+        self.args = args or argparse.Namespace(**DEFAULT_OPTIONS)
+        # Параметров, которых нет в переданных аргументах (например,
+        # в Namespace из старого кода), - значения по умолчанию
+        for name, default in DEFAULT_OPTIONS.items():
+            if name not in vars(self.args):
+                setattr(self.args, name, default)
+
+    def where(self, *expressions) -> "CSVReader":
+        """
+        Фильтр, как --where. Несколько условий объединяются через AND.
+        """
+        return self._with(
+            where=self._listed(self.args.where) + list(expressions))
+
+    def select(self, *columns) -> "CSVReader":
+        """
+        Вывод только указанных столбцов, как --select
+        """
+        return self._with(select=",".join(columns))
+
+    def aggregate(self, *expressions) -> "CSVReader":
+        """
+        Агрегации вида "column=value", как --aggregate
+        """
+        return self._with(
+            aggregate=self._listed(self.args.aggregate) + list(expressions))
+
+    def group_by(self, *columns) -> "CSVReader":
+        """
+        Группировка агрегации по столбцам, как --group-by
+        """
+        return self._with(group_by=",".join(columns))
+
+    def order_by(self, *columns) -> "CSVReader":
+        """
+        Сортировка по столбцам вида "price:desc", как --order-by
+        """
+        return self._with(order_by=",".join(columns))
+
+    def limit(self, count) -> "CSVReader":
+        """
+        Не больше count строк результата, как --limit
+        """
+        return self._with(limit=count)
+
+    def options(self, **options) -> "CSVReader":
+        """
+        Остальные параметры чтения: engine, jobs, mmap, max_groups,
+        cache, cache_dir (см. DEFAULT_OPTIONS)
+        """
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise TypeError(
+                f"Неизвестные параметры: {', '.join(sorted(unknown))}")
+        return self._with(**options)
+
+    @staticmethod
+    def _listed(expressions) -> list[str]:
+        """
+        Условия --where или --aggregate списком: в options их можно
+        передать одной строкой
+        """
+        if expressions is None:
+            return []
+        if isinstance(expressions, str):
+            return [expressions]
+        return list(expressions)
+
+    def _with(self, **changes) -> "CSVReader":
+        """
+        Копия запроса с измененными параметрами
+        """
+        options = {name: getattr(self.args, name, default)
+                   for name, default in DEFAULT_OPTIONS.items()}
+        options.update(changes)
+        reader = CSVReader(self.path, argparse.Namespace(**options),
+                           self.tables)
+        reader.exit_on_error = self.exit_on_error
+        return reader
+
+    def collect(self) -> list[list[str]]:
+        """
+        Выполнение запроса: все строки результата списком
+        """
+        return list(self.iter_rows())
+
+    def iter_rows(self) -> Iterator[list[str]]:
+        """
+        Выполнение запроса: строки результата по мере чтения файла.
+        Ошибки в запросе проявляются сразу, до получения строк.
+        """
+        return peek(self._read_paths())
+
+    def files(self) -> list[str]:
+        """
+        Файлы запроса: шаблоны и папки заменены найденными файлами
+        """
+        return self._get_paths()
+
+    def columns(self) -> list[str]:
+        """
+        Заголовки результата: столбцы файла, --select или
+        столбцы группировки и агрегации
+        """
+        if self.headers is None:
+            path = self._get_path()
+            if detect_format(path) == "column":
+                self.headers = self._open_column_file(path).headers
+            else:
+                with self._open_text(path) as file:
+                    self.headers = next(csv.reader(file), [])
+        return self._output_headers()
+
+    def _fail(self, message) -> None:
+        """
+        Ошибка в запросе: в командной строке - печать и выход с кодом 1,
+        в коде - исключение QueryError
+        """
+        if self.exit_on_error:
+            print(message)
+            exit(1)
+        raise QueryError(str(message)) from None
+
+    def _notice(self, message) -> None:
+        """
+        Предупреждение, которое не мешает выполнить запрос
+        """
+        if self.exit_on_error:
+            print(message, file=sys.stderr)
+        else:
+            warnings.warn(message, RuntimeWarning, stacklevel=3)
 
     def read(self) -> None:
         """
-        Чтение csv файла и печать в табличном виде
+        Чтение csv файла и печать в табличном виде.
+        С --stream и в форматах --format csv, tsv, jsonl, arrow строки
+        печатаются по мере чтения (модуль output), иначе tabulate
+        получает весь результат сразу.
         """
-        path = self._get_path()
-        with open(path, "r", encoding="utf-8") as file:
+        with self.measured() as stage:
+            with stage("read"):
+                rows = self._read_paths()
+            with stage("output"):
+                self._print_rows(rows)
+
+    @contextmanager
+    def measured(self) -> Iterator:
+        """
+        Замер запроса, выполняемого внутри блока with: этапы --stats
+        (модуль stats) и профиль cProfile в файл (--profile).
+        Возвращает функцию, которая создает этап, например,
+        with stage("output"). Отчет печатается в stderr после блока,
+        чтобы не смешиваться с результатом. Без --stats и --profile
+        этапы - пустые контексты.
+        """
+        if self.args.stats:
+            from stats import Stats
+            self.stats = Stats(self.args.trace_memory)
+            self.stats.start()
+        profiler = None
+        if self.args.profile:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            yield self._timed
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(self.args.profile)
+            if self.stats is not None:
+                self.stats.stop()
+        if self.stats is not None:
+            self._print_stats()
+
+    def _print_stats(self) -> None:
+        """
+        Печать статистики этапов таблицей или в JSON (--stats json)
+        """
+        if self.args.stats == "json":
+            print(self.stats.to_json(), file=sys.stderr)
+            return
+        report = self.stats.report()
+        total = report["total"]
+        print(tabulate(
+            [[stage["stage"], stage["wall_seconds"], stage["cpu_seconds"],
+              stage["rows_in"], stage["rows_out"], stage["rows_per_second"]]
+             for stage in report["stages"]] +
+            [["total", total["wall_seconds"], total["cpu_seconds"],
+              total["rows"], None, total["rows_per_second"]]],
+            headers=["stage", "wall, s", "cpu, s", "rows in", "rows out",
+                     "rows/s"],
+            tablefmt="grid", floatfmt=".4g"), file=sys.stderr)
+        memory = [f"Прочитано байт: {total['bytes_read']}"]
+        if total["peak_rss_bytes"] is not None:
+            memory.append(f"пик памяти процесса: {total['peak_rss_bytes']} байт")
+        if total["peak_memory_bytes"] is not None:
+            memory.append(
+                f"пик памяти tracemalloc: {total['peak_memory_bytes']} байт")
+        print(", ".join(memory), file=sys.stderr)
+
+    def _timed(self, name):
+        """
+        Этап --stats, выполняемый внутри блока with.
+        Без --stats - пустой контекст со счетчиком, который не печатается
+        (модуль stats при этом не загружается).
+        """
+        if self.stats is None:
+            return nullcontext(SimpleNamespace(rows=None))
+        return self.stats.stage(name)
+
+    def _stage(self, name, rows):
+        """
+        Этап-поток --stats: время и число строк rows. Без --stats - rows.
+        """
+        if self.stats is None:
+            return rows
+        return self.stats.count(name, rows)
+
+    def _count_bytes(self, path, file=None) -> None:
+        """
+        Учет прочитанных байт для --stats: позиция в файле file,
+        если ее можно узнать, иначе размер файла
+        """
+        if self.stats is None:
+            return
+        try:
+            size = file.buffer.tell()
+        except (AttributeError, OSError, ValueError):
+            size = os.path.getsize(path)
+        self.stats.bytes_read += size
+
+    def _print_rows(self, rows, writer=None) -> None:
+        """
+        Печать строк в формате --format (с --stream - по мере чтения).
+        writer - вывод, созданный заранее: --follow печатает новые
+        строки в один и тот же вывод, заголовки csv - один раз.
+        """
+        if writer is None:
+            writer = self._output_writer()
+        if writer is not None:
+            writer.write(rows, self._output_headers)
+            return
+        data = list(rows)
+        print(tabulate(data, headers=self._output_headers(), tablefmt="grid"))
+
+    def follow(self, updates=None) -> None:
+        """
+        Слежение за файлом, в который дописывает другой процесс (--follow).
+        Сначала читается весь файл, затем раз в --interval секунд
+        разбираются только дописанные целые записи (модуль follow).
+        С --aggregate состояние агрегации то же, что у _aggregate,
+        оно дополняется новыми строками, и после каждого изменения
+        печатается обновленный результат. Без агрегации печатаются
+        новые подходящие строки, --limit ограничивает их общее число:
+        после limit строк слежение заканчивается. --order-by без
+        агрегации не поддерживается: строки печатаются по мере дозаписи.
+        Если файл стал короче, он читается заново.
+        updates - сколько раз проверить файл (None - до Ctrl+C).
+        """
+        paths = self._get_paths()
+        if len(paths) > 1 or detect_format(paths[0]) is not None:
+            self._fail("--follow работает только с одним несжатым csv файлом")
+        if self._sample_fraction() is not None:
+            self._fail("--sample и --approx не работают с --follow")
+        if self.args.order_by and not self.args.aggregate:
+            self._fail("--order-by работает с --follow только вместе "
+                       "с --aggregate: новые строки печатаются по мере "
+                       "дозаписи")
+        limit = self._limit()
+        writer = None if self.args.aggregate else self._output_writer()
+        from follow import FileTail
+        tail = FileTail(paths[0])
+        aggregation = None
+        checks = printed = 0
+        try:
+            while True:
+                if tail.truncated():
+                    self._notice("Файл стал короче, чтение с начала")
+                    tail = FileTail(tail.path)
+                    self.headers = None
+                offset = tail.offset
+                lines = tail.read()
+                if self.headers is None:
+                    self.headers = next(csv.reader(lines), None)
+                    if self.headers is not None:
+                        aggregation = self._follow_state()
+                if self.headers is not None:
+                    rows = self._follow_rows(lines)
+                    if aggregation is None:
+                        if limit is not None:
+                            rows = islice(rows, limit - printed)
+                        printed += self._print_new_rows(
+                            rows, writer, force=checks == 0)
+                        if limit is not None and printed >= limit:
+                            return
+                    else:
+                        try:
+                            aggregation.add_rows(rows)
+                        except NotNumericError:
+                            self._fail("Агрегация поддерживается только для чисел")
+                        if checks == 0 or tail.offset != offset:
+                            self._print_rows(self._order_result(
+                                self._aggregate_result(aggregation)))
+                checks += 1
+                if updates is not None and checks >= updates:
+                    return
+                time.sleep(self.args.interval)
+        except KeyboardInterrupt:
+            return
+
+    def _follow_state(self) -> "GroupedAggregation | None":
+        """
+        Проверка запроса для --follow и пустое состояние агрегации.
+        Группы не сбрасываются на диск (--max-groups): результат
+        печатается много раз, а сброшенные группы читаются один раз.
+        """
+        if self.args.where:
+            self._compile_filter(self.args.where)
+        if not self.args.aggregate:
+            if self.args.select:
+                self._parse_columns(self.args.select, "--select")
+            return None
+        aggregation = self._build_aggregation(self.args.aggregate)
+        aggregation.max_groups = float("inf")
+        return aggregation
+
+    def _follow_rows(self, lines) -> Iterator[list[str]]:
+        """
+        Новые строки для --follow после фильтра, без агрегации -
+        только столбцы --select
+        """
+        rows = csv.reader(lines)
+        if self.args.where:
+            rows = self._compile_filter(self.args.where).filter(rows)
+        if self.args.select and not self.args.aggregate:
+            rows = self._project(
+                rows, self._parse_columns(self.args.select, "--select"))
+        return rows
+
+    def _print_new_rows(self, rows, writer=None, force=False) -> int:
+        """
+        Печать новых строк в writer, если они есть (force - даже
+        пустой таблицы). Возвращает число напечатанных строк.
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            if force:
+                self._print_rows([], writer)
+            return 0
+        # zip берет значение счетчика только после строки,
+        # поэтому после печати следующее значение - число строк
+        counter = count()
+        self._print_rows((row for row, _ in zip(chain([first], rows),
+                                                counter)), writer)
+        return next(counter)
+
+    def _output_writer(self):
+        """
+        Потоковый вывод для --format и --stream или None для tabulate
+        """
+        output_format = self.args.format
+        if output_format == "grid":
+            return GridWriter(sys.stdout) if self.args.stream else None
+        if output_format == "arrow":
+            try:
+                return ArrowWriter(sys.stdout.buffer)
+            except ImportError:
+                self._fail("Для --format arrow нужен pyarrow: pip install pyarrow")
+        return WRITERS[output_format](sys.stdout)
+
+    def _read_paths(self) -> Iterator[list[str]]:
+        """
+        Строки результата для всех файлов --file.
+        Несколько файлов читаются как один: каждый делится на диапазоны,
+        которые обрабатываются в jobs процессах (по умолчанию по числу
+        файлов, но не больше числа ядер), частичные агрегации
+        объединяются. --engine, --mmap и индексы используются только
+        для одного файла.
+        """
+        paths = self._get_paths()
+        if any(detect_format(path) == "column" for path in paths):
+            if len(paths) > 1:
+                self._fail("Колоночный файл можно читать только отдельно "
+                           "от других файлов")
+            return self._read_column_file(paths[0])
+        if self._sample_fraction() is not None:
+            return self._read_sample(paths)
+        if len(paths) == 1:
+            return self._read_rows(paths[0])
+        if self.args.engine != "python" or self.args.mmap:
+            self._notice("--engine и --mmap не используются "
+                         "для нескольких файлов")
+        jobs = self.args.jobs or min(len(paths), os.cpu_count() or 1)
+        return iter(self._read_parallel(paths, jobs))
+
+    def _read_rows(self, path) -> Iterator[list[str]]:
+        """
+        Строки результата выбранным способом чтения.
+        Заголовки известны после получения первой строки.
+        """
+        if self.args.engine in ("columnar", "numpy"):
+            return iter(self._read_columnar(path))
+        if detect_format(path) is not None:
+            # Сжатый файл нельзя делить по смещениям и отображать
+            # в память: он читается потоково через распаковку
+            if (self.args.jobs and self.args.jobs > 1) or self.args.mmap:
+                self._notice("--jobs и --mmap не используются "
+                             "для сжатого файла")
+            return self._read_text(path)
+        if self.args.jobs and self.args.jobs > 1:
+            return iter(self._read_parallel([path], self.args.jobs))
+        if self.args.mmap:
+            return self._read_mmap(path)
+        return self._read_text(path)
+
+    def _open_text(self, path):
+        """
+        Текстовый файл для csv.reader. Модуль compression загружается
+        только для сжатого файла.
+        """
+        if detect_format(path) is None:
+            return open(path, "r", encoding="utf-8")
+        from compression import open_text
+        return open_text(path)
+
+    def _read_text(self, path) -> Iterator[list[str]]:
+        """
+        Потоковое чтение csv файла через csv.reader
+        """
+        with self._open_text(path) as file:
             reader = csv.reader(file)
             self.headers = next(reader)
-            data = [row for row in reader]
-            if self.args.where:
-                data = self._filter(self.args.where, data)
-            if self.args.aggregate:
-                data = self._aggregate(self.args.aggregate, data)
-        print(tabulate(data, headers=self.headers, tablefmt="grid"))
+            try:
+                yield from self._process(self._indexed_rows(path) or reader)
+            finally:
+                self._count_bytes(path, file)
 
-    def _get_path(self) -> str:
+    def build_index(self, expression) -> None:
         """
-        Получение пути к csv файлу
+        Построение индексов столбцов (--build-index) в файл рядом
+        с каждым csv файлом и печать списка построенных индексов
         """
-        if not os.path.exists(self.path):
-            print(f"Файл {self.path} не найден")
-            exit(1)
-        return self.path
+        from indexes import FileIndex, IndexBuildError
+        for path in self._get_paths():
+            kind = detect_format(path)
+            if kind == "column":
+                self._fail(f"Индекс не нужен колоночному файлу {path}: "
+                           f"для его блоков уже есть минимум и максимум")
+            if kind is not None:
+                self._fail(f"Индекс нельзя построить для сжатого файла {path}")
+            with self._open_text(path) as file:
+                self.headers = next(csv.reader(file), [])
+            columns = [self.headers[index] for index in
+                       self._parse_columns(expression, "--build-index")]
+            try:
+                index = FileIndex.build(path, columns)
+            except IndexBuildError as error:
+                self._fail(error)
+            index.save(path)
+            print(tabulate(index.describe(),
+                           headers=["column", "index", "size"],
+                           tablefmt="grid"))
 
-    def _filter(self, expression, data) -> list[list[str]]:
+    def _indexed_rows(self, path) -> Iterator[list[str]] | None:
         """
-        Фильтрация данных
+        Строки только из блоков, которые выбрал индекс (модуль indexes),
+        или None, если индекса нет или он не помогает для --where.
+        Устаревший индекс не используется.
         """
-        # Проверяем выражение
-        valid_exp_pattern = (r"^(?P<column>[a-zA-Z0-9_ ]+)"
-                             r"(?P<operator>[<>=])"
-                             r"(?P<value>[a-zA-Z0-9\._ ]+)$")
-        if (not isinstance(expression, str)
-                or not re.match(valid_exp_pattern, expression)):
-            print('Укажите значение для аргумента --where в формате: "column+value". '
-                  'Можно использовать операторы <, >, =')
-            exit(1)
+        if not self.args.where or detect_format(path) is not None:
+            return None
+        from indexes import FileIndex, read_ranges
+        index = FileIndex.load(path)
+        if index is None:
+            return None
+        if not index.fresh(path):
+            self._notice("Индекс устарел, файл читается целиком. "
+                         "Постройте его заново через --build-index")
+            return None
+        ranges = index.ranges(self._compile_filter(self.args.where))
+        if ranges is None:
+            return None
+        if self.stats is not None:
+            self.stats.bytes_read += sum(end - start for start, end in ranges)
+        return csv.reader(read_ranges(path, ranges))
 
-        # Получаем столбец, оператор и значение
-        column, operator, value = (
-            re.match(valid_exp_pattern, expression).groups())
+    def _process(self, rows, raw=False) -> Iterator[list[str]]:
+        """
+        Фильтрация, агрегация, сортировка и выбор столбцов
+        для потока строк. Результат - тоже поток строк.
+        raw=True - строки из байтовых полей (mmap), они декодируются
+        только после фильтра и выбора столбцов.
+        """
+        rows = self._stage("parse", rows)
+        if self.args.where:
+            rows = self._stage(
+                "filter",
+                self._compile_filter(self.args.where, raw).filter(rows))
+        if self.args.aggregate:
+            # Агрегация потребляет поток строк за один проход
+            with self._timed("aggregate"):
+                data = self._order_result(
+                    self._aggregate(self.args.aggregate, rows, raw))
+            return self._stage("aggregate", data)
+        if self.args.order_by or self.args.limit is not None:
+            with self._timed("order"):
+                rows = self._stage("order", self._order_rows(rows))
+        if self.args.select:
+            rows = self._stage("select", self._project(
+                rows, self._parse_columns(self.args.select, "--select")))
+        if raw:
+            rows = self._stage("decode", map(decode_row, rows))
+        return rows
 
-        # Проверяем столбец и оператор
-        if column not in self.headers:
-            print(f"Колонка {column} не найдена")
-            exit(1)
-        if operator not in ["<", ">", "="]:
-            print(f"Оператор {operator} не поддерживается")
-            exit(1)
-        
-        # Фильтруем данные
-        if operator == "<":
-            try:
-                return [row for row in data if float(row[self.headers.index(column)]) < float(value)]
-            except ValueError:
-                return [row for row in data if row[self.headers.index(column)] < value]
-        elif operator == ">":
+    def _read_parallel(self, paths, jobs) -> Iterator[list[str]]:
+        """
+        Чтение csv файлов в несколько процессов (модуль parallel).
+        Заголовки всех файлов должны совпадать, пустые файлы
+        пропускаются. Выражения проверяются заранее, чтобы ошибки
+        выводились один раз, а не в каждом процессе. Без агрегации
+        строки выводятся по мере обработки диапазонов.
+        """
+        headers = {}
+        for path in paths:
+            with self._open_text(path) as file:
+                file_headers = next(csv.reader(file), None)
+            if file_headers is not None:
+                headers[path] = file_headers
+        if not headers:
+            self.headers = []
+            return []
+        paths = list(headers)
+        self.headers = headers[paths[0]]
+        for path in paths[1:]:
+            if headers[path] != self.headers:
+                self._fail(f"Заголовки файла {path} не совпадают "
+                           f"с заголовками {paths[0]}")
+        where = self.args.where
+        if where:
+            self._compile_filter(where)
+        aggregate = select = order = None
+        limit = self._limit()
+        if self.args.aggregate:
+            aggregate = self._build_aggregation(self.args.aggregate)
+        else:
+            if self.args.select:
+                select = self._parse_columns(self.args.select, "--select")
+            if self.args.order_by:
+                order = self._parse_order(self.args.order_by, self.headers)
+        for path in paths:
+            self._count_bytes(path)
+        from parallel import scan_parallel
+        if aggregate:
             try:
-                return [row for row in data if float(row[self.headers.index(column)]) > float(value)]
-            except ValueError:
-                return [row for row in data if row[self.headers.index(column)] > value]
-        elif operator == "=":
-            return [row for row in data if row[self.headers.index(column)] == value]
+                with self._timed("scan"):
+                    result = scan_parallel(paths, self.headers, jobs, where,
+                                           aggregate)
+            except NotNumericError:
+                self._fail("Агрегация поддерживается только для чисел")
+            return self._order_result(self._aggregate_result(result))
+        # Строки отдаются по мере обработки диапазонов. С сортировкой
+        # процессы возвращают первые limit строк целиком: столбцы
+        # сортировки нужны для слияния
+        rows = self._stage("scan", scan_parallel(
+            paths, self.headers, jobs, where, None,
+            None if order else select, order, limit))
+        if order:
+            rows = top_rows(rows, order, limit)
+            if select:
+                rows = self._project(rows, select)
+        elif limit is not None:
+            rows = islice(rows, limit)
+        return rows
+
+    def _sample_fraction(self) -> float | None:
+        """
+        Доля файла для --sample (--approx - APPROX_SAMPLE)
+        или None, если читается весь файл
+        """
+        value = self.args.sample
+        if value is None:
+            value = APPROX_SAMPLE if self.args.approx else None
+        if value is None:
+            return None
+        from sampling import parse_fraction
+        try:
+            return parse_fraction(value)
+        except ValueError:
+            self._fail('Укажите значение для аргумента --sample в формате: '
+                       '"1%" или "0.01" (доля файла от 0 до 1)')
+
+    def _read_sample(self, paths) -> Iterator[list[str]]:
+        """
+        Чтение случайной доли файлов (--sample, --approx, модуль sampling).
+        Файлы делятся на блоки байт, читаются только случайно выбранные
+        блоки, остальная часть файлов не читается вовсе.
+        Без агрегации печатаются строки выборки.
+        С агрегацией count и sum пересчитываются на весь файл, а для
+        count, sum и avg в столбце "<агрегация> ±" выводится половина
+        95% доверительного интервала. Интервал считается по разбросу
+        значений между блоками, поэтому учитывает, что строки
+        одного блока похожи друг на друга. Остальные агрегации
+        считаются только по выборке.
+        """
+        from sampling import choose_blocks, read_header
+        fraction = self._sample_fraction()
+        if self.args.engine != "python" or self.args.mmap \
+                or (self.args.jobs and self.args.jobs > 1):
+            self._notice("--engine, --jobs и --mmap не используются "
+                         "с --sample и --approx")
+        files = []
+        for path in paths:
+            if detect_format(path) is not None:
+                self._fail(f"Выборку нельзя сделать из сжатого файла {path}: "
+                           f"его нельзя читать с произвольного места")
+            with open(path, "rb") as file:
+                headers, data_start = read_header(file)
+            if headers is None:
+                continue
+            if self.headers is None:
+                self.headers = headers
+            elif headers != self.headers:
+                self._fail(f"Заголовки файла {path} не совпадают "
+                           f"с заголовками {files[0][0]}")
+            files.append((path, data_start, os.path.getsize(path)))
+        if self.headers is None:
+            self.headers = []
+            return iter([])
+        blocks, total = choose_blocks(files, fraction, self.args.seed)
+        self.sample = {"blocks": len(blocks), "total_blocks": total,
+                       "bytes": sum(end - start for _, start, end in blocks),
+                       "rows": 0, "skipped": 0}
+        if self.stats is not None:
+            self.stats.bytes_read += self.sample["bytes"]
+        if not self.args.aggregate:
+            return self._process(self._sample_rows(blocks))
 
+        node = None
+        if self.args.where:
+            node = self._compile_filter(self.args.where)
+        aggregation = self._build_aggregation(self.args.aggregate)
+        empty = copy.deepcopy(aggregation)
+        totals = {}
+        with self._timed("aggregate"):
+            for rows in self._sample_rows(blocks, per_block=True):
+                # Каждый блок агрегируется отдельно: по суммам блоков
+                # считается разброс, затем блок добавляется к общему
+                part = copy.deepcopy(empty)
+                rows = self._stage("parse", rows)
+                if node is not None:
+                    rows = self._stage("filter", node.filter(rows))
+                try:
+                    part.add_rows(rows)
+                except NotNumericError:
+                    self._fail("Агрегация поддерживается только для чисел")
+                self._add_block_totals(totals, part)
+                aggregation.merge(part)
+            data = self._order_result(
+                self._sample_result(aggregation, totals, len(blocks), total))
+        self._print_sample()
+        return self._stage("aggregate", data)
+
+    def _sample_rows(self, blocks, per_block=False):
+        """
+        Строки выбранных блоков по порядку. per_block=True - отдельный
+        поток строк на каждый блок. После последнего блока печатается,
+        сколько прочитано.
+        """
+        from sampling import read_block, read_header
+        width = len(self.headers)
+        path = file = None
+        try:
+            for block_path, start, end in blocks:
+                if block_path != path:
+                    if file is not None:
+                        file.close()
+                    path, file = block_path, open(block_path, "rb")
+                    _, data_start = read_header(file)
+                skipped = [0]
+                rows = self._count_sample(
+                    read_block(file, start, end, width, data_start,
+                               skipped), skipped)
+                if per_block:
+                    yield rows
+                else:
+                    yield from rows
+        finally:
+            if file is not None:
+                file.close()
+            if not per_block:
+                self._print_sample()
+
+    def _count_sample(self, rows, skipped) -> Iterator[list[str]]:
+        """
+        Строки блока с подсчетом прочитанных и пропущенных
+        (skipped[0] из read_block) строк выборки
+        """
+        for row in rows:
+            self.sample["rows"] += 1
+            yield row
+        self.sample["skipped"] += skipped[0]
+
+    @staticmethod
+    def _add_block_totals(totals, part) -> None:
+        """
+        Число значений и сумма каждой агрегации каждой группы блока
+        """
+        from sampling import BlockTotals
+        for key, aggregators in part.groups.items():
+            group = totals.get(key)
+            if group is None:
+                group = totals[key] = [BlockTotals() for _ in aggregators]
+            for block_totals, aggregator in zip(group, aggregators):
+                count = getattr(aggregator, "count", 0)
+                block_totals.add(count, getattr(aggregator, "total", count))
+
+    def _sample_result(self, aggregation, totals, sampled,
+                       blocks) -> list[list[str]]:
+        """
+        Результат агрегации по выборке: для count, sum и avg -
+        оценка для всего файла и половина 95% доверительного интервала
+        """
+        from sampling import ESTIMATED, BlockTotals
+        data = []
+        for key, aggregators in aggregation.items():
+            row = list(key)
+            group = totals.get(key) or [BlockTotals() for _ in aggregators]
+            for (_, name), aggregator, block_totals in zip(
+                    aggregation.specs, aggregators, group):
+                if name not in ESTIMATED:
+                    result = aggregator.result()
+                    row.append("Нет данных" if result is None else str(result))
+                    continue
+                if name == "avg":
+                    value, error = block_totals.estimate_mean(sampled, blocks)
+                else:
+                    value, error = block_totals.estimate_total(
+                        sampled, blocks, "count" if name == "count" else "total")
+                if name == "count":
+                    value = round(value)
+                    error = None if error is None else round(error)
+                elif name == "avg" and value is not None:
+                    value = round(value, 2)
+                if name == "sum" and not block_totals.count:
+                    value = None
+                for result in (value, error):
+                    if isinstance(result, float):
+                        result = round(result, 2)
+                    row.append("Нет данных" if result is None else str(result))
+            data.append(row)
         return data
 
-    def _aggregate(self, expression, data) -> list[list[str]]:
+    def _print_sample(self) -> None:
         """
-        Агрегация данных
+        Сколько прочитано в выборке (в stderr, только в командной строке)
         """
-        # Проверяем выражение
-        valid_exp_pattern = r"^(?P<column>[a-zA-Z0-9_ ]+)=(?P<value>min|avg|max)$"
-        if not isinstance(expression, str) or not re.match(valid_exp_pattern, expression):
-            print('Укажите значение для аргумента --aggregate в формате: "column=value". '
-                  'value может быть min, avg, max')
-            exit(1)
+        if self.exit_on_error:
+            print(self.sample_summary(), file=sys.stderr)
 
-        # Получаем столбец и значение
-        column, value = re.match(valid_exp_pattern, expression).groups()
+    def sample_summary(self) -> str | None:
+        """
+        Сколько блоков и строк прочитано в выборке --sample или
+        --approx. None, если запрос не читал выборку.
+        """
+        sample = self.sample
+        if sample is None:
+            return None
+        message = (f"Выборка: {sample['blocks']} из {sample['total_blocks']} "
+                   f"блоков ({sample['blocks'] / sample['total_blocks']:.1%} "
+                   f"файла), прочитано строк: {sample['rows']}")
+        if sample["skipped"]:
+            message += (f", пропущено строк с другим числом полей: "
+                        f"{sample['skipped']}")
+        if self.args.aggregate:
+            message += (". count и sum пересчитаны на весь файл, "
+                        "± - половина 95% доверительного интервала")
+        return message
 
-        # Проверяем столбец и оператор
-        if column not in self.headers:
-            print(f"Колонка {column} не найдена")
-            exit(1)
-        if value not in ["min", "avg", "max"]:
-            print(f"Значение {value} не поддерживается")
-            exit(1)
+    def _open_column_file(self, path) -> "ColumnFile":
+        """
+        Описание колоночного файла. Поврежденный файл - ошибка запроса.
+        """
+        from column_file import ColumnFile
+        try:
+            return ColumnFile(path)
+        except (ValueError, KeyError, TypeError) as error:
+            self._fail(error if isinstance(error, ValueError)
+                       else f"Файл {path} поврежден")
+
+    def _read_column_file(self, path) -> Iterator[list[str]]:
+        """
+        Запрос к колоночному файлу (main.py convert, модуль column_file).
+        Блоки, в которых по минимуму и максимуму столбцов не может
+        быть строк для --where, пропускаются без чтения, а из остальных
+        читаются только столбцы, нужные запросу: условия, группировки
+        и агрегации, --select и --order-by. Фильтр и агрегация работают
+        со столбцами с типами, как --engine columnar.
+        """
+        if self._sample_fraction() is not None:
+            self._notice("--sample и --approx не используются "
+                         "для колоночного файла")
+        column_file = self._open_column_file(path)
+        self.headers = column_file.headers
+        node = None
+        if self.args.where:
+            node = self._compile_filter(self.args.where)
+        filter_indexes = ([] if node is None else
+                          [self.headers.index(column)
+                           for column in node.columns()])
+
+        if self.args.aggregate:
+            aggregation = self._build_aggregation(self.args.aggregate)
+            indexes = aggregation.key_indexes + [
+                index for index, _ in aggregation.specs]
+            chunks = self._column_chunks(
+                column_file, node, indexes + filter_indexes)
+            with self._timed("aggregate") as stage:
+                try:
+                    for table, selection in chunks:
+                        aggregation.add_rows(
+                            table.aggregate_rows(selection, indexes))
+                except NotNumericError:
+                    self._fail("Агрегация поддерживается только для чисел")
+                data = self._order_result(self._aggregate_result(aggregation))
+                stage.rows = len(data)
+            return iter(data)
 
-        # Получаем все значения в столбце
-        col_idx = self.headers.index(column)
-        col_values = [row[col_idx] for row in data]
+        select = indexes = None
+        if self.args.select:
+            select = self._parse_columns(self.args.select, "--select")
+            indexes = select + filter_indexes
+            if self.args.order_by:
+                indexes += [index for index, _ in
+                            self._parse_order(self.args.order_by, self.headers)]
+        rows = (row for table, selection in
+                self._column_chunks(column_file, node, indexes)
+                for row in table.text_rows(selection))
+        if self.args.order_by or self.args.limit is not None:
+            with self._timed("order"):
+                rows = self._stage("order", self._order_rows(rows))
+        if select:
+            rows = self._stage("select", self._project(rows, select))
+        return rows
 
-        # Проверяем, что все значения числа
+    def _column_chunks(self, column_file, node, indexes):
+        """
+        Блоки колоночного файла с прочитанными столбцами indexes
+        (None - все) и индексы подходящих под node строк блока
+        (None - все строки). Блоки без подходящих строк пропускаются.
+        """
+        for number in range(len(column_file.chunks)):
+            if node is not None and not column_file.may_match(number, node):
+                continue
+            read = column_file.bytes_read
+            with self._timed("load") as stage:
+                try:
+                    table = column_file.read_chunk(number, indexes)
+                except (OSError, ValueError) as error:
+                    self._fail(error)
+                stage.rows = (stage.rows or 0) + table.row_count
+            if self.stats is not None:
+                self.stats.bytes_read += column_file.bytes_read - read
+            selection = None
+            if node is not None:
+                with self._timed("filter") as stage:
+                    selection = node.select(table)
+                    stage.rows = (stage.rows or 0) + len(selection)
+                if not selection:
+                    continue
+            yield table, selection
+
+    def _read_mmap(self, path) -> Iterator[list[str]]:
+        """
+        Чтение csv файла через mmap (модуль mmap_reader).
+        Выигрыш есть, только когда в --where есть условия вида
+        column=value, IN или LIKE 'abc%': строки без их подстрок
+        отбрасываются, не разбиваясь на поля, а фильтр и агрегация
+        работают с байтовыми полями, декодируются только выбранные
+        столбцы строк, которые попадут в вывод. Без таких условий
+        разбор модулем csv быстрее, и файл читается через _read_text.
+        """
+        with open_mmap(path) as buffer:
+            records = iter_records(buffer)
+            self.headers = decode_row(next(records))
+            needles = None
+            if self.args.where:
+                needles = self._compile_filter(self.args.where).needles()
+            if needles:
+                self._count_bytes(path)
+                records = iter_records(buffer, needles)
+                next(records)
+                yield from self._process(records, raw=True)
+                return
+        yield from self._read_text(path)
+
+    def _read_columnar(self, path) -> list[list[str]]:
+        """
+        Чтение csv файла в колоночную таблицу с типами (модуль columnar).
+        Фильтр возвращает индексы строк и проверяет числа без
+        разбора текста, а строки - один раз на уникальное значение.
+        С --engine numpy фильтр считается булевыми масками, а агрегаты -
+        редукциями массивов (модуль numpy_engine). Без NumPy
+        используется тот же путь, что и для --engine columnar.
+        """
+        with self._timed("load") as stage:
+            table = self._load_table(path)
+            stage.rows = table.row_count
+        self.headers = table.headers
+        vectorized = self.args.engine == "numpy"
+        if vectorized:
+            # NumPy загружается только для --engine numpy
+            import numpy_engine
+            if not numpy_engine.available():
+                self._notice("NumPy не установлен, используется --engine columnar")
+                vectorized = False
+        selection = None
+        if self.args.where:
+            node = self._compile_filter(self.args.where)
+            with self._timed("filter") as stage:
+                selection = (numpy_engine.select(node, table) if vectorized
+                             else node.select(table))
+                stage.rows = len(selection)
+        if self.args.aggregate:
+            aggregation = self._build_aggregation(self.args.aggregate)
+            with self._timed("aggregate") as stage:
+                if vectorized:
+                    data = self._order_result(
+                        self._run_vectorized(aggregation, table, selection))
+                else:
+                    indexes = aggregation.key_indexes + [
+                        index for index, _ in aggregation.specs]
+                    data = self._order_result(self._run_aggregation(
+                        aggregation, table.aggregate_rows(selection, indexes)))
+                stage.rows = len(data)
+            return data
+        if vectorized and selection is not None:
+            selection = selection.tolist()
+        selection = self._order_selection(table, selection)
+        indexes = None
+        if self.args.select:
+            indexes = self._parse_columns(self.args.select, "--select")
+        return table.text_rows(selection, indexes)
+
+    def _run_vectorized(self, aggregation, table, selection) -> list[list[str]]:
+        """
+        Векторная агрегация строк таблицы (модуль numpy_engine)
+        """
+        import numpy_engine
         try:
-            col_values = [float(v) for v in col_values]
-        except ValueError:
-            print("Агрегация поддерживается только для чисел")
-            exit(1)
+            numpy_engine.aggregate(table, selection, aggregation)
+        except NotNumericError:
+            self._fail("Агрегация поддерживается только для чисел")
+        return self._aggregate_result(aggregation)
+
+    def _order_selection(self, table, selection) -> list[int] | None:
+        """
+        Индексы строк таблицы после --order-by и --limit.
+        Сортируются только значения столбцов сортировки,
+        номер строки идет последним столбцом ключа.
+        """
+        limit = self._limit()
+        if self.args.order_by:
+            order = self._parse_order(self.args.order_by, self.headers)
+            if selection is None:
+                selection = range(table.row_count)
+            keys = table.text_rows(selection, [index for index, _ in order])
+            for key, index in zip(keys, selection):
+                key.append(index)
+            ranked = top_rows(keys, [(position, descending) for position,
+                                     (_, descending) in enumerate(order)],
+                              limit)
+            return [key[-1] for key in ranked]
+        if limit is not None:
+            if selection is None:
+                return list(range(min(limit, table.row_count)))
+            return selection[:limit]
+        return selection
+
+    def _load_table(self, path) -> "ColumnTable":
+        """
+        Загрузка csv файла в колоночную таблицу.
+        Разобранная таблица сохраняется в кеш (модуль table_cache),
+        и повторные запросы к тому же файлу не разбирают csv.
+        """
+        from table_cache import fingerprint
+        cache = self._table_cache()
+        source = None
+        if cache is not None:
+            source = fingerprint(path)
+            table = cache.get(path, source)
+            if table is not None:
+                return table
+        self._count_bytes(path)
+        from columnar import ColumnTable
+        with self._open_text(path) as file:
+            reader = csv.reader(file)
+            table = ColumnTable.from_rows(next(reader), reader)
+        if cache is not None:
+            cache.put(path, source, table)
+        return table
+
+    def _table_cache(self) -> "TableCache | MemoryTables | None":
+        """
+        Таблицы в памяти сервера, кеш на диске или None с --no-cache
+        """
+        if self.tables is not None:
+            return self.tables
+        if self.args.cache:
+            from table_cache import TableCache
+            return TableCache(self.args.cache_dir)
+        return None
+
+    def _parse_columns(self, expression, argument) -> list[int]:
+        """
+        Разбор списка столбцов через запятую (--select, --group-by).
+        Возвращает индексы столбцов в порядке перечисления.
+        """
+        columns = [column.strip() for column in expression.split(",")]
+        if not all(columns):
+            self._fail(f'Укажите значение для аргумента {argument} в формате: '
+                       '"column,column"')
+        for column in columns:
+            if column not in self.headers:
+                self._fail(f"Колонка {column} не найдена")
+        return [self.headers.index(column) for column in columns]
+
+    def _parse_order(self, expression, headers) -> list[tuple[int, bool]]:
+        """
+        Разбор --order-by: столбцы через запятую, у каждого
+        можно указать :asc или :desc. Возвращает список
+        (индекс столбца в headers, по убыванию ли).
+        """
+        order = []
+        for item in expression.split(","):
+            column, descending = item.strip(), False
+            name, separator, direction = column.rpartition(":")
+            if separator and direction in ("asc", "desc"):
+                column, descending = name.strip(), direction == "desc"
+            if not column:
+                self._fail('Укажите значение для аргумента --order-by в формате: '
+                           '"column:desc,column"')
+            if column not in headers:
+                self._fail(f"Колонка {column} не найдена")
+            order.append((headers.index(column), descending))
+        return order
+
+    def _limit(self) -> int | None:
+        """
+        Значение --limit
+        """
+        if self.args.limit is not None and self.args.limit < 0:
+            self._fail("Значение --limit не может быть отрицательным")
+        return self.args.limit
 
-        # Агрегируем данные
-        if not col_values:
-            return [["Нет данных"]]
-        
-        if value == "min":
-            return [[str(min(col_values))]]
-        elif value == "avg":
-            return [[str(round(sum(col_values) / len(col_values), 2))]]
-        elif value == "max":
-            return [[str(max(col_values))]]
+    def _order_rows(self, rows) -> Iterator[list[str]]:
+        """
+        Сортировка потока строк (--order-by) и ограничение (--limit).
+        С --limit без сортировки чтение файла останавливается
+        после первых limit подходящих строк.
+        """
+        limit = self._limit()
+        if self.args.order_by:
+            return iter(top_rows(
+                rows, self._parse_order(self.args.order_by, self.headers),
+                limit))
+        if limit is not None:
+            return islice(rows, limit)
+        return rows
 
+    def _order_result(self, data) -> list[list[str]]:
+        """
+        Сортировка и ограничение результата агрегации.
+        Столбцы --order-by ищутся среди заголовков вывода,
+        например, "brand" или "price=avg".
+        """
+        limit = self._limit()
+        if self.args.order_by:
+            order = self._parse_order(
+                self.args.order_by, self._output_headers())
+            if len(data) > 1:
+                data = top_rows(data, order, limit)
+        if limit is not None:
+            data = data[:limit]
         return data
+
+    @staticmethod
+    def _project(rows, indexes) -> Iterator[list[str]]:
+        """
+        Оставляет в строках только столбцы с индексами indexes
+        """
+        return ([row[index] for index in indexes] for row in rows)
+
+    def _output_headers(self) -> list[str]:
+        """
+        Заголовки таблицы для вывода
+        """
+        if self.args.aggregate:
+            expressions = self.args.aggregate
+            if isinstance(expressions, str):
+                expressions = [expressions]
+            columns = []
+            if self.args.group_by:
+                columns = self._parse_columns(self.args.group_by, "--group-by")
+            if self._sample_fraction() is not None:
+                # С выборкой после оценки - столбец интервала
+                expressions = [
+                    column for expression in expressions
+                    for column in (
+                        [expression, f"{expression} ±"]
+                        if self._estimated(expression) else [expression])]
+            return [self.headers[index] for index in columns] + expressions
+        if self.args.select:
+            return [self.headers[index] for index in
+                    self._parse_columns(self.args.select, "--select")]
+        return self.headers
+
+    @staticmethod
+    def _estimated(expression) -> bool:
+        """
+        Считается ли для агрегации доверительный интервал с --sample
+        """
+        from sampling import ESTIMATED
+        match = AGGREGATE_PATTERN.match(expression)
+        return match is not None and match.group("value") in ESTIMATED
+
+    def _get_paths(self) -> list[str]:
+        """
+        Пути к csv файлам. Шаблон вида "export-*.csv" заменяется
+        подходящими файлами с расширениями из PATTERN_SUFFIXES, папка -
+        файлами *.csv и сжатыми *.csv.gz, *.csv.bz2, *.csv.xz, *.csv.zst
+        в ней, по алфавиту.
+        Файл, указанный дважды, читается один раз.
+        """
+        patterns = [self.path] if isinstance(self.path, str) else self.path
+        paths = []
+        for pattern in patterns:
+            if os.path.isdir(pattern):
+                matches = sorted(
+                    path for suffix in CSV_SUFFIXES
+                    for path in glob.glob(os.path.join(pattern, suffix)))
+            elif any(char in pattern for char in "*?[") \
+                    and not os.path.exists(pattern):
+                matches = sorted(
+                    path for path in glob.glob(pattern)
+                    if os.path.isfile(path) and any(
+                        fnmatch.fnmatch(os.path.basename(path), suffix)
+                        for suffix in PATTERN_SUFFIXES))
+            else:
+                matches = [pattern] if os.path.exists(pattern) else []
+            if not matches:
+                self._fail(f"Файл {pattern} не найден")
+            for path in matches:
+                kind = detect_format(path)
+                if kind in (None, "column"):
+                    continue
+                from compression import available
+                if not available(kind):
+                    self._fail("Для файлов zstd нужен zstandard: "
+                               "pip install zstandard")
+            paths.extend(matches)
+        return list(dict.fromkeys(paths))
+
+    def _get_path(self) -> str:
+        """
+        Получение пути к csv файлу (первому, если их несколько)
+        """
+        return self._get_paths()[0]
+
+    def _filter(self, expression, data) -> list[list[str]]:
+        """
+        Фильтрация данных
+        """
+        return list(self._iter_filter(expression, data))
+
+    def _iter_filter(self, expression, rows) -> Iterator[list[str]]:
+        """
+        Потоковая фильтрация строк.
+        Выражение проверяется сразу, а строки отбираются лениво.
+        """
+        return self._compile_filter(expression).filter(rows)
+
+    def _compile_filter(self, expression, raw=False) -> Node:
+        """
+        Разбор выражения --where в дерево условий.
+        expression - строка или список строк (несколько --where через AND).
+        raw=True - условие для строк из байтовых полей.
+        """
+        try:
+            return compile_expression(expression, self.headers, raw)
+        except ColumnNotFoundError as error:
+            self._fail(error)
+        except ExpressionError:
+            self._fail('Укажите значение для аргумента --where в формате: "column+value". '
+                       'Можно использовать операторы <, >, =, !=, <=, >=, '
+                       'IN (...), LIKE и связки AND, OR, NOT')
+
+    def _aggregate(self, expression, rows, raw=False) -> list[list[str]]:
+        """
+        Агрегация данных.
+        rows может быть списком или итератором строк: значения
+        столбца не сохраняются, поэтому память не зависит от размера файла.
+        expression - строка или список строк (несколько --aggregate).
+        С --group-by получается строка результата на каждую группу.
+        """
+        return self._run_aggregation(
+            self._build_aggregation(expression), rows, raw)
+
+    def _run_aggregation(self, aggregation, rows, raw=False) -> list[list[str]]:
+        """
+        Передача строк в состояние агрегации и вывод результата
+        """
+        # Считаем агрегаты за один проход, не сохраняя значения столбцов
+        try:
+            aggregation.add_rows(rows)
+        except NotNumericError:
+            self._fail("Агрегация поддерживается только для чисел")
+        return self._aggregate_result(aggregation, raw)
+
+    def _build_aggregation(self, expression) -> "GroupedAggregation":
+        """
+        Проверка выражений --aggregate и --group-by и создание
+        пустого состояния агрегации (модуль grouping)
+        """
+        expressions = [expression] if isinstance(expression, str) else expression
+        specs = [self._parse_aggregate(item) for item in expressions]
+        key_indexes = []
+        if self.args.group_by:
+            key_indexes = self._parse_columns(self.args.group_by, "--group-by")
+        from grouping import MAX_GROUPS, GroupedAggregation
+        return GroupedAggregation(
+            key_indexes, specs, self.args.max_groups or MAX_GROUPS)
+
+    def _parse_aggregate(self, expression) -> tuple[int, str]:
+        """
+        Разбор выражения --aggregate.
+        Возвращает индекс столбца и название агрегации.
+        """
+        # Проверяем выражение
+        match = (AGGREGATE_PATTERN.match(expression)
+                 if isinstance(expression, str) else None)
+        try:
+            create_aggregator(match.group("value"))
+        except (AttributeError, ValueError):
+            self._fail('Укажите значение для аргумента --aggregate в формате: "column=value". '
+                       'value может быть min, avg, max, sum, count, count_distinct, '
+                       'approx_distinct, var, stddev, median, p0-p100')
+
+        # Проверяем столбец
+        column = match.group("column")
+        if column not in self.headers:
+            self._fail(f"Колонка {column} не найдена")
+        return self.headers.index(column), match.group("value")
+
+    @staticmethod
+    def _aggregate_result(aggregation, raw=False) -> list[list[str]]:
+        """
+        Результат агрегации в виде таблицы: значения столбцов
+        группировки и результаты агрегаций для каждой группы
+        """
+        data = []
+        for key, aggregators in aggregation.items():
+            row = decode_row(key) if raw else list(key)
+            for aggregator in aggregators:
+                result = aggregator.result()
+                row.append("Нет данных" if result is None else str(result))
+            data.append(row)
+        return data or [["Нет данных"]]
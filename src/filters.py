@@ -0,0 +1,537 @@
+import copy
+import operator as op
+import re
+
+
+class ExpressionError(ValueError):
+    """Ошибка разбора выражения фильтра"""
+
+
+class ColumnNotFoundError(ValueError):
+    """Столбец из выражения отсутствует в заголовках"""
+    def __init__(self, column):
+        super().__init__(f"Колонка {column} не найдена")
+        self.column = column
+
+
+# Узлы дерева выражения
+class Node:
+    """
+    Базовый класс узла дерева выражения.
+    После bind(headers) у узла есть test(row) - проверка строки.
+    С raw=True условие проверяет строки из байтовых полей
+    (см. mmap_reader) и не декодирует их.
+
+    Атрибуты:
+    - cost: float - оценка стоимости проверки одной строки
+    - selectivity: float - оценка доли строк, проходящих проверку
+
+    Оценки нужны, чтобы в AND и OR сначала проверялись дешевые
+    и отсекающие больше строк условия.
+
+    Для колоночной таблицы (модуль columnar) вместо test есть
+    select(table, candidates) - индексы подходящих строк.
+    """
+    cost = 1.0
+    selectivity = 0.5
+
+    def bind(self, headers, raw=False):
+        raise NotImplementedError
+
+    def select(self, table, candidates=None) -> list[int]:
+        """
+        Индексы строк таблицы из candidates (None - все строки),
+        для которых выполняется условие
+        """
+        raise NotImplementedError
+
+    def columns(self) -> set[str]:
+        raise NotImplementedError
+
+    def needles(self) -> frozenset[str] | None:
+        """
+        Подстроки, хотя бы одна из которых есть в тексте каждой
+        подходящей записи, или None, если таких нет. По ним mmap_reader
+        отбрасывает строки файла, не разбивая их на поля.
+        """
+        return None
+
+    def filter(self, rows):
+        """
+        Ленивый отбор строк, подходящих под условие
+        """
+        return filter(self.test, rows)
+
+
+class ColumnNode(Node):
+    """
+    Условие на один столбец.
+    Индекс столбца может быть известен сразу или найден в bind.
+    """
+    def __init__(self, column, index=None):
+        self.column = column
+        self.index = index
+        self.raw = False
+        if index is not None:
+            self.test = self._compile()
+
+    def bind(self, headers, raw=False):
+        if self.column not in headers:
+            raise ColumnNotFoundError(self.column)
+        self.index = headers.index(self.column)
+        self.raw = raw
+        self.test = self._compile()
+        return self
+
+    def _literal(self, value):
+        """
+        Значение из выражения в виде, сравнимом с ячейкой
+        """
+        return value.encode("utf-8") if self.raw else value
+
+    def text_test(self):
+        """
+        Проверка одного значения ячейки (текста), а не строки
+        """
+        node = copy.copy(self)
+        node.index, node.raw = 0, False
+        row_test = node._compile()
+        return lambda text: row_test((text,))
+
+    def number_test(self):
+        """
+        Проверка числа из числового столбца без перевода в текст
+        или None, если условие так проверить нельзя
+        """
+        return None
+
+    @staticmethod
+    def _needles(values) -> frozenset[str] | None:
+        """
+        Значения, которые есть в записи файла как есть. Значение
+        с кавычкой в файле записано с удвоенной кавычкой, а пустое
+        ничего не отсекает.
+        """
+        values = frozenset(values)
+        if not values or any(not value or '"' in value or "\n" in value
+                             or "\r" in value for value in values):
+            return None
+        return values
+
+    def select(self, table, candidates=None) -> list[int]:
+        return table.columns[self.index].select(self, candidates)
+
+    def columns(self) -> set[str]:
+        return {self.column}
+
+    def _compile(self):
+        raise NotImplementedError
+
+
+class Condition(ColumnNode):
+    """
+    Условие вида column<op>value, скомпилированное один раз.
+    Индекс столбца, разобранное значение и способ сравнения
+    вычисляются при создании, а для строк остается только test(row).
+
+    Атрибуты:
+    - column: str - название столбца
+    - index: int - индекс столбца в строке
+    - operator: str - оператор сравнения
+    - value: str - значение из выражения
+    - number: float | None - значение как число, если оно число
+    - test: Callable[[list[str]], bool] - проверка строки
+    """
+    COMPARE = {"<": op.lt, ">": op.gt, "<=": op.le, ">=": op.ge,
+               "=": op.eq, "!=": op.ne}
+    SELECTIVITY = {"=": 0.1, "!=": 0.9}
+
+    def __init__(self, column, index, operator, value):
+        self.operator = operator
+        self.value = value
+        try:
+            self.number = float(value)
+        except ValueError:
+            self.number = None
+        # Равенство - дешевое сравнение строк, а < и > разбирают число
+        textual = operator in ("=", "!=") or self.number is None
+        self.cost = 1.0 if textual else 3.0
+        self.selectivity = self.SELECTIVITY.get(operator, 0.33)
+        super().__init__(column, index)
+
+    def _compile(self):
+        """
+        Выбор проверки строки.
+        Равенство всегда строковое. Для < и > с числовым значением
+        сравниваем числа, а ячейку, которая не число, сравниваем
+        как строку. Значение-строка сравнивается только как строка.
+        float принимает и байты, поэтому числа в raw режиме
+        сравниваются без декодирования.
+        """
+        index, number = self.index, self.number
+        value = self._literal(self.value)
+        compare = self.COMPARE[self.operator]
+        if self.operator == "=":
+            return lambda row: row[index] == value
+        if self.operator == "!=":
+            return lambda row: row[index] != value
+        if number is None:
+            return lambda row: compare(row[index], value)
+
+        def test(row):
+            cell = row[index]
+            try:
+                return compare(float(cell), number)
+            except ValueError:
+                return compare(cell, value)
+        return test
+
+    def number_test(self):
+        """
+        Для < и > с числовым значением число сравнивается напрямую.
+        Сравнение записано методом числа из выражения, чтобы
+        не вызывать функцию Python на каждую строку.
+        """
+        if self.number is None or self.operator in ("=", "!="):
+            return None
+        reverse = {"<": "__gt__", ">": "__lt__",
+                   "<=": "__ge__", ">=": "__le__"}
+        return getattr(self.number, reverse[self.operator])
+
+    def needles(self) -> frozenset[str] | None:
+        if self.operator != "=":
+            return None
+        return self._needles([self.value])
+
+
+class InCondition(ColumnNode):
+    """Условие column IN (value, ...) - строковое совпадение с набором"""
+    def __init__(self, column, values, index=None):
+        self.values = frozenset(values)
+        self.cost = 1.0
+        self.selectivity = min(0.1 * len(self.values), 0.9)
+        super().__init__(column, index)
+
+    def _compile(self):
+        index = self.index
+        values = frozenset(self._literal(value) for value in self.values)
+        return lambda row: row[index] in values
+
+    def needles(self) -> frozenset[str] | None:
+        return self._needles(self.values)
+
+
+class LikeCondition(ColumnNode):
+    """
+    Условие column LIKE pattern.
+    % - любое число символов, _ - один символ.
+    Шаблоны вида "abc%" проверяются через startswith без регулярки.
+    """
+    def __init__(self, column, pattern, index=None):
+        self.pattern = pattern
+        body = pattern[:-1]
+        self.prefix = (body if pattern.endswith("%")
+                       and "%" not in body and "_" not in body else None)
+        self.cost = 1.5 if self.prefix is not None else 5.0
+        self.selectivity = 0.25
+        super().__init__(column, index)
+
+    def _compile(self):
+        index = self.index
+        if self.prefix is not None:
+            prefix = self._literal(self.prefix)
+            return lambda row: row[index].startswith(prefix)
+        regex = re.compile("".join(
+            ".*" if char == "%" else "." if char == "_" else re.escape(char)
+            for char in self.pattern), re.DOTALL)
+        if self.raw:
+            # _ - это один символ, а не байт, поэтому ячейку декодируем
+            return lambda row: regex.fullmatch(
+                row[index].decode("utf-8")) is not None
+        return lambda row: regex.fullmatch(row[index]) is not None
+
+    def needles(self) -> frozenset[str] | None:
+        if self.prefix is None:
+            return None
+        return self._needles([self.prefix])
+
+
+class Not(Node):
+    """Отрицание условия"""
+    def __init__(self, child):
+        self.child = child
+        self.cost = child.cost
+        self.selectivity = 1 - child.selectivity
+
+    def bind(self, headers, raw=False):
+        self.child.bind(headers, raw)
+        child = self.child.test
+        self.test = lambda row: not child(row)
+        return self
+
+    def select(self, table, candidates=None) -> list[int]:
+        matched = set(self.child.select(table, candidates))
+        if candidates is None:
+            candidates = range(table.row_count)
+        return [index for index in candidates if index not in matched]
+
+    def columns(self) -> set[str]:
+        return self.child.columns()
+
+
+class BoolNode(Node):
+    """
+    Базовый класс для AND и OR.
+    При bind дочерние условия упорядочиваются по рангу так, чтобы
+    проверка строки как можно раньше завершалась по короткой схеме.
+    """
+    def __init__(self, children):
+        self.children = list(children)
+        self.cost = sum(child.cost for child in self.children)
+
+    def bind(self, headers, raw=False):
+        for child in self.children:
+            child.bind(headers, raw)
+        self.children.sort(key=self._rank)
+        test = self.children[0].test
+        for child in self.children[1:]:
+            test = self._combine(test, child.test)
+        self.test = test
+        return self
+
+    def columns(self) -> set[str]:
+        return set().union(*(child.columns() for child in self.children))
+
+    @staticmethod
+    def _rank(child) -> float:
+        raise NotImplementedError
+
+    @staticmethod
+    def _combine(first, second):
+        raise NotImplementedError
+
+
+class And(BoolNode):
+    """Все условия должны выполняться"""
+    def __init__(self, children):
+        super().__init__(children)
+        self.selectivity = 1.0
+        for child in self.children:
+            self.selectivity *= child.selectivity
+
+    @staticmethod
+    def _rank(child) -> float:
+        # Раньше проверяем дешевые условия, которые отсекают много строк
+        return child.cost / max(1 - child.selectivity, 1e-6)
+
+    @staticmethod
+    def _combine(first, second):
+        return lambda row: first(row) and second(row)
+
+    def needles(self) -> frozenset[str] | None:
+        # Достаточно подстрок одного условия: берем самый короткий набор
+        found = [needles for needles in
+                 (child.needles() for child in self.children)
+                 if needles is not None]
+        return min(found, key=len, default=None)
+
+    def select(self, table, candidates=None) -> list[int]:
+        # Каждое следующее условие проверяет только прошедшие строки
+        for child in self.children:
+            candidates = child.select(table, candidates)
+            if not candidates:
+                break
+        return candidates
+
+
+class Or(BoolNode):
+    """Хотя бы одно условие должно выполняться"""
+    def __init__(self, children):
+        super().__init__(children)
+        rejected = 1.0
+        for child in self.children:
+            rejected *= 1 - child.selectivity
+        self.selectivity = 1 - rejected
+
+    @staticmethod
+    def _rank(child) -> float:
+        # Раньше проверяем дешевые условия, которые пропускают много строк
+        return child.cost / max(child.selectivity, 1e-6)
+
+    @staticmethod
+    def _combine(first, second):
+        return lambda row: first(row) or second(row)
+
+    def needles(self) -> frozenset[str] | None:
+        # Нужны подстроки каждого условия
+        found = [child.needles() for child in self.children]
+        if any(needles is None for needles in found):
+            return None
+        return frozenset().union(*found)
+
+    def select(self, table, candidates=None) -> list[int]:
+        # Каждое следующее условие проверяет только не прошедшие строки
+        matched = set()
+        remaining = candidates
+        for child in self.children:
+            found = child.select(table, remaining)
+            matched.update(found)
+            if remaining is None:
+                remaining = range(table.row_count)
+            found = set(found)
+            remaining = [index for index in remaining if index not in found]
+            if not remaining:
+                break
+        return sorted(matched)
+
+
+# Разбор выражения
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | '(?P<single>[^']*)'
+  | "(?P<double>[^"]*)"
+  | (?P<operator><=|>=|!=|<|>|=)
+  | (?P<punct>[(),])
+  | (?P<word>[^\s<>=!(),'"]+)
+""", re.VERBOSE)
+
+KEYWORDS = {"AND", "OR", "NOT", "IN", "LIKE"}
+
+
+def tokenize(expression) -> list[tuple[str, str]]:
+    """
+    Разбиение выражения на токены (тип, текст).
+    Соседние слова без операторов склеиваются через пробел, поэтому
+    названия столбцов и значения могут содержать пробелы.
+    Ключевые слова AND, OR, NOT, IN, LIKE пишутся заглавными.
+    """
+    tokens = []
+    position = 0
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match:
+            raise ExpressionError(
+                f"Неожиданный символ {expression[position]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "space":
+            continue
+        if kind in ("single", "double"):
+            tokens.append(("text", text))
+        elif kind == "word" and text in KEYWORDS:
+            tokens.append(("keyword", text))
+        elif kind == "word":
+            if tokens and tokens[-1][0] == "word":
+                tokens[-1] = ("word", f"{tokens[-1][1]} {text}")
+            else:
+                tokens.append(("word", text))
+        else:
+            tokens.append((kind, text))
+    return [("text" if kind == "word" else kind, text)
+            for kind, text in tokens]
+
+
+class Parser:
+    """
+    Разбор выражения методом рекурсивного спуска.
+
+    expression := and_expr (OR and_expr)*
+    and_expr   := not_expr (AND not_expr)*
+    not_expr   := NOT not_expr | "(" expression ")" | condition
+    condition  := column op value
+                | column [NOT] IN "(" value ("," value)* ")"
+                | column [NOT] LIKE value
+    """
+    def __init__(self, expression):
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ExpressionError("Пустое выражение")
+        node = self._expression()
+        if self.position != len(self.tokens):
+            raise ExpressionError(
+                f"Лишний токен {self.tokens[self.position][1]!r}")
+        return node
+
+    def _peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def _take(self, kind, text=None) -> str:
+        token_kind, token_text = self._peek()
+        if token_kind != kind or (text is not None and token_text != text):
+            raise ExpressionError(
+                f"Ожидалось {text or kind}, получено {token_text!r}")
+        self.position += 1
+        return token_text
+
+    def _accept(self, kind, text) -> bool:
+        if self._peek() == (kind, text):
+            self.position += 1
+            return True
+        return False
+
+    def _expression(self) -> Node:
+        children = [self._and_expression()]
+        while self._accept("keyword", "OR"):
+            children.append(self._and_expression())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def _and_expression(self) -> Node:
+        children = [self._not_expression()]
+        while self._accept("keyword", "AND"):
+            children.append(self._not_expression())
+        return children[0] if len(children) == 1 else And(children)
+
+    def _not_expression(self) -> Node:
+        if self._accept("keyword", "NOT"):
+            return Not(self._not_expression())
+        if self._accept("punct", "("):
+            node = self._expression()
+            self._take("punct", ")")
+            return node
+        return self._condition()
+
+    def _condition(self) -> Node:
+        column = self._take("text")
+        negate = self._accept("keyword", "NOT")
+        if self._accept("keyword", "IN"):
+            self._take("punct", "(")
+            values = [self._take("text")]
+            while self._accept("punct", ","):
+                values.append(self._take("text"))
+            self._take("punct", ")")
+            node = InCondition(column, values)
+        elif self._accept("keyword", "LIKE"):
+            node = LikeCondition(column, self._take("text"))
+        elif negate:
+            raise ExpressionError("После NOT ожидалось IN или LIKE")
+        else:
+            operator = self._take("operator")
+            node = Condition(column, None, operator, self._take("text"))
+        return Not(node) if negate else node
+
+
+def parse_expression(expressions) -> Node:
+    """
+    Разбор одного выражения или списка выражений.
+    Несколько выражений (несколько --where) объединяются через AND.
+    """
+    if isinstance(expressions, str):
+        expressions = [expressions]
+    if not expressions or not all(
+            isinstance(expression, str) for expression in expressions):
+        raise ExpressionError("Выражение должно быть строкой")
+    nodes = [Parser(expression).parse() for expression in expressions]
+    return nodes[0] if len(nodes) == 1 else And(nodes)
+
+
+def compile_expression(expressions, headers, raw=False) -> Node:
+    """
+    Разбор выражения и привязка его к заголовкам csv файла
+    """
+    return parse_expression(expressions).bind(headers, raw)
@@ -0,0 +1,65 @@
+import io
+import os
+from typing import Iterator
+
+BLOCK_SIZE = 1 << 20
+
+
+# Чтение строк, дописанных в конец файла
+def complete_length(data) -> int:
+    """
+    Длина начала data из целых записей: после последнего перевода
+    строки, перед которым четное число кавычек. Хвост без перевода
+    строки или с незакрытым полем в кавычках еще дописывается.
+    """
+    end = 0
+    quotes = 0
+    position = 0
+    while True:
+        newline = data.find(b"\n", position)
+        if newline == -1:
+            return end
+        quotes += data.count(b'"', position, newline)
+        position = newline + 1
+        if quotes % 2 == 0:
+            end = position
+
+
+class FileTail:
+    """
+    Новые записи файла, в который дописывает другой процесс.
+    Запоминается смещение после последней целой записи, при каждом
+    чтении разбирается только то, что дописано после него.
+
+    Атрибуты:
+    - path: str - путь к файлу
+    - offset: int - смещение после прочитанных записей
+    """
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+
+    def truncated(self) -> bool:
+        """
+        Стал ли файл короче прочитанного (перезаписан заново)
+        """
+        return os.path.getsize(self.path) < self.offset
+
+    def read(self) -> Iterator[str]:
+        """
+        Строки целых записей, дописанных после прошлого чтения.
+        Файл читается блоками по BLOCK_SIZE, смещение сдвигается
+        по мере получения строк.
+        """
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            rest = b""
+            while True:
+                block = file.read(BLOCK_SIZE)
+                if not block:
+                    return
+                data = rest + block
+                length = complete_length(data)
+                rest = data[length:]
+                self.offset += length
+                yield from io.StringIO(data[:length].decode("utf-8"))
@@ -0,0 +1,29 @@
+# Сигнатуры в начале файла
+COMPRESSION_MAGIC = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+# Колоночный файл (модуль column_file)
+COLUMN_MAGIC = b"CSVRCOL1"
+HEAD_SIZE = max(len(COLUMN_MAGIC),
+                *(len(magic) for magic in COMPRESSION_MAGIC.values()))
+
+
+# Формат файла по первым байтам
+def detect_format(path) -> str | None:
+    """
+    Формат файла по первым байтам: gzip, bz2, xz, zstd, column
+    (колоночный файл) или None для обычного csv файла.
+    Расширение файла не учитывается. У модуля нет зависимостей:
+    запрос к csv файлу не загружает compression и column_file.
+    """
+    with open(path, "rb") as file:
+        head = file.read(HEAD_SIZE)
+    if head.startswith(COLUMN_MAGIC):
+        return "column"
+    for kind, magic in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return None
@@ -0,0 +1,202 @@
+import os
+import pickle
+import shutil
+import tempfile
+import zlib
+from operator import itemgetter
+
+from aggregators import NotNumericError, accumulate, create_aggregator
+
+MAX_GROUPS = 1_000_000
+PARTITIONS = 16
+# Сколько раз часть можно разделить заново: каждый уровень берет
+# следующие 4 бита crc32 (16 частей), всего их 32
+LEVELS = 8
+
+
+# Агрегация с группировкой по хеш-таблице
+class GroupedAggregation:
+    """
+    Агрегация за один проход с группировкой по значениям столбцов.
+    Для каждого ключа группы в словаре хранится список аккумуляторов,
+    по одному на каждую агрегацию.
+
+    Если групп больше max_groups, состояние сбрасывается на диск:
+    группы раскладываются по PARTITIONS файлам по хешу ключа, а словарь
+    очищается. В конце файлы одной части читаются и объединяются.
+    Если в части больше max_groups групп, она делится заново по
+    следующим разрядам хеша, поэтому в памяти одновременно не больше
+    max_groups объединенных групп и одного прочитанного файла.
+
+    Атрибуты:
+    - key_indexes: list[int] - индексы столбцов группировки
+    - specs: list[tuple[int, str]] - агрегации (индекс столбца, название)
+    - groups: dict - ключ группы -> список аккумуляторов
+    - spill_files: list[list[str]] - файлы сброшенных групп по частям
+    """
+    def __init__(self, key_indexes, specs, max_groups=MAX_GROUPS):
+        self.key_indexes = list(key_indexes)
+        self.specs = list(specs)
+        self.max_groups = max_groups
+        self.groups = {}
+        self.spill_files = [[] for _ in range(PARTITIONS)]
+        self.spill_dirs = []
+        if not self.key_indexes:
+            # Без группировки одна группа есть всегда, даже без строк
+            self.groups[()] = self._new_group()
+
+    def _new_group(self) -> list:
+        return [create_aggregator(name) for _, name in self.specs]
+
+    def _key_function(self):
+        """
+        Функция, возвращающая ключ группы для строки
+        """
+        if not self.key_indexes:
+            return lambda row: ()
+        if len(self.key_indexes) == 1:
+            index = self.key_indexes[0]
+            return lambda row: (row[index],)
+        return itemgetter(*self.key_indexes)
+
+    def add_rows(self, rows) -> "GroupedAggregation":
+        """
+        Передача строк аккумуляторам их групп.
+        Если значение числовой агрегации не число - NotNumericError.
+        """
+        if not self.key_indexes and len(self.specs) == 1:
+            accumulate(self.groups[()][0], rows, self.specs[0][0])
+            return self
+
+        key_of = self._key_function()
+        columns = [(index, create_aggregator(name).numeric)
+                   for index, name in self.specs]
+        groups = self.groups
+        for row in rows:
+            key = key_of(row)
+            aggregators = groups.get(key)
+            if aggregators is None:
+                if len(groups) >= self.max_groups:
+                    self._spill()
+                    groups = self.groups
+                aggregators = groups[key] = self._new_group()
+            for aggregator, (index, numeric) in zip(aggregators, columns):
+                value = row[index]
+                if numeric:
+                    try:
+                        value = float(value)
+                    except ValueError:
+                        raise NotNumericError(value) from None
+                aggregator.add(value)
+        return self
+
+    def merge(self, other) -> None:
+        """
+        Объединение с частичным результатом, например, другого процесса.
+        Файлы, сброшенные другим результатом, переходят к этому.
+        """
+        for key, aggregators in other.groups.items():
+            current = self.groups.get(key)
+            if current is None:
+                if len(self.groups) >= self.max_groups:
+                    self._spill()
+                self.groups[key] = aggregators
+                continue
+            for aggregator, partial in zip(current, aggregators):
+                aggregator.merge(partial)
+        for files, other_files in zip(self.spill_files, other.spill_files):
+            files.extend(other_files)
+        self.spill_dirs.extend(other.spill_dirs)
+        other.spill_dirs = []
+
+    def _spill(self) -> None:
+        """
+        Сброс групп из памяти в файлы частей
+        """
+        self._write_parts(self.groups, 0, self.spill_files)
+        self.groups = {}
+
+    def _write_parts(self, groups, level, files) -> None:
+        """
+        Запись групп в файлы частей уровня level: путь файла части
+        добавляется в files[номер части]
+        """
+        directory = tempfile.mkdtemp(prefix="csv_reader_groups_")
+        self.spill_dirs.append(directory)
+        parts = [{} for _ in range(PARTITIONS)]
+        for key, aggregators in groups.items():
+            parts[self._partition(key, level)][key] = aggregators
+        for number, part in enumerate(parts):
+            if not part:
+                continue
+            path = os.path.join(directory, f"{number}.pickle")
+            with open(path, "wb") as file:
+                pickle.dump(part, file, pickle.HIGHEST_PROTOCOL)
+            files[number].append(path)
+
+    @staticmethod
+    def _partition(key, level=0) -> int:
+        """
+        Номер части ключа. На каждом уровне берутся следующие
+        разряды хеша, поэтому группы одной части делятся заново
+        на разные части.
+        """
+        digest = zlib.crc32(repr(key).encode("utf-8"))
+        return digest // PARTITIONS ** level % PARTITIONS
+
+    def items(self):
+        """
+        Пары (ключ группы, список аккумуляторов).
+        Без сброса на диск группы идут в порядке первого появления,
+        после сброса - по частям. Временные файлы удаляются в конце.
+        """
+        try:
+            if not any(self.spill_files):
+                yield from self.groups.items()
+                return
+            self._spill()
+            for files in self.spill_files:
+                yield from self._merge(files, 1)
+        finally:
+            self.close()
+
+    def _merge(self, files, level):
+        """
+        Объединение групп одной части из файлов files.
+        Когда объединенных групп становится max_groups, а новая
+        группа не помещается, они сбрасываются в файлы подчастей
+        уровня level, и каждая подчасть объединяется так же.
+        """
+        merged = {}
+        parts = None
+        for path in files:
+            with open(path, "rb") as file:
+                part = pickle.load(file)
+            for key, aggregators in part.items():
+                current = merged.get(key)
+                if current is None:
+                    if len(merged) >= self.max_groups and level < LEVELS:
+                        if parts is None:
+                            parts = [[] for _ in range(PARTITIONS)]
+                        self._write_parts(merged, level, parts)
+                        merged = {}
+                    merged[key] = aggregators
+                    continue
+                for aggregator, partial in zip(current, aggregators):
+                    aggregator.merge(partial)
+        if parts is None:
+            yield from merged.items()
+            return
+        self._write_parts(merged, level, parts)
+        del merged
+        for files in parts:
+            yield from self._merge(files, level + 1)
+
+    def close(self) -> None:
+        """
+        Удаление временных файлов сброшенных групп
+        """
+        for directory in self.spill_dirs:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.spill_dirs = []
+        self.spill_files = [[] for _ in range(PARTITIONS)]
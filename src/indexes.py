@@ -0,0 +1,317 @@
+import csv
+import io
+import json
+import math
+from itertools import islice
+
+from filters import And, ColumnNode, Condition, Or
+from table_cache import fingerprint
+
+BLOCK_ROWS = 4096
+MAX_DISTINCT = 65536
+SUFFIX = ".index"
+
+
+# Индексы столбцов в файле рядом с csv файлом
+def index_path(path) -> str:
+    """
+    Путь к файлу индекса для csv файла path
+    """
+    return path + SUFFIX
+
+
+class BitmapIndex:
+    """
+    Индекс для столбцов с небольшим числом уникальных значений.
+    Для каждого значения хранится битовая маска блоков строк,
+    в которых оно встречается. Условие проверяется на каждом
+    уникальном значении, поэтому подходит для любого условия на столбец.
+
+    Атрибуты:
+    - bitmaps: dict[str, int] - значение -> маска блоков
+    """
+    kind = "bitmap"
+
+    def __init__(self, bitmaps):
+        self.bitmaps = bitmaps
+
+    def blocks(self, node) -> int | None:
+        test = node.text_test()
+        result = 0
+        for value, bitmap in self.bitmaps.items():
+            if test(value):
+                result |= bitmap
+        return result
+
+    def to_json(self) -> dict:
+        return {"kind": self.kind,
+                "bitmaps": {value: format(bitmap, "x")
+                            for value, bitmap in self.bitmaps.items()}}
+
+    @classmethod
+    def from_json(cls, data) -> "BitmapIndex":
+        return cls({value: int(bitmap, 16)
+                    for value, bitmap in data["bitmaps"].items()})
+
+
+class ZoneMap:
+    """
+    Индекс для числовых столбцов: минимум и максимум в каждом блоке.
+    Блок нужно читать, если в отрезок [минимум, максимум] может
+    попасть подходящее число. nan не попадает ни в одно сравнение
+    и в минимум и максимум не входит.
+
+    Атрибуты:
+    - minimums: list[float | None] - минимум блока (None - нет чисел)
+    - maximums: list[float | None] - максимум блока
+    """
+    kind = "zonemap"
+
+    def __init__(self, minimums, maximums):
+        self.minimums = minimums
+        self.maximums = maximums
+
+    def blocks(self, node) -> int | None:
+        if isinstance(node, Condition) and node.operator == "=":
+            number = node.number
+            if number is None or math.isnan(number):
+                return None
+            return self._mask(lambda low, high: low <= number <= high)
+        test = node.number_test()
+        if test is None:
+            return None
+        # Сравнения < и > монотонны: в отрезке есть подходящее
+        # число, только если подходит один из концов
+        return self._mask(lambda low, high: test(low) or test(high))
+
+    def _mask(self, overlaps) -> int:
+        result = 0
+        for block, (low, high) in enumerate(zip(self.minimums,
+                                                self.maximums)):
+            if low is not None and overlaps(low, high):
+                result |= 1 << block
+        return result
+
+    def to_json(self) -> dict:
+        return {"kind": self.kind, "minimums": self.minimums,
+                "maximums": self.maximums}
+
+    @classmethod
+    def from_json(cls, data) -> "ZoneMap":
+        return cls(data["minimums"], data["maximums"])
+
+
+INDEX_TYPES = {
+    BitmapIndex.kind: BitmapIndex,
+    ZoneMap.kind: ZoneMap,
+}
+
+
+class IndexBuildError(ValueError):
+    """Для столбца нельзя построить индекс"""
+    def __init__(self, column):
+        super().__init__(
+            f"Колонка {column}: больше {MAX_DISTINCT} уникальных значений "
+            "и не все значения числа, индекс не построен")
+        self.column = column
+
+
+class FileIndex:
+    """
+    Индексы столбцов одного csv файла.
+    Строки файла делятся на блоки по BLOCK_ROWS, для блоков хранятся
+    смещения в байтах. По выражению фильтра индексы выбирают блоки,
+    в которых могут быть подходящие строки, и читаются только они.
+    Строки этих блоков все равно проверяются фильтром целиком.
+
+    Атрибуты:
+    - source: dict - признаки версии csv файла (table_cache.fingerprint)
+    - headers: list[str] - заголовки файла
+    - offsets: list[int] - начала блоков и конец файла
+    - columns: dict[str, BitmapIndex | ZoneMap] - индексы по столбцам
+    """
+    def __init__(self, source, headers, offsets, columns):
+        self.source = source
+        self.headers = headers
+        self.offsets = offsets
+        self.columns = columns
+
+    @classmethod
+    def build(cls, path, columns) -> "FileIndex":
+        """
+        Построение индексов столбцов columns за один проход по файлу.
+        Столбец получает битовый индекс, если уникальных значений
+        не больше MAX_DISTINCT, иначе зоны, если все значения числа.
+        """
+        source = fingerprint(path)
+        offsets = []
+        with open(path, "rb") as file:
+            lines = _record_lines(file, offsets)
+            reader = csv.reader(lines)
+            headers = next(reader, [])
+            indexes = [headers.index(column) for column in columns]
+            bitmaps = [{} for _ in columns]
+            numeric = [True] * len(columns)
+            minimums = [[] for _ in columns]
+            maximums = [[] for _ in columns]
+            block = 0
+            while True:
+                chunk = list(islice(reader, BLOCK_ROWS))
+                if not chunk:
+                    break
+                bit = 1 << block
+                for number, index in enumerate(indexes):
+                    distinct = {row[index] if len(row) > index else ""
+                                for row in chunk}
+                    if bitmaps[number] is not None:
+                        values = bitmaps[number]
+                        for value in distinct:
+                            values[value] = values.get(value, 0) | bit
+                        if len(values) > MAX_DISTINCT:
+                            bitmaps[number] = None
+                    if numeric[number]:
+                        try:
+                            finite = [value for value in map(float, distinct)
+                                      if not math.isnan(value)]
+                        except ValueError:
+                            numeric[number] = False
+                            continue
+                        minimums[number].append(min(finite, default=None))
+                        maximums[number].append(max(finite, default=None))
+                block += 1
+        offsets.append(source["size"])
+
+        result = {}
+        for number, column in enumerate(columns):
+            if bitmaps[number] is not None:
+                result[column] = BitmapIndex(bitmaps[number])
+            elif numeric[number]:
+                result[column] = ZoneMap(minimums[number], maximums[number])
+            else:
+                raise IndexBuildError(column)
+        return cls(source, headers, offsets, result)
+
+    @classmethod
+    def load(cls, path) -> "FileIndex | None":
+        """
+        Индекс csv файла path или None, если его нет или он поврежден
+        """
+        try:
+            with open(index_path(path), "r", encoding="utf-8") as file:
+                data = json.load(file)
+            return cls(data["source"], data["headers"], data["offsets"], {
+                column: INDEX_TYPES[index["kind"]].from_json(index)
+                for column, index in data["columns"].items()})
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path) -> None:
+        """
+        Запись индекса в файл рядом с csv файлом path
+        """
+        data = {"source": self.source, "headers": self.headers,
+                "offsets": self.offsets,
+                "columns": {column: index.to_json()
+                            for column, index in self.columns.items()}}
+        with open(index_path(path), "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+
+    def fresh(self, path) -> bool:
+        """
+        Совпадает ли версия csv файла с той, для которой строился индекс
+        """
+        return self.source == fingerprint(path)
+
+    def blocks(self, node) -> int | None:
+        """
+        Маска блоков, в которых могут быть строки, подходящие под
+        условие node, или None, если индекс не помогает
+        """
+        return node_blocks(node, self.columns)
+
+    def ranges(self, node) -> list[tuple[int, int]] | None:
+        """
+        Диапазоны байт блоков, которые нужно прочитать для условия
+        node. None - читать весь файл: индекс не помогает или
+        подходят все блоки.
+        """
+        mask = self.blocks(node)
+        count = len(self.offsets) - 1
+        if mask is None or mask == (1 << count) - 1:
+            return None
+        return [(self.offsets[block], self.offsets[block + 1])
+                for block in range(count) if mask >> block & 1]
+
+    def describe(self) -> list[list[str]]:
+        """
+        Таблица построенных индексов: столбец, тип, размер
+        """
+        rows = []
+        for column, index in self.columns.items():
+            if isinstance(index, BitmapIndex):
+                size = f"{len(index.bitmaps)} значений"
+            else:
+                size = f"{len(index.minimums)} блоков"
+            rows.append([column, index.kind, size])
+        return rows
+
+
+def node_blocks(node, columns) -> int | None:
+    """
+    Маска блоков для условия node по индексам столбцов columns
+    (название -> индекс с методом blocks) или None, если индексы
+    не помогают. AND пересекает маски, OR объединяет.
+    """
+    if isinstance(node, And):
+        masks = [mask for mask in (node_blocks(child, columns)
+                                   for child in node.children)
+                 if mask is not None]
+        if not masks:
+            return None
+        result = masks[0]
+        for mask in masks[1:]:
+            result &= mask
+        return result
+    if isinstance(node, Or):
+        result = 0
+        for child in node.children:
+            mask = node_blocks(child, columns)
+            if mask is None:
+                return None
+            result |= mask
+        return result
+    if isinstance(node, ColumnNode) and node.column in columns:
+        return columns[node.column].blocks(node)
+    return None
+
+
+def _record_lines(file, offsets):
+    """
+    Строки двоичного файла в виде текста для csv.reader.
+    Перед каждой BLOCK_ROWS-й записью в offsets добавляется ее
+    смещение. Запись начинается со строки, перед которой четное
+    число кавычек: иначе строка продолжает поле в кавычках.
+    """
+    position = 0
+    quotes = 0
+    records = 0
+    for line in file:
+        if quotes % 2 == 0:
+            # Запись 0 - заголовки
+            if records and (records - 1) % BLOCK_ROWS == 0:
+                offsets.append(position)
+            records += 1
+        quotes += line.count(b'"')
+        position += len(line)
+        yield line.decode("utf-8")
+
+
+def read_ranges(path, ranges):
+    """
+    Строки csv файла из диапазонов байт ranges по порядку.
+    Блок читается с диска одним вызовом.
+    """
+    with open(path, "rb") as file:
+        for start, end in ranges:
+            file.seek(start)
+            yield from io.StringIO(file.read(end - start).decode("utf-8"))
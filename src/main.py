@@ -1,16 +1,164 @@
 import argparse
+import sys
+import warnings
 
-from csv_reader import CSVReader
+from csv_reader import DEFAULT_OPTIONS, CSVReader, QueryError
+from output import WRITERS, GridWriter
+
+# main.py serve ... - сервер запросов (модуль server)
+if sys.argv[1:2] == ["serve"]:
+    import server
+    server.main(sys.argv[2:])
+    sys.exit()
+# main.py convert ... - перевод csv в колоночный файл (модуль column_file)
+if sys.argv[1:2] == ["convert"]:
+    import column_file
+    column_file.main(sys.argv[2:])
+    sys.exit()
 
 # Парсим аргументы
-parser = argparse.ArgumentParser(description="Считыватель CSV файлов", add_help=False)
+parser = argparse.ArgumentParser(
+    description="Считыватель CSV файлов. main.py serve --help - сервер "
+                "запросов, main.py convert --help - перевод в колоночный файл",
+    add_help=False)
 parser.add_argument("-h", "--help", action="help", help="Показать справку")
-parser.add_argument("-f", "--file", type=str, help="Путь к csv файлу", required=True)
-parser.add_argument("-a", "--aggregate",  help="Агрегировать данные", required=False)
-parser.add_argument("-w", "--where", help="Фильтровать данные", required=False)
+parser.add_argument("-f", "--file", type=str, action="append", required=True,
+                    help="Путь к csv файлу, шаблон вида 'export-*.csv' или "
+                         "папка с csv файлами. Можно указать несколько раз, "
+                         "заголовки файлов должны совпадать. Файлы gzip, bz2, "
+                         "xz и zstd (нужен zstandard) распаковываются на лету")
+parser.add_argument("-a", "--aggregate", action="append", required=False,
+                    help="Агрегировать данные. Можно указать несколько раз")
+parser.add_argument("-w", "--where", action="append", required=False,
+                    help="Фильтровать данные. Можно указать несколько раз, "
+                         "условия объединяются через AND")
+
+parser.add_argument("-s", "--select", required=False,
+                    help="Вывести только указанные столбцы, через запятую")
+parser.add_argument("-g", "--group-by", required=False,
+                    help="Группировать агрегацию по столбцам, через запятую")
+parser.add_argument("-o", "--order-by", required=False,
+                    help="Сортировать по столбцам через запятую, "
+                         "например, price:desc,name")
+parser.add_argument("-l", "--limit", type=int, default=None,
+                    help="Вывести не больше указанного числа строк")
+parser.add_argument("-F", "--format", default="grid",
+                    choices=["grid", "csv", "tsv", "jsonl", "arrow"],
+                    help="Формат вывода: grid - таблица, csv, tsv, jsonl и "
+                         "arrow (нужен pyarrow) печатаются по мере чтения")
+parser.add_argument("--stream", action="store_true",
+                    help="Печатать строки по мере чтения, ширина столбцов "
+                         "считается по первым строкам")
+parser.add_argument("--max-groups", type=int, default=None,
+                    help="Сколько групп держать в памяти, "
+                         "остальные сбрасываются на диск")
+parser.add_argument("-j", "--jobs", type=int, default=None,
+                    help="Число процессов для чтения файла. Несколько файлов "
+                         "по умолчанию читаются в процессах по числу файлов, "
+                         "но не больше числа ядер")
+parser.add_argument("-e", "--engine", choices=["python", "columnar", "numpy"],
+                    default="python",
+                    help="python - потоковое чтение строк, columnar - "
+                         "загрузка в колоночную таблицу с типами, numpy - "
+                         "колоночная таблица с векторным фильтром и "
+                         "агрегацией (нужен NumPy)")
+parser.add_argument("--cache-dir", default=None,
+                    help="Папка кеша разобранных таблиц для --engine "
+                         "columnar и numpy (по умолчанию ~/.cache/csv_reader)")
+parser.add_argument("--no-cache", dest="cache", action="store_false",
+                    help="Не читать и не сохранять кеш разобранных таблиц")
+parser.add_argument("--build-index", required=False,
+                    help="Построить индексы столбцов через запятую в файле "
+                         "рядом с csv файлом, --where будет читать только "
+                         "подходящие блоки строк")
+parser.add_argument("--mmap", action="store_true",
+                    help="Читать файл через mmap без декодирования "
+                         "отброшенных строк")
+parser.add_argument("--follow", action="store_true",
+                    help="Следить за файлом, в который дописывают строки: "
+                         "читаются только новые строки, агрегаты обновляются "
+                         "и печатаются заново. Остановка - Ctrl+C")
+parser.add_argument("--interval", type=float, default=1.0,
+                    help="Как часто проверять файл с --follow, в секундах")
+parser.add_argument("--stats", nargs="?", const="table",
+                    choices=["table", "json"],
+                    help="Напечатать в stderr время, процессорное время и "
+                         "число строк по этапам (разбор, фильтр, агрегация, "
+                         "вывод), прочитанные байты и пик памяти. "
+                         "--stats json - в формате JSON")
+parser.add_argument("--trace-memory", action="store_true",
+                    help="С --stats считать пик памяти Python через "
+                         "tracemalloc (выполнение замедляется)")
+parser.add_argument("--profile", metavar="FILE",
+                    help="Сохранить профиль cProfile в файл FILE "
+                         "(смотреть через python -m pstats FILE)")
+parser.add_argument("--sample", metavar="FRACTION",
+                    help="Читать только случайные блоки файла: доля вида "
+                         "1%% или 0.01. Агрегации count и sum пересчитываются "
+                         "на весь файл, для count, sum и avg выводится "
+                         "95%% доверительный интервал")
+parser.add_argument("--approx", action="store_true",
+                    help="Приближенный ответ по выборке: --sample 1%%")
+parser.add_argument("--seed", type=int, default=None,
+                    help="Начальное значение генератора для --sample, "
+                         "одинаковый seed - одинаковая выборка")
+
+
+def show_notice(message, category, filename, lineno, file=None, line=None):
+    """
+    Предупреждения запроса (RuntimeWarning из CSVReader) печатаются
+    в stderr одной строкой, без места в коде
+    """
+    print(message, file=sys.stderr)
+
+
+def print_rows(reader, output_format, stream) -> None:
+    """
+    Печать результата запроса: с --stream и в форматах csv, tsv, jsonl
+    и arrow - по мере чтения (модуль output), иначе tabulate получает
+    весь результат сразу. Этапы read и output видны в --stats.
+    """
+    if output_format == "arrow":
+        try:
+            writer = WRITERS["arrow"](sys.stdout.buffer)
+        except ImportError:
+            raise QueryError("Для --format arrow нужен pyarrow: "
+                             "pip install pyarrow") from None
+    elif output_format != "grid":
+        writer = WRITERS[output_format](sys.stdout)
+    else:
+        writer = GridWriter(sys.stdout) if stream else None
+    with reader.measured() as stage:
+        with stage("read"):
+            rows = reader.iter_rows()
+        with stage("output"):
+            if writer is not None:
+                writer.write(rows, reader.columns)
+            else:
+                from tabulate import tabulate
+                data = list(rows)
+                print(tabulate(data, headers=reader.columns(),
+                               tablefmt="grid"))
+        summary = reader.sample_summary()
+        if summary is not None:
+            print(summary, file=sys.stderr)
+
 
 args = parser.parse_args()
+warnings.showwarning = show_notice
 
-# Создаем экземпляр класса CSVReader и читаем данные
-csv_reader = CSVReader(args.file, args)
-csv_reader.read()
+# Запрос строится через API CSVReader: ошибки в нем - QueryError,
+# здесь они печатаются и завершают программу с кодом 1
+reader = CSVReader(args.file).options(
+    **{name: value for name, value in vars(args).items()
+       if name in DEFAULT_OPTIONS})
+try:
+    if args.build_index:
+        reader.build_index(args.build_index)
+    elif args.follow:
+        reader.follow()
+    else:
+        print_rows(reader, args.format, args.stream)
+except QueryError as error:
+    print(error)
+    sys.exit(1)
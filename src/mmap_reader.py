@@ -0,0 +1,149 @@
+import csv
+import io
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from itertools import chain, islice
+from typing import Iterable, Iterator
+
+BLOCK_SIZE = 1 << 20
+
+
+# Чтение csv файла из mmap без декодирования каждого поля
+@contextmanager
+def open_mmap(path):
+    """
+    Отображение файла в память только для чтения.
+    Пустой файл отобразить нельзя, для него отдается пустой буфер.
+    """
+    if os.path.getsize(path) == 0:
+        yield b""
+        return
+    with open(path, "rb") as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        yield buffer
+
+
+def iter_records(buffer, needles=None) -> Iterator[list[bytes]]:
+    """
+    Записи csv файла в виде списков байтовых полей.
+    Файл читается блоками, которые заканчиваются на переводе строки,
+    и разбивается по переводам строк и запятым без декодирования.
+    С первого блока, в котором есть кавычка, файл до конца разбирает
+    csv.reader (_quoted_blocks): по кавычкам нельзя найти границу
+    записи, не разобрав все поля до нее.
+    needles - подстроки условия (filters.Node.needles): записи после
+    заголовков без них отбрасываются до разбиения на поля.
+    """
+    pattern = None
+    if needles:
+        pattern = re.compile(b"|".join(
+            re.escape(needle.encode("utf-8")) for needle in sorted(needles)))
+    return chain.from_iterable(_blocks(buffer, pattern))
+
+
+def _blocks(buffer, pattern) -> Iterator[Iterable[list[bytes]]]:
+    """
+    Записи по блокам: сначала заголовки, затем блоки по BLOCK_SIZE
+    """
+    size = len(buffer)
+    position = 0
+    while position < size:
+        end = block_end(buffer, position, BLOCK_SIZE if position else 1)
+        block = buffer[position:end]
+        if b'"' in block:
+            yield from _quoted_blocks(buffer, position, pattern)
+            return
+        yield _records(block, pattern if position else None)
+        position = end
+
+
+def _records(block, pattern) -> list[list[bytes]]:
+    """
+    Записи блока без кавычек. Строки без совпадения с pattern
+    не разбиваются на поля.
+    """
+    if b"\r" in block:
+        block = block.replace(b"\r\n", b"\n")
+    if pattern is not None:
+        lines = matching_lines(block, pattern)
+    else:
+        lines = block.split(b"\n")
+        if not lines[-1]:
+            lines.pop()
+    return [line.split(b",") if line else [] for line in lines]
+
+
+def _quoted_blocks(buffer, position,
+                   pattern) -> Iterator[Iterable[list[bytes]]]:
+    """
+    Записи от position до конца буфера через csv.reader, как при
+    чтении файла в текстовом режиме: кавычка открывает поле только
+    в его начале, перевод строки внутри поля в кавычках не завершает
+    запись. position - начало записи, 0 - заголовки (они не
+    отбрасываются). Записи без совпадения с pattern в полях, соединенных
+    через запятую, не кодируются обратно в байты.
+    """
+    rows = csv.reader(_text_lines(buffer, position))
+    if position == 0:
+        yield [encode_row(row) for row in islice(rows, 1)]
+    if pattern is not None:
+        search = re.compile(pattern.pattern.decode("utf-8")).search
+        rows = (row for row in rows if search(",".join(row)))
+    yield map(encode_row, rows)
+
+
+def _text_lines(buffer, position) -> Iterator[str]:
+    """
+    Строки буфера от position, декодированные блоками по BLOCK_SIZE.
+    \r\n заменяется на \n и внутри полей, как в текстовом режиме.
+    """
+    size = len(buffer)
+    while position < size:
+        end = block_end(buffer, position, BLOCK_SIZE)
+        text = buffer[position:end].decode("utf-8")
+        yield from io.StringIO(text.replace("\r\n", "\n"))
+        position = end
+
+
+def matching_lines(block, pattern) -> list[bytes]:
+    """
+    Строки блока без кавычек, в которых есть совпадение с pattern.
+    Остальные строки не копируются и не разбиваются.
+    """
+    lines = []
+    position = 0
+    search = pattern.search
+    while True:
+        match = search(block, position)
+        if match is None:
+            return lines
+        start = block.rfind(b"\n", 0, match.start()) + 1
+        end = block.find(b"\n", match.end())
+        if end == -1:
+            end = len(block)
+        lines.append(block[start:end])
+        position = end + 1
+
+
+def block_end(buffer, start, size=BLOCK_SIZE) -> int:
+    """
+    Конец блока: первый перевод строки после start + size
+    """
+    newline = buffer.find(b"\n", start + size - 1)
+    return len(buffer) if newline == -1 else newline + 1
+
+
+def encode_row(row) -> list[bytes]:
+    """
+    Поля строки csv.reader в байтах, как у записей без кавычек
+    """
+    return [field.encode("utf-8") for field in row]
+
+
+def decode_row(row) -> list[str]:
+    """
+    Декодирование всех полей строки перед выводом
+    """
+    return [field.decode("utf-8") for field in row]
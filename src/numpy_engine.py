@@ -0,0 +1,146 @@
+import operator
+from functools import reduce
+
+from aggregators import (AvgAggregator, CountAggregator, MaxAggregator,
+                         MinAggregator, SumAggregator, accumulate)
+from filters import And, Not, Or
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Векторное выполнение фильтра и агрегации над колоночной таблицей
+def available() -> bool:
+    """
+    Установлен ли NumPy. Без него --engine numpy работает
+    как --engine columnar.
+    """
+    return numpy is not None
+
+
+def as_array(column):
+    """
+    Значения столбца (или коды словаря) как массив NumPy.
+    Массив смотрит в буфер array.array без копирования.
+    """
+    return numpy.frombuffer(column.values, dtype=column.values.typecode)
+
+
+def mask(node, table):
+    """
+    Булев массив: для каждой строки таблицы, выполняется ли условие.
+    AND, OR и NOT объединяют маски потомков, числовые сравнения
+    считаются над массивом, а текстовые условия проверяются один
+    раз для каждого уникального значения, как в Column.select.
+    """
+    if isinstance(node, And):
+        return reduce(operator.and_,
+                      (mask(child, table) for child in node.children))
+    if isinstance(node, Or):
+        return reduce(operator.or_,
+                      (mask(child, table) for child in node.children))
+    if isinstance(node, Not):
+        return ~mask(node.child, table)
+
+    column = table.columns[node.index]
+    values = as_array(column)
+    if column.kind in ("int", "float") and node.number_test() is not None:
+        return node.COMPARE[node.operator](values, node.number)
+    test = node.text_test()
+    if column.kind == "str":
+        texts = column.dictionary
+        codes = values
+    else:
+        # Дробные сравниваем по битам: 0.0 и -0.0 - разный текст
+        bits = values.view(numpy.int64) if column.kind == "float" else values
+        uniques, codes = numpy.unique(bits, return_inverse=True)
+        texts = map(column.to_text, uniques.view(values.dtype).tolist())
+    matching = numpy.fromiter(map(test, texts), dtype=bool)
+    return matching[codes]
+
+
+def select(node, table):
+    """
+    Индексы строк таблицы, для которых выполняется условие
+    """
+    return numpy.flatnonzero(mask(node, table))
+
+
+def aggregate(table, selection, aggregation):
+    """
+    Заполнение состояния агрегации (модуль grouping) строками
+    таблицы с индексами selection (None - все строки).
+    Без группировки min, max, sum, avg и count для числовых столбцов
+    считаются редукцией массива, остальные агрегации получают
+    значения по одному, как в обычном движке.
+    Если значение числовой агрегации не число - NotNumericError.
+    """
+    rows = None if selection is None else selection.tolist()
+    if aggregation.key_indexes:
+        indexes = aggregation.key_indexes + [
+            index for index, _ in aggregation.specs]
+        return aggregation.add_rows(table.aggregate_rows(rows, indexes))
+
+    for aggregator, (index, _) in zip(aggregation.groups[()],
+                                      aggregation.specs):
+        if not reduce_column(aggregator, table, index, selection):
+            accumulate(aggregator, table.aggregate_rows(rows, [index]), index)
+    return aggregation
+
+
+def reduce_column(aggregator, table, index, selection) -> bool:
+    """
+    Передача аккумулятору столбца index одной редукцией.
+    Возвращает False, если так посчитать нельзя.
+    """
+    reduction = REDUCTIONS.get(type(aggregator))
+    if reduction is None:
+        return False
+    if reduction is _count:
+        count = table.row_count if selection is None else len(selection)
+        reduction(aggregator, count)
+        return True
+    column = table.columns[index]
+    if column.kind not in ("int", "float"):
+        return False
+    values = as_array(column)
+    if selection is not None:
+        values = values[selection]
+    # Как float() в accumulate
+    values = values.astype(numpy.float64)
+    if reduction in (_min, _max) and numpy.isnan(values).any():
+        # С nan результат min/max зависит от порядка сравнений
+        return False
+    if len(values):
+        reduction(aggregator, values)
+    return True
+
+
+def _min(aggregator, values) -> None:
+    aggregator.add(float(values.min()))
+
+
+def _max(aggregator, values) -> None:
+    aggregator.add(float(values.max()))
+
+
+def _sum(aggregator, values) -> None:
+    # add.accumulate складывает слева направо, как цикл в SumAggregator,
+    # поэтому сумма совпадает до бита (add.reduce складывает попарно)
+    aggregator.count += len(values)
+    aggregator.total += float(numpy.add.accumulate(values)[-1])
+
+
+def _count(aggregator, count) -> None:
+    aggregator.count += count
+
+
+REDUCTIONS = {
+    MinAggregator: _min,
+    MaxAggregator: _max,
+    SumAggregator: _sum,
+    AvgAggregator: _sum,
+    CountAggregator: _count,
+}
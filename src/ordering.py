@@ -0,0 +1,60 @@
+import heapq
+
+
+# Сортировка строк и выбор первых N строк
+class Descending:
+    """
+    Обертка значения с обратным порядком сравнения.
+    Нужна для сортировки строк по убыванию вместе с другими
+    столбцами в одном ключе.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def cell_key(cell, descending=False) -> tuple:
+    """
+    Ключ сортировки ячейки. Числа сравниваются как числа и идут
+    перед текстом, текст сравнивается как строка. По убыванию
+    порядок полностью обратный. nan сортируется как текст.
+    """
+    try:
+        number = float(cell)
+    except ValueError:
+        number = None
+    if number is None or number != number:
+        return (0, Descending(cell)) if descending else (1, cell)
+    return (1, -number) if descending else (0, number)
+
+
+def sort_key(order):
+    """
+    Ключ сортировки строки.
+    order - список (индекс столбца, по убыванию ли).
+    """
+    if len(order) == 1:
+        index, descending = order[0]
+        return lambda row: cell_key(row[index], descending)
+    return lambda row: tuple(cell_key(row[index], descending)
+                             for index, descending in order)
+
+
+def top_rows(rows, order, limit=None) -> list:
+    """
+    Строки, отсортированные по order, не больше limit.
+    С limit используется куча на limit строк, поэтому память
+    не зависит от числа строк. Строки с равным ключом остаются
+    в исходном порядке.
+    """
+    key = sort_key(order)
+    if limit is None:
+        return sorted(rows, key=key)
+    return heapq.nsmallest(limit, rows, key=key)
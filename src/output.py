@@ -0,0 +1,196 @@
+import csv
+import json
+from itertools import chain, islice
+
+STREAM_SAMPLE = 1000
+WRITE_BATCH = 1000
+ARROW_BATCH = 65536
+MIN_PADDING = 2
+
+
+# Потоковый вывод таблицы
+def peek(rows):
+    """
+    Поток строк, из которого уже прочитана первая строка.
+    После этого известны заголовки результата.
+    """
+    rows = iter(rows)
+    return chain(list(islice(rows, 1)), rows)
+
+
+def is_number(cell) -> bool:
+    try:
+        float(cell)
+    except ValueError:
+        return False
+    return True
+
+
+class GridWriter:
+    """
+    Вывод таблицы в стиле tabulate(tablefmt="grid") по мере
+    получения строк.
+    Ширина столбцов и выравнивание определяются по заголовкам и первым
+    sample_size строкам: до вывода первой строки читаются только они,
+    поэтому время до первой строки не зависит от размера файла.
+    Ячейка шире столбца выводится целиком и сдвигает границу только
+    в своей строке. Столбцы, в которых все значения выборки - числа,
+    выравниваются по правому краю.
+
+    Атрибуты:
+    - file - куда писать, например, sys.stdout
+    - sample_size: int - число строк для расчета ширины
+    """
+    def __init__(self, file, sample_size=STREAM_SAMPLE):
+        self.file = file
+        self.sample_size = sample_size
+
+    def write(self, rows, headers) -> None:
+        """
+        Вывод строк rows. headers - функция, возвращающая заголовки:
+        они могут стать известны только после чтения первых строк.
+        Строки пишутся пачками по WRITE_BATCH, первая пачка
+        сбрасывается сразу.
+        """
+        rows = iter(rows)
+        sample = list(islice(rows, self.sample_size))
+        headers = list(headers())
+        width = max([len(headers)] + [len(row) for row in sample])
+        headers += [""] * (width - len(headers))
+        widths = [len(header) + MIN_PADDING for header in headers]
+        numeric = [True] * width
+        for row in sample:
+            for index, cell in enumerate(row):
+                cell = str(cell)
+                widths[index] = max(widths[index], len(cell))
+                if numeric[index] and not is_number(cell):
+                    numeric[index] = False
+        if not sample:
+            numeric = [False] * width
+
+        self.widths, self.numeric = widths, numeric
+        separator = self._line("-")
+        lines = [separator, self._row(headers, header=True), self._line("=")]
+        written = 0
+        for row in chain(sample, rows):
+            lines.append(self._row(row))
+            lines.append(separator)
+            if len(lines) >= 2 * WRITE_BATCH:
+                self._flush(lines, first=not written)
+                written += 1
+                lines = []
+        if not sample:
+            lines.append(separator)
+        self._flush(lines, first=not written)
+
+    def _line(self, char) -> str:
+        return "+" + "+".join(char * (width + 2)
+                              for width in self.widths) + "+\n"
+
+    def _row(self, row, header=False) -> str:
+        cells = []
+        for index, width in enumerate(self.widths):
+            cell = str(row[index]) if index < len(row) else ""
+            if self.numeric[index] and (header or is_number(cell)):
+                cells.append(cell.rjust(width))
+            else:
+                cells.append(cell.ljust(width))
+        return "| " + " | ".join(cells) + " |\n"
+
+    def _flush(self, lines, first=False) -> None:
+        self.file.write("".join(lines))
+        if first:
+            self.file.flush()
+
+
+class DelimitedWriter:
+    """
+    Вывод в формате csv: строка заголовков, затем строки по мере
+    получения через csv.writer без расчета ширины столбцов.
+    Заголовки пишутся при первом вызове write, следующие вызовы
+    дописывают только строки (--follow).
+    """
+    delimiter = ","
+
+    def __init__(self, file):
+        self.file = file
+        self.writer = None
+
+    def write(self, rows, headers) -> None:
+        rows = peek(rows)
+        if self.writer is None:
+            self.writer = csv.writer(self.file, delimiter=self.delimiter,
+                                     lineterminator="\n")
+            self.writer.writerow(headers())
+        self.writer.writerows(rows)
+
+
+class TsvWriter(DelimitedWriter):
+    """Вывод с разделителем табуляцией"""
+    delimiter = "\t"
+
+
+class JsonLinesWriter:
+    """
+    Вывод в формате JSON Lines: объект {заголовок: значение}
+    на строку. Значения остаются строками, как в csv файле.
+    Ключи объекта закодированы заранее в шаблоне строки, поэтому
+    на каждую ячейку кодируется только значение.
+    """
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, rows, headers) -> None:
+        rows = peek(rows)
+        names = headers()
+        encode = json.encoder.encode_basestring
+        template = "{" + ", ".join(
+            encode(name).replace("%", "%%") + ": %s" for name in names) + "}\n"
+        encode_row = json.JSONEncoder(ensure_ascii=False).encode
+        width = len(names)
+        while True:
+            chunk = list(islice(rows, WRITE_BATCH))
+            if not chunk:
+                break
+            self.file.write("".join([
+                template % tuple(map(encode, row)) if len(row) == width
+                else encode_row(dict(zip(names, row))) + "\n"
+                for row in chunk]))
+
+
+class ArrowWriter:
+    """
+    Вывод в формате Arrow IPC (stream) пачками по ARROW_BATCH строк.
+    Все столбцы строковые, недостающие ячейки - null.
+    Нужен pyarrow: без него при создании будет ImportError.
+    """
+    def __init__(self, file):
+        import pyarrow
+        import pyarrow.ipc
+        self.pyarrow = pyarrow
+        self.file = file
+
+    def write(self, rows, headers) -> None:
+        pyarrow = self.pyarrow
+        rows = peek(rows)
+        names = headers()
+        width = len(names)
+        schema = pyarrow.schema([(name, pyarrow.string()) for name in names])
+        with pyarrow.ipc.new_stream(self.file, schema) as writer:
+            while True:
+                chunk = list(islice(rows, ARROW_BATCH))
+                if not chunk:
+                    break
+                columns = [[row[index] if index < len(row) else None
+                            for row in chunk] for index in range(width)]
+                writer.write_batch(
+                    pyarrow.record_batch(columns, schema=schema))
+        self.file.flush()
+
+
+WRITERS = {
+    "csv": DelimitedWriter,
+    "tsv": TsvWriter,
+    "jsonl": JsonLinesWriter,
+    "arrow": ArrowWriter,
+}
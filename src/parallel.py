@@ -0,0 +1,202 @@
+import copy
+import csv
+import math
+import mmap
+import os
+from collections import deque
+from itertools import islice
+
+from compression import detect, open_text
+from filters import compile_expression
+from ordering import top_rows
+
+
+COUNT_BLOCK = 1 << 24
+# Наибольший диапазон для запроса без агрегации: строки диапазона
+# передаются в основной процесс списком, поэтому диапазоны небольшие
+STREAM_RANGE = 1 << 23
+
+
+# Параллельное чтение csv файла по диапазонам байт
+def count_quotes(buffer, start, end) -> int:
+    """
+    Число кавычек в buffer[start:end].
+    У mmap нет count, поэтому считаем по блокам, не копируя файл целиком.
+    """
+    total = 0
+    for block in range(start, end, COUNT_BLOCK):
+        total += buffer[block:min(block + COUNT_BLOCK, end)].count(b'"')
+    return total
+
+
+def record_end(buffer, position, quotes_before=0) -> tuple[int, int]:
+    """
+    Поиск конца записи, начиная с position.
+    Перевод строки завершает запись, только если перед ним четное
+    число кавычек: иначе он внутри поля в кавычках. Экранированная
+    кавычка "" не меняет четность, поэтому считать можно все кавычки.
+    quotes_before - число кавычек от начала буфера до position.
+    Возвращает позицию после перевода строки и число кавычек до нее.
+    """
+    size = len(buffer)
+    while position < size:
+        newline = buffer.find(b"\n", position)
+        if newline == -1:
+            return size, quotes_before + count_quotes(buffer, position, size)
+        quotes_before += count_quotes(buffer, position, newline)
+        position = newline + 1
+        if quotes_before % 2 == 0:
+            return position, quotes_before
+    return size, quotes_before
+
+
+def split_ranges(path, jobs) -> tuple[int, list[tuple[int, int]]]:
+    """
+    Разбиение файла на jobs диапазонов байт по границам записей.
+    Возвращает конец строки заголовков и список диапазонов (start, end).
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0, []
+    with open(path, "rb") as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        header_end, quotes = record_end(buffer, 0)
+        step = max((size - header_end) // jobs, 1)
+        ranges = []
+        start = header_end
+        while start < size:
+            target = min(start + step, size)
+            quotes += count_quotes(buffer, start, target)
+            end, quotes = record_end(buffer, target, quotes)
+            ranges.append((start, end))
+            start = end
+    return header_end, ranges
+
+
+def read_range(path, start, end):
+    """
+    Строки файла из диапазона байт [start, end)
+    """
+    with open(path, "rb") as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            line = file.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+def read_file(path):
+    """
+    Записи файла после заголовков. Сжатый файл нельзя делить
+    на диапазоны, он читается целиком через распаковку.
+    """
+    with open_text(path) as file:
+        rows = csv.reader(file)
+        next(rows, None)
+        yield from rows
+
+
+def scan_range(path, start, end, headers, where, aggregate, select=None,
+               order=None, limit=None):
+    """
+    Обработка одного диапазона в отдельном процессе.
+    aggregate - пустое состояние агрегации (GroupedAggregation):
+    процесс заполняет свою копию и возвращает ее. Без агрегации
+    возвращаются подходящие строки.
+    select - индексы столбцов, которые нужно вернуть: остальные
+    отбрасываются до передачи строк в основной процесс.
+    order и limit - сортировка и число строк (модуль ordering):
+    процесс возвращает только первые limit строк своего диапазона.
+    end=None - весь файл (сжатый).
+    """
+    if end is None:
+        rows = read_file(path)
+    else:
+        rows = csv.reader(read_range(path, start, end))
+    if where:
+        rows = compile_expression(where, headers).filter(rows)
+    if aggregate is not None:
+        return aggregate.add_rows(rows)
+    if order:
+        rows = top_rows(rows, order, limit)
+    elif limit is not None:
+        rows = islice(rows, limit)
+    if select:
+        return [[row[index] for index in select] for row in rows]
+    return list(rows)
+
+
+def scan_parallel(paths, headers, jobs, where=None, aggregate=None,
+                  select=None, order=None, limit=None):
+    """
+    Параллельная фильтрация и агрегация csv файлов.
+    paths - путь или список путей к файлам с одинаковыми заголовками.
+    Каждый файл делится на диапазоны байт так, чтобы всего их было
+    не меньше jobs, каждый диапазон обрабатывается в своем процессе.
+    Сжатый файл обрабатывается одним процессом целиком.
+    С jobs <= 1 диапазоны обрабатываются по очереди в текущем процессе.
+    Частичные агрегации объединяются через merge. Без агрегации
+    возвращается поток строк в порядке файлов: строки диапазона
+    отдаются, как только он обработан, а диапазоны не больше
+    STREAM_RANGE, поэтому в памяти только несколько диапазонов.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    pieces = max(jobs // len(paths), 1) if paths else 1
+    tasks = []
+    for path in paths:
+        if detect(path) is not None:
+            tasks.append((path, 0, None))
+            continue
+        count = pieces
+        if aggregate is None:
+            count = max(count, math.ceil(os.path.getsize(path)
+                                         / STREAM_RANGE))
+        tasks.extend((path, start, end)
+                     for start, end in split_ranges(path, count)[1])
+    # Диапазоны получают пустую копию: aggregate заполняется
+    # результатами, пока следующие диапазоны еще отправляются
+    results = scan_tasks(tasks, jobs, headers, where,
+                         copy.deepcopy(aggregate), select, order, limit)
+    if aggregate is not None:
+        for partial in results:
+            aggregate.merge(partial)
+        return aggregate
+    return (row for part in results for row in part)
+
+
+def scan_tasks(tasks, jobs, headers, where, aggregate, select, order, limit):
+    """
+    Результаты scan_range для диапазонов tasks по порядку.
+    Процессам передается не больше 2 * jobs диапазонов вперед,
+    следующий диапазон отправляется, когда забран результат
+    предыдущего. Если результаты перестали забирать, еще не начатые
+    диапазоны отменяются.
+    """
+    if jobs <= 1:
+        for path, start, end in tasks:
+            yield scan_range(path, start, end, headers, where,
+                             copy.deepcopy(aggregate), select, order, limit)
+        return
+    # multiprocessing загружается, только если нужны процессы
+    from concurrent.futures import ProcessPoolExecutor
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        tasks = iter(tasks)
+        pending = deque()
+        for path, start, end in islice(tasks, 2 * jobs):
+            pending.append(executor.submit(
+                scan_range, path, start, end, headers, where, aggregate,
+                select, order, limit))
+        while pending:
+            result = pending.popleft().result()
+            for path, start, end in islice(tasks, 1):
+                pending.append(executor.submit(
+                    scan_range, path, start, end, headers, where,
+                    aggregate, select, order, limit))
+            yield result
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,159 @@
+import csv
+import math
+import random
+
+# Размер блока выборки, байты
+SAMPLE_BLOCK = 1 << 16
+# Меньше блоков не выбирается: по ним считается разброс между блоками
+MIN_BLOCKS = 30
+# Квантиль нормального распределения для 95% доверительного интервала
+Z_95 = 1.96
+# Агрегации, для которых считается доверительный интервал
+ESTIMATED = ("count", "sum", "avg")
+
+
+# Выборка строк по случайным блокам байт (--sample, --approx)
+def parse_fraction(value) -> float:
+    """
+    Доля файла для выборки: "1%" или число от 0 до 1.
+    Если значение не подходит - ValueError.
+    """
+    text = str(value).strip()
+    fraction = (float(text[:-1]) / 100 if text.endswith("%")
+                else float(text))
+    if not 0 < fraction <= 1:
+        raise ValueError(f"Доля выборки {value} вне (0, 1]")
+    return fraction
+
+
+def _tracked_lines(file, position):
+    """
+    Строки двоичного файла file в виде текста. В position[0]
+    после каждой строки - смещение начала следующей.
+    """
+    for line in file:
+        position[0] += len(line)
+        yield line.decode("utf-8")
+
+
+def read_header(file) -> tuple[list[str] | None, int]:
+    """
+    Заголовки файла и смещение первой записи после них
+    """
+    file.seek(0)
+    position = [0]
+    headers = next(csv.reader(_tracked_lines(file, position)), None)
+    return headers, position[0]
+
+
+def choose_blocks(files, fraction, seed=None,
+                  block_size=SAMPLE_BLOCK) -> tuple[list, int]:
+    """
+    Случайные блоки байт для выборки.
+    files - список (путь, начало данных после заголовков, размер файла).
+    Блоки всех файлов нумеруются подряд, выбирается доля fraction,
+    но не меньше MIN_BLOCKS (или все блоки, если их меньше).
+    Возвращает выбранные блоки (путь, начало, конец) по порядку
+    в файлах и общее число блоков.
+    """
+    blocks = [(path, start, min(start + block_size, size))
+              for path, data_start, size in files
+              for start in range(data_start, size, block_size)]
+    count = min(len(blocks), max(round(fraction * len(blocks)), MIN_BLOCKS))
+    chosen = sorted(random.Random(seed).sample(range(len(blocks)), count))
+    return [blocks[number] for number in chosen], len(blocks)
+
+
+def read_block(file, start, end, width, data_start, skipped=None):
+    """
+    Записи, которые начинаются в блоке [start, end) двоичного файла.
+    Запись, начатая в блоке, читается до конца, даже за его границей,
+    а неполная запись в начале блока относится к предыдущему блоку,
+    поэтому каждая запись попадает ровно в один блок.
+    Начало записи ищется по переводу строки: если блок начался
+    внутри поля в кавычках с переводами строк, разбор сбивается до
+    конца поля. Строки с числом полей не как у заголовков (width)
+    пропускаются, их число прибавляется к skipped[0] (список из
+    одного счетчика), чтобы сбитый разбор был виден в отчете.
+    """
+    if start > data_start:
+        # Дочитываем строку, начатую до блока: перевод строки
+        # прямо перед start означает, что запись начинается в start
+        file.seek(start - 1)
+        start = start - 1 + len(file.readline())
+    else:
+        file.seek(start)
+    position = [start]
+    reader = csv.reader(_tracked_lines(file, position))
+    while position[0] < end:
+        row = next(reader, None)
+        if row is None:
+            return
+        if len(row) == width:
+            yield row
+        elif skipped is not None:
+            skipped[0] += 1
+
+
+class BlockTotals:
+    """
+    Суммы по блокам выборки для одной агрегации одной группы:
+    число значений в блоке (count) и их сумма (total), а также
+    суммы квадратов и произведений для разброса между блоками.
+    Блоки без значений вклада не дают, но считаются в числе
+    выбранных при оценке.
+    """
+    __slots__ = ("count", "total", "count2", "total2", "product")
+
+    def __init__(self):
+        self.count = self.total = 0.0
+        self.count2 = self.total2 = self.product = 0.0
+
+    def add(self, count, total) -> None:
+        self.count += count
+        self.total += total
+        self.count2 += count * count
+        self.total2 += total * total
+        self.product += count * total
+
+    def estimate_total(self, sampled, blocks,
+                       values="count") -> tuple[float, float | None]:
+        """
+        Оценка суммы по всем blocks блокам (числа значений или их
+        суммы - values="total") по sampled выбранным блокам и половина
+        95% доверительного интервала (None, если блок один)
+        """
+        first, second = ((self.count, self.count2) if values == "count"
+                         else (self.total, self.total2))
+        mean = first / sampled
+        estimate = blocks * mean
+        if sampled == blocks:
+            return estimate, 0.0
+        if sampled < 2:
+            return estimate, None
+        variance = max(second - sampled * mean * mean, 0.0) / (sampled - 1)
+        share = sampled / blocks
+        error = blocks * math.sqrt((1 - share) * variance / sampled)
+        return estimate, Z_95 * error
+
+    def estimate_mean(self, sampled, blocks) -> tuple[float | None,
+                                                      float | None]:
+        """
+        Оценка среднего значения (отношение суммы к числу значений)
+        и половина 95% доверительного интервала
+        """
+        if not self.count:
+            return None, None
+        ratio = self.total / self.count
+        if sampled == blocks:
+            return ratio, 0.0
+        if sampled < 2:
+            return ratio, None
+        # Разброс остатков total - ratio * count между блоками
+        residuals = (self.total2 - 2 * ratio * self.product
+                     + ratio * ratio * self.count2)
+        variance = max(residuals, 0.0) / (sampled - 1)
+        mean_count = self.count / sampled
+        share = sampled / blocks
+        error = math.sqrt((1 - share) * variance / sampled) / mean_count
+        return ratio, Z_95 * error
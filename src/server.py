@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+from urllib.parse import parse_qs, urlsplit
+
+from csv_reader import CSVReader, QueryError
+from table_cache import MAX_TABLES, MemoryTables
+
+STATUS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+class ForbiddenPathError(QueryError):
+    """Путь к файлу вне папки сервера"""
+
+
+# Сервер запросов: таблицы разобраны один раз и хранятся в памяти
+class QueryServer:
+    """
+    HTTP сервер на asyncio для запросов к csv файлам без запуска
+    нового процесса на каждый запрос.
+    Файлы загружаются в колоночные таблицы (--engine columnar)
+    и хранятся в памяти (table_cache.MemoryTables): не больше
+    max_tables таблиц, по LRU. Измененный файл разбирается заново.
+    Запросы выполняются в пуле потоков, поэтому медленный запрос
+    не задерживает прием остальных.
+
+    GET /query?file=data.csv&where=price>500&aggregate=price=avg
+    Параметры как у main.py: file (можно несколько), where и aggregate
+    (можно несколько), select, group_by, order_by, limit, format
+    (json или csv). Ответ json: {"columns": [...], "rows": [[...]]},
+    ошибка в запросе - код 400 и {"error": "..."}.
+    GET /tables - таблицы в памяти.
+
+    Атрибуты:
+    - root: str - папка, файлы из которой можно читать
+    - tables: MemoryTables - таблицы в памяти
+    - engine: str - columnar или numpy
+    """
+    def __init__(self, root=".", max_tables=MAX_TABLES, engine="columnar"):
+        self.root = os.path.realpath(root)
+        self.tables = MemoryTables(max_tables)
+        self.engine = engine
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        """
+        Запуск сервера на host:port или на Unix сокете path.
+        Возвращает asyncio.Server.
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def serve_forever(self, host="127.0.0.1", port=8765, path=None):
+        server = await self.start(host, port, path)
+        addresses = ", ".join(str(sock.getsockname())
+                              for sock in server.sockets)
+        print(f"Сервер запущен: {addresses}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer) -> None:
+        """
+        Обработка соединения: запросы по очереди, пока клиент
+        не закроет соединение или не попросит Connection: close
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, keep_alive = request
+                if method != "GET":
+                    response = self._json(405, {"error": "Только GET"})
+                else:
+                    response = await loop.run_in_executor(
+                        None, self.respond, target)
+                self._write(writer, *response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _read_request(reader) -> tuple[str, str, bool] | None:
+        """
+        Строка запроса и заголовки HTTP/1.x.
+        Возвращает метод, путь и нужно ли держать соединение
+        или None, если клиент закрыл соединение.
+        """
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        method, target, version = line.decode("latin-1").split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+        connection = headers.get("connection", "")
+        keep_alive = (connection == "keep-alive" if version == "HTTP/1.0"
+                      else connection != "close")
+        return method, target, keep_alive
+
+    @staticmethod
+    def _write(writer, status, content_type, body, keep_alive) -> None:
+        head = (f"HTTP/1.1 {status} {STATUS[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n")
+        if not keep_alive:
+            head += "Connection: close\r\n"
+        writer.write(head.encode("ascii") + b"\r\n" + body)
+
+    @staticmethod
+    def _json(status, data) -> tuple[int, str, bytes]:
+        return (status, "application/json; charset=utf-8",
+                json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def respond(self, target) -> tuple[int, str, bytes]:
+        """
+        Ответ на запрос target: код, тип содержимого и тело
+        """
+        url = urlsplit(target)
+        if url.path == "/tables":
+            return self._json(200, {"tables": self.tables.describe()})
+        if url.path != "/query":
+            return self._json(404, {"error": f"Нет страницы {url.path}"})
+        params = parse_qs(url.query, keep_blank_values=True)
+        try:
+            query = self.query(params)
+            rows = query.collect()
+            columns = query.columns()
+        except ForbiddenPathError as error:
+            return self._json(403, {"error": str(error)})
+        except QueryError as error:
+            return self._json(400, {"error": str(error)})
+        except Exception as error:
+            return self._json(500, {"error": repr(error)})
+        if params.get("format", ["json"])[-1] == "csv":
+            output = io.StringIO()
+            writer = csv.writer(output, lineterminator="\n")
+            writer.writerow(columns)
+            writer.writerows(rows)
+            return 200, "text/csv; charset=utf-8", \
+                output.getvalue().encode("utf-8")
+        return self._json(200, {"columns": columns, "rows": rows})
+
+    def query(self, params) -> CSVReader:
+        """
+        Запрос CSVReader по параметрам адреса
+        """
+        files = params.get("file")
+        if not files:
+            raise QueryError("Укажите параметр file")
+        paths = [path for file in files for path in self._resolve(file)]
+        # Запросы выполняются в потоках run_in_executor: fork из потока
+        # с asyncio может зависнуть, поэтому несколько файлов читаются
+        # в этом же потоке, без ProcessPoolExecutor. Таблицы в памяти
+        # (engine) бывают только у одного файла
+        if len(paths) == 1:
+            query = CSVReader(paths[0], tables=self.tables).options(
+                engine=self.engine, jobs=1)
+        else:
+            query = CSVReader(paths).options(jobs=1)
+        if "where" in params:
+            query = query.where(*params["where"])
+        if "aggregate" in params:
+            query = query.aggregate(*params["aggregate"])
+        for name in ("select", "group_by", "order_by"):
+            if name in params:
+                query = getattr(query, name)(params[name][-1])
+        if "limit" in params:
+            try:
+                query = query.limit(int(params["limit"][-1]))
+            except ValueError:
+                raise QueryError("Значение limit должно быть целым числом") \
+                    from None
+        return query
+
+    def _resolve(self, file) -> list[str]:
+        """
+        Файлы для параметра file относительно папки сервера.
+        Шаблон и папка раскрываются здесь, и каждый найденный файл
+        проверяется после раскрытия ссылок: шаблон может пройти
+        через ссылку на папку вне root. Файлы вне папки не читаются.
+        """
+        pattern = os.path.join(self.root, file)
+        self._check(os.path.realpath(pattern), file)
+        paths = [os.path.realpath(path)
+                 for path in CSVReader(pattern).files()]
+        for path in paths:
+            self._check(path, file)
+        return paths
+
+    def _check(self, path, file) -> None:
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ForbiddenPathError(f"Файл {file} вне папки сервера")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="main.py serve", add_help=False,
+        description="Сервер запросов к csv файлам: таблицы разбираются "
+                    "один раз и хранятся в памяти")
+    parser.add_argument("-h", "--help", action="help", help="Показать справку")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Адрес сервера (по умолчанию только локальный)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", default=None,
+                        help="Unix сокет вместо --host и --port")
+    parser.add_argument("--root", default=".",
+                        help="Папка с csv файлами, пути в запросах - "
+                             "относительно нее")
+    parser.add_argument("--max-tables", type=int, default=MAX_TABLES,
+                        help="Сколько разобранных таблиц держать в памяти")
+    parser.add_argument("-e", "--engine", choices=["columnar", "numpy"],
+                        default="columnar")
+    args = parser.parse_args(argv)
+
+    server = QueryServer(args.root, args.max_tables, args.engine)
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
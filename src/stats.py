@@ -0,0 +1,192 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Порядок этапов в отчете: от чтения файла к выводу
+PIPELINE = ("read", "load", "scan", "parse", "filter", "aggregate", "order",
+            "select", "decode", "output")
+
+
+def peak_rss_bytes() -> int | None:
+    """
+    Пиковая память процесса (getrusage) в байтах или None,
+    если ее не узнать (нет модуля resource)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На macOS ru_maxrss в байтах, на Linux - в КБ
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Время и число строк по этапам запроса (--stats)
+class Stage:
+    """
+    Счетчики одного этапа.
+
+    Атрибуты:
+    - wall: float - время этапа без вложенных этапов, секунды
+    - cpu: float - процессорное время этапа без вложенных этапов
+    - rows: int | None - число строк на выходе этапа
+    """
+    __slots__ = ("wall", "cpu", "rows")
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows = None
+
+
+class Stats:
+    """
+    Статистика выполнения запроса по этапам.
+    В каждый момент время начисляется этапу на вершине стека:
+    когда этап вызывает предыдущий (фильтр просит строку у разбора),
+    время предыдущего вычитается, поэтому время этапа - только
+    его собственная работа. Время вне этапов не начисляется никому.
+
+    Атрибуты:
+    - stages: dict[str, Stage] - счетчики этапов
+    - bytes_read: int - сколько байт файлов прочитано
+    - trace_memory: bool - считать пик памяти Python через tracemalloc.
+      tracemalloc замедляет выделение памяти в несколько раз
+      и искажает время этапов, поэтому включается отдельно
+    - peak_memory: int | None - пик памяти tracemalloc, байты
+    - peak_rss: int | None - пик памяти процесса (getrusage), байты
+    """
+    def __init__(self, trace_memory=False):
+        self.stages = {}
+        self.stack = []
+        self.bytes_read = 0
+        self.trace_memory = trace_memory
+        self.peak_memory = None
+        self.peak_rss = None
+        self.tracing = False
+        self.started = None
+        self.wall = self.cpu = 0.0
+        self.mark = (0.0, 0.0)
+
+    def start(self) -> None:
+        """
+        Начало замера. tracemalloc включается только на время запроса.
+        """
+        if self.trace_memory:
+            self.tracing = not tracemalloc.is_tracing()
+            if self.tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.started = (time.perf_counter(), time.process_time())
+        self.mark = self.started
+
+    def stop(self) -> None:
+        """
+        Конец замера: общее время и пик памяти
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+        self.wall = wall - self.started[0]
+        self.cpu = cpu - self.started[1]
+        if self.trace_memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self.tracing:
+                tracemalloc.stop()
+        self.peak_rss = peak_rss_bytes()
+
+    def _switch(self) -> None:
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self.stack:
+            stage = self.stages[self.stack[-1]]
+            stage.wall += wall - self.mark[0]
+            stage.cpu += cpu - self.mark[1]
+        self.mark = (wall, cpu)
+
+    def enter(self, name) -> Stage:
+        self._switch()
+        self.stack.append(name)
+        return self.stages.setdefault(name, Stage())
+
+    def leave(self) -> None:
+        self._switch()
+        self.stack.pop()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Этап, который выполняется целиком внутри блока with
+        """
+        stage = self.enter(name)
+        try:
+            yield stage
+        finally:
+            self.leave()
+
+    def count(self, name, rows):
+        """
+        Этап-поток: время получения каждой строки из rows начисляется
+        этапу name, строки на выходе считаются
+        """
+        stage = self.stages.setdefault(name, Stage())
+        stage.rows = stage.rows or 0
+        rows = iter(rows)
+        while True:
+            self.enter(name)
+            try:
+                row = next(rows, None)
+            finally:
+                self.leave()
+            if row is None:
+                return
+            stage.rows += 1
+            yield row
+
+    def report(self) -> dict:
+        """
+        Отчет: этапы в порядке PIPELINE со строками на входе
+        (выход предыдущего этапа) и на выходе, итоги запроса
+        """
+        names = sorted(self.stages, key=lambda name: (
+            PIPELINE.index(name) if name in PIPELINE else len(PIPELINE)))
+        stages = []
+        rows_in = None
+        for name in names:
+            stage = self.stages[name]
+            # Скорость этапа - по строкам на входе, а для первого
+            # этапа (разбор, загрузка) - по строкам на выходе
+            processed = rows_in if rows_in is not None else stage.rows
+            stages.append({
+                "stage": name,
+                "wall_seconds": stage.wall,
+                "cpu_seconds": stage.cpu,
+                "rows_in": rows_in,
+                "rows_out": stage.rows,
+                "rows_per_second": (processed / stage.wall
+                                    if processed is not None and stage.wall
+                                    else None),
+            })
+            if stage.rows is not None:
+                rows_in = stage.rows
+        source = next((self.stages[name].rows for name in names
+                       if self.stages[name].rows is not None), None)
+        return {
+            "stages": stages,
+            "total": {
+                "wall_seconds": self.wall,
+                "cpu_seconds": self.cpu,
+                "rows": source,
+                "rows_per_second": (source / self.wall
+                                    if source is not None and self.wall
+                                    else None),
+                "bytes_read": self.bytes_read,
+                "peak_memory_bytes": self.peak_memory,
+                "peak_rss_bytes": self.peak_rss,
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), ensure_ascii=False, indent=2)
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+from columnar import ColumnTable, restore_column
+
+MAX_CACHE_BYTES = 1 << 30
+MAX_TABLES = 8
+SAMPLE_BYTES = 1 << 16
+MAGIC = b"CSVRTBL1"
+SUFFIX = ".table"
+LENGTH = struct.Struct("<Q")
+
+
+# Кеш разобранных колоночных таблиц на диске
+def default_directory() -> str:
+    """
+    Папка кеша: $XDG_CACHE_HOME/csv_reader или ~/.cache/csv_reader
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "csv_reader")
+
+
+def fingerprint(path) -> dict:
+    """
+    Признаки версии файла: путь, размер, время изменения и хеш
+    первых и последних SAMPLE_BYTES байт. Хеш ловит перезапись
+    с сохранением размера и времени (cp -p, rsync), не читая файл целиком.
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        digest.update(file.read(SAMPLE_BYTES))
+        if stat.st_size > SAMPLE_BYTES:
+            file.seek(max(stat.st_size - SAMPLE_BYTES, SAMPLE_BYTES))
+            digest.update(file.read())
+    return {"path": os.path.abspath(path), "size": stat.st_size,
+            "mtime": stat.st_mtime_ns, "hash": digest.hexdigest()}
+
+
+def write_table(file, table, source) -> None:
+    """
+    Запись таблицы в двоичном виде: MAGIC, длина и JSON с описанием
+    (источник, заголовки, типы, словари строк), затем буферы столбцов
+    подряд как есть.
+    """
+    meta = {
+        "source": source,
+        "byteorder": sys.byteorder,
+        "headers": table.headers,
+        "columns": [{
+            "kind": column.kind,
+            "itemsize": column.values.itemsize,
+            "length": len(column),
+            "dictionary": getattr(column, "dictionary", None),
+        } for column in table.columns],
+    }
+    encoded = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    file.write(MAGIC)
+    file.write(LENGTH.pack(len(encoded)))
+    file.write(encoded)
+    for column in table.columns:
+        column.values.tofile(file)
+
+
+def read_table(file, source=None) -> ColumnTable | None:
+    """
+    Чтение таблицы, записанной write_table.
+    Возвращает None, если файл не кеш таблицы, записан на машине
+    с другим порядком байт или для другой версии источника.
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        return None
+    (size,) = LENGTH.unpack(file.read(LENGTH.size))
+    meta = json.loads(file.read(size).decode("utf-8"))
+    if meta["byteorder"] != sys.byteorder:
+        return None
+    if source is not None and meta["source"] != source:
+        return None
+    columns = []
+    for spec in meta["columns"]:
+        data = file.read(spec["itemsize"] * spec["length"])
+        if len(data) != spec["itemsize"] * spec["length"]:
+            return None
+        column = restore_column(spec["kind"], data, spec["dictionary"])
+        if column.values.itemsize != spec["itemsize"]:
+            return None
+        columns.append(column)
+    return ColumnTable(meta["headers"], columns)
+
+
+class TableCache:
+    """
+    Кеш колоночных таблиц в папке directory.
+    Для каждого csv файла хранится один файл кеша, имя которого -
+    хеш абсолютного пути. Кеш используется, только если признаки
+    версии (fingerprint) совпадают с текущим файлом.
+
+    Общий размер папки ограничен max_bytes: после записи удаляются
+    давно не использованные файлы (LRU). Время использования -
+    время изменения файла кеша, оно обновляется при каждом чтении.
+
+    Атрибуты:
+    - directory: str - папка кеша
+    - max_bytes: int - предельный размер папки
+    """
+    def __init__(self, directory=None, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+
+    def entry(self, path) -> str:
+        """
+        Путь к файлу кеша для csv файла path
+        """
+        name = hashlib.sha256(
+            os.path.abspath(path).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, name + SUFFIX)
+
+    def get(self, path, source) -> ColumnTable | None:
+        """
+        Таблица из кеша или None, если ее нет или она устарела.
+        Поврежденный файл кеша считается промахом.
+        """
+        entry = self.entry(path)
+        try:
+            with open(entry, "rb") as file:
+                table = read_table(file, source)
+            if table is not None:
+                os.utime(entry)
+            return table
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            return None
+
+    def put(self, path, source, table) -> None:
+        """
+        Сохранение таблицы в кеш. Файл пишется во временный
+        и переименовывается, поэтому параллельный запуск не прочитает
+        недописанный кеш. Ошибки записи (нет места, нет прав)
+        не мешают выполнению запроса.
+        """
+        entry = self.entry(path)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(
+                dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as file:
+                    write_table(file, table, source)
+                os.replace(temporary, entry)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+            self.evict(keep=entry)
+        except OSError:
+            return
+
+    def evict(self, keep=None) -> None:
+        """
+        Удаление самых старых по использованию файлов кеша,
+        пока их общий размер больше max_bytes. Файл keep не удаляется.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+
+
+class MemoryTables:
+    """
+    Таблицы в памяти процесса для долго работающего сервера.
+    Интерфейс get и put тот же, что у TableCache, поэтому CSVReader
+    использует его вместо кеша на диске. Таблица выдается, только
+    если признаки версии файла (fingerprint) совпадают: измененный
+    файл разбирается заново. Хранится не больше max_tables таблиц,
+    лишние удаляются по LRU. Методы можно вызывать из разных потоков.
+
+    Атрибуты:
+    - max_tables: int - сколько таблиц держать в памяти
+    - tables: OrderedDict - абсолютный путь -> (признаки версии, таблица)
+    """
+    def __init__(self, max_tables=MAX_TABLES):
+        self.max_tables = max_tables
+        self.tables = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path, source) -> ColumnTable | None:
+        key = os.path.abspath(path)
+        with self.lock:
+            entry = self.tables.get(key)
+            if entry is None or entry[0] != source:
+                return None
+            self.tables.move_to_end(key)
+            return entry[1]
+
+    def put(self, path, source, table) -> None:
+        key = os.path.abspath(path)
+        with self.lock:
+            self.tables[key] = (source, table)
+            self.tables.move_to_end(key)
+            while len(self.tables) > self.max_tables:
+                self.tables.popitem(last=False)
+
+    def describe(self) -> list[dict]:
+        """
+        Таблицы в памяти от давно не использованных к недавним
+        """
+        with self.lock:
+            return [{"path": path, "rows": table.row_count,
+                     "columns": len(table.headers)}
+                    for path, (_, table) in self.tables.items()]
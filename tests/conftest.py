@@ -31,3 +31,9 @@ def test_data_dir():
 def code_dir():
     """Возвращает путь к папке src"""
     return Path(__file__).parent.parent / "src"
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    """Кеш таблиц во временной папке, а не в ~/.cache"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg_cache"))
@@ -0,0 +1,86 @@
+import random
+import statistics
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from aggregators import create_aggregator
+
+
+def fill(name, values):
+    """Создает аккумулятор и передает ему значения"""
+    aggregator = create_aggregator(name)
+    for value in values:
+        aggregator.add(value)
+    return aggregator
+
+
+class TestAggregators:
+    """Тесты для аккумуляторов агрегации"""
+
+    @pytest.fixture
+    def values(self):
+        """Воспроизводимая выборка из нормального распределения"""
+        rnd = random.Random(42)
+        return [rnd.gauss(100, 15) for _ in range(20000)]
+
+    def test_basic_aggregations(self):
+        """Тест min, max, sum, avg, count"""
+        values = [3.0, 1.0, 2.0]
+        assert fill("min", values).result() == 1.0
+        assert fill("max", values).result() == 3.0
+        assert fill("sum", values).result() == 6.0
+        assert fill("avg", values).result() == 2.0
+        assert fill("count", values).result() == 3
+
+    def test_empty_result(self):
+        """Тест результата без значений"""
+        for name in ["min", "max", "sum", "avg", "var", "stddev", "p95"]:
+            assert create_aggregator(name).result() is None
+        assert create_aggregator("count").result() == 0
+
+    def test_count_distinct(self):
+        """Тест точного и приблизительного числа уникальных значений"""
+        values = [str(i % 5000) for i in range(20000)]
+        assert fill("count_distinct", values).result() == 5000
+        approx = fill("approx_distinct", values).result()
+        assert abs(approx - 5000) / 5000 < 0.03
+
+    def test_variance_and_stddev(self, values):
+        """Тест дисперсии и отклонения по Велфорду"""
+        assert fill("var", values).result() == round(
+            statistics.variance(values), 2)
+        assert fill("stddev", values).result() == round(
+            statistics.stdev(values), 2)
+
+    def test_percentiles(self, values):
+        """Тест приблизительных перцентилей"""
+        ordered = sorted(values)
+        for percent in [5, 50, 95, 99]:
+            expected = ordered[int(percent / 100 * len(ordered))]
+            assert fill(f"p{percent}", values).result() == pytest.approx(
+                expected, rel=0.01)
+        assert fill("p0", values).result() == round(ordered[0], 2)
+        assert fill("p100", values).result() == round(ordered[-1], 2)
+        assert fill("median", [1.0, 2.0, 3.0]).result() == 2.0
+
+    @pytest.mark.parametrize("name", [
+        "min", "max", "sum", "avg", "count", "count_distinct",
+        "approx_distinct", "var", "stddev", "p90"])
+    def test_merge_matches_single_pass(self, values, name):
+        """Тест объединения частичных состояний"""
+        left = fill(name, values[:7000])
+        left.merge(fill(name, values[7000:]))
+        assert left.result() == pytest.approx(
+            fill(name, values).result(), rel=0.01)
+
+    def test_unknown_aggregation(self):
+        """Тест неизвестной агрегации"""
+        with pytest.raises(ValueError):
+            create_aggregator("p101")
+        with pytest.raises(ValueError):
+            create_aggregator("mode")
@@ -0,0 +1,114 @@
+import csv
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к корню проекта для пакета benchmarks
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.generate import count, generate
+from benchmarks.measure import measure
+from benchmarks.run import compare
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.startup import (LAZY_MODULES, PLAIN_LAZY_MODULES, PLAIN_QUERY,
+                                measure_startup, parse_importtime)
+
+
+class TestGenerate:
+    """Тесты генератора csv файлов"""
+
+    def test_deterministic(self):
+        """Тест: одинаковые параметры - одинаковый файл, другой seed - другой"""
+        files = []
+        for seed in (1, 1, 2):
+            file = io.StringIO()
+            generate(file, 100, columns=6, cardinality=5, seed=seed)
+            files.append(file.getvalue())
+        assert files[0] == files[1]
+        assert files[0] != files[2]
+
+    def test_shape(self):
+        """Тест числа строк, столбцов и значений текстового столбца"""
+        file = io.StringIO()
+        generate(file, 25000, columns=7, cardinality=3)
+        rows = list(csv.reader(io.StringIO(file.getvalue())))
+        assert rows[0] == ["id", "brand", "price", "rating", "c4", "c5", "c6"]
+        assert len(rows) == 25001
+        assert {len(row) for row in rows} == {7}
+        assert {row[1] for row in rows[1:]} == {"brand0", "brand1", "brand2"}
+
+    @pytest.mark.parametrize("text, expected", [("1e4", 10000), ("250", 250)])
+    def test_count(self, text, expected):
+        """Тест разбора числа строк вида 1e6"""
+        assert count(text) == expected
+
+
+class TestMeasure:
+    """Тесты замера сценариев"""
+
+    @pytest.fixture
+    def generated_file(self, tmp_path):
+        path = tmp_path / "data.csv"
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            generate(file, 2000, cardinality=10)
+        return str(path)
+
+    @pytest.mark.parametrize("name", ["print_stream", "combined"])
+    def test_measure(self, generated_file, name):
+        """Тест: сценарий выполняется, метрики заполнены"""
+        result = measure(generated_file, SCENARIOS[name], 2000)
+        assert result["seconds"] > 0
+        assert result["rows_per_second"] > 0
+        assert 0 <= result["first_row_seconds"] <= result["seconds"]
+
+    def test_compare(self):
+        """Тест: регрессия - только ухудшение больше допуска"""
+        baseline = {"scenarios": {
+            "aggregate": {"rows_per_second": 1000, "peak_rss_kb": 100,
+                          "first_row_seconds": 1.0},
+            "print": {"rows_per_second": 1000, "peak_rss_kb": 100,
+                      "first_row_seconds": None},
+        }}
+        current = {"scenarios": {
+            "aggregate": {"rows_per_second": 700, "peak_rss_kb": 110,
+                          "first_row_seconds": 0.5},
+            "print": {"rows_per_second": 2000, "peak_rss_kb": 200,
+                      "first_row_seconds": 1.0},
+            "new": {"rows_per_second": 1},
+        }}
+        problems = compare(baseline, current, tolerance=0.2)
+        assert len(problems) == 2
+        assert problems[0].startswith("aggregate: rows_per_second")
+        assert problems[1].startswith("print: peak_rss_kb")
+
+
+class TestStartup:
+    """Тесты замера запуска"""
+
+    def test_parse_importtime(self):
+        """Тест разбора вывода -X importtime"""
+        text = ("import time: self [us] | cumulative | imported package\n"
+                "import time:       120 |        120 |   csv\n"
+                "import time:      3000 |       3120 | csv_reader\n"
+                "999\n")
+        assert parse_importtime(text) == {"csv": (120, 120),
+                                          "csv_reader": (3000, 3120)}
+
+    def test_short_query_is_lazy(self):
+        """Тест: агрегат в csv не загружает tabulate, NumPy и процессы"""
+        path = str(Path(__file__).parent / "test_data" / "test.csv")
+        result = measure_startup(path)
+        assert result["lazy_loaded"] == []
+        assert result["import_ms"] > 0
+
+    def test_plain_query_is_lazy(self):
+        """
+        Тест: обычный запрос не загружает модули колоночного и сжатого
+        файла, индексов, групп, --stats, кеша, --sample и --follow
+        """
+        path = str(Path(__file__).parent / "test_data" / "test.csv")
+        result = measure_startup(path, PLAIN_QUERY,
+                                 LAZY_MODULES + PLAIN_LAZY_MODULES)
+        assert result["lazy_loaded"] == []
@@ -0,0 +1,203 @@
+import csv
+import gzip
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from column_file import (MAGIC, ColumnFile, MissingColumn, TextRange, convert,
+                         is_column_file, output_path)
+from csv_reader import CSVReader, QueryError
+from filters import compile_expression
+
+DATA = Path(__file__).parent / "test_data"
+
+
+class TestColumnFile:
+    """Тесты записи и чтения колоночного файла"""
+
+    @pytest.fixture
+    def column_path(self, tmp_path):
+        """test.csv в колоночном файле по 3 строки в блоке"""
+        return convert(str(DATA / "test.csv"), str(tmp_path / "test.csvc"),
+                       chunk_rows=3)
+
+    def test_round_trip(self, column_path):
+        """Тест: блоки восстанавливают текст csv файла"""
+        with open(DATA / "test.csv", encoding="utf-8") as file:
+            expected = list(csv.reader(file))
+        column_file = ColumnFile(column_path)
+        rows = [row for number in range(len(column_file.chunks))
+                for row in column_file.read_chunk(number).text_rows()]
+        assert is_column_file(column_path)
+        assert not is_column_file(str(DATA / "test.csv"))
+        assert column_file.headers == expected[0]
+        assert column_file.row_count == 10
+        assert [chunk["rows"] for chunk in column_file.chunks] == [3, 3, 3, 1]
+        assert rows == expected[1:]
+
+    def test_kinds_and_statistics(self, column_path):
+        """Тест: типы столбцов и минимум и максимум блоков"""
+        column_file = ColumnFile(column_path)
+        assert column_file.describe() == [["name", "str"], ["brand", "str"],
+                                          ["price", "int"],
+                                          ["rating", "float"]]
+        first = column_file.chunks[0]["columns"]
+        assert (first[1]["min"], first[1]["max"]) == ("apple", "xiaomi")
+        assert (first[2]["min"], first[2]["max"]) == (199, 1199)
+
+    def test_chunks_with_different_kinds(self, tmp_path):
+        """Тест: тип столбца выбирается в каждом блоке отдельно"""
+        source = tmp_path / "mixed.csv"
+        source.write_text("code\n1\n2\n3\nA7\n", encoding="utf-8")
+        column_file = ColumnFile(convert(str(source), chunk_rows=3))
+        assert column_file.describe() == [["code", "int,str"]]
+        assert CSVReader(str(tmp_path / "mixed.csvc")).where("code>=2") \
+            .collect() == CSVReader(str(source)).where("code>=2").collect()
+
+    def test_pruned_chunks_not_read(self, column_path):
+        """Тест: блоки вне условия и лишние столбцы не читаются"""
+        column_file = ColumnFile(column_path)
+        node = compile_expression(["price>1000"], column_file.headers)
+        assert [column_file.may_match(number, node)
+                for number in range(4)] == [True, False, False, False]
+
+        footer = column_file.bytes_read
+        table = column_file.read_chunk(0, [2])
+        assert isinstance(table.columns[0], MissingColumn)
+        assert column_file.bytes_read - footer == 3 * 8
+        assert list(table.text_rows()) == [["", "", "999", ""],
+                                           ["", "", "1199", ""],
+                                           ["", "", "199", ""]]
+
+    def test_text_range(self):
+        """Тест отбора блоков по минимуму и максимуму текста"""
+        ranges = {"brand": TextRange(["apple", "samsung", None],
+                                     ["honor", "xiaomi", None])}
+        headers = ["brand"]
+
+        def blocks(expression):
+            return ranges["brand"].blocks(
+                compile_expression([expression], headers))
+        assert blocks("brand=samsung") == 0b010
+        assert blocks("brand=nokia") == 0
+        assert blocks("brand<b") == 0b001
+        assert blocks("brand!=apple") is None
+        assert ranges["brand"].blocks(compile_expression(
+            ["brand IN (apple, xiaomi)"], headers)) == 0b011
+
+    @pytest.mark.parametrize("damage", [
+        lambda data: data[:-4],
+        lambda data: data[:len(MAGIC) + 10],
+        lambda data: data[:-20] + data[-16:],
+    ])
+    def test_corrupt_file(self, column_path, damage):
+        """Тест: обрезанный или испорченный файл - ошибка запроса"""
+        path = Path(column_path)
+        path.write_bytes(damage(path.read_bytes()))
+        with pytest.raises(QueryError, match="поврежден"):
+            CSVReader(column_path).collect()
+
+    def test_output_path(self, tmp_path):
+        """Тест пути колоночного файла по умолчанию"""
+        assert output_path("data/sales.csv") == "data/sales.csvc"
+        assert output_path("sales.csv.gz") == "sales.csvc"
+        assert output_path("sales") == "sales.csvc"
+
+        source = tmp_path / "test.csv.gz"
+        source.write_bytes(gzip.compress((DATA / "test.csv").read_bytes()))
+        assert convert(str(source)) == str(tmp_path / "test.csvc")
+        assert ColumnFile(str(tmp_path / "test.csvc")).row_count == 10
+        assert not (tmp_path / "test.csvc.tmp").exists()
+
+
+class TestQueries:
+    """Тесты запросов к колоночному файлу через CSVReader"""
+
+    @pytest.fixture(scope="class")
+    @classmethod
+    def paths(cls, tmp_path_factory):
+        """Пара: csv файл и его колоночный файл с блоками по 3 строки"""
+        output = tmp_path_factory.mktemp("column") / "test.csvc"
+        return str(DATA / "test.csv"), convert(str(DATA / "test.csv"),
+                                               str(output), chunk_rows=3)
+
+    @pytest.mark.parametrize("query", [
+        {},
+        {"where": ["price>500"]},
+        {"where": ["brand=xiaomi", "rating>=4.4"]},
+        {"where": ["price>5000"]},
+        {"where": ["brand IN (apple, samsung) OR price<200"]},
+        {"select": ["name", "price"], "where": ["rating<4.5"]},
+        {"select": ["name"], "order_by": "price:desc", "limit": 3},
+        {"aggregate": ["price=avg", "rating=max"]},
+        {"group_by": ["brand"], "aggregate": ["price=sum", "price=count"],
+         "where": ["price<900"], "order_by": "brand"},
+        {"where": ["name LIKE iphone%"], "aggregate": ["price=min"]},
+    ])
+    def test_same_as_csv(self, paths, query):
+        """Тест: ответ как у запроса к csv файлу"""
+        def run(path):
+            reader = CSVReader(path)
+            if "where" in query:
+                reader = reader.where(*query["where"])
+            if "select" in query:
+                reader = reader.select(*query["select"])
+            if "group_by" in query:
+                reader = reader.group_by(*query["group_by"])
+            if "aggregate" in query:
+                reader = reader.aggregate(*query["aggregate"])
+            if "order_by" in query:
+                reader = reader.order_by(query["order_by"])
+            if "limit" in query:
+                reader = reader.limit(query["limit"])
+            return reader.columns(), reader.collect()
+        assert run(paths[1]) == run(paths[0])
+
+    def test_stats_count_only_read_bytes(self, paths, capsys):
+        """Тест: --stats считает байты только прочитанных блоков"""
+        CSVReader(paths[1]).where("price>1000").aggregate("price=count") \
+            .options(stats="json", format="csv").read()
+        captured = capsys.readouterr()
+        report = json.loads(captured.err)
+        stages = [stage["stage"] for stage in report["stages"]]
+        assert captured.out == "price=count\n1\n"
+        assert stages == ["read", "load", "filter", "aggregate", "output"]
+        assert report["total"]["bytes_read"] == 3 * 8
+
+    def test_not_mixed_with_csv(self, paths):
+        """Тест: колоночный файл читается только отдельно"""
+        with pytest.raises(QueryError, match="отдельно"):
+            CSVReader(list(paths)).collect()
+
+    def test_unsupported_modes(self, paths):
+        """Тест: --follow и --build-index для колоночного файла - ошибка"""
+        with pytest.raises(QueryError, match="--follow"):
+            CSVReader(paths[1]).follow()
+        with pytest.raises(QueryError, match="Индекс не нужен"):
+            CSVReader(paths[1]).build_index("price")
+
+    def test_convert_command(self, tmp_path):
+        """Тест команды main.py convert"""
+        main = Path(__file__).parent.parent / "src" / "main.py"
+        output = tmp_path / "large.csvc"
+        result = subprocess.run(
+            [sys.executable, str(main), "convert",
+             str(DATA / "large_test.csv"), "-o", str(output)],
+            capture_output=True, text=True)
+        assert result.returncode == 0
+        assert re.search(r"\| price +\| int +\|", result.stdout)
+        assert f"{output}: строк" in result.stdout
+
+        result = subprocess.run(
+            [sys.executable, str(main), "-f", str(output), "-a",
+             "price=count", "-F", "csv"], capture_output=True, text=True)
+        with open(DATA / "large_test.csv", encoding="utf-8") as file:
+            count = sum(1 for _ in file) - 1
+        assert result.stdout == f"price=count\n{count}\n"
@@ -0,0 +1,94 @@
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import columnar
+from columnar import ColumnTable, infer_kind
+from filters import compile_expression
+
+
+class TestColumnTable:
+    """Тесты колоночной таблицы с типами"""
+
+    @pytest.fixture
+    def large_rows(self):
+        """Заголовки и строки large_test.csv"""
+        path = Path(__file__).parent / "test_data" / "large_test.csv"
+        with open(path, "r", encoding="utf-8") as file:
+            rows = list(csv.reader(file))
+        return rows[0], rows[1:]
+
+    @pytest.mark.parametrize("texts, kind", [
+        (["true", "false"], "bool"),
+        (["1", "-20", "300"], "int"),
+        (["4.5", "1.0"], "float"),
+        (["4.50", "1.0"], "str"),
+        (["007"], "str"),
+        (["1", "2.5"], "str"),
+        ([], "str"),
+    ])
+    def test_infer_kind(self, texts, kind):
+        """Тест выбора типа без потери исходного текста"""
+        assert infer_kind(texts) == kind
+
+    def test_schema_and_round_trip(self, large_rows):
+        """Тест схемы large_test.csv и восстановления текста"""
+        headers, rows = large_rows
+        table = ColumnTable.from_rows(headers, rows)
+        assert table.schema == {
+            "name": "str", "brand": "str", "price": "int", "rating": "float",
+            "storage": "int", "color": "str", "release_year": "int",
+            # В файле есть значение "true " с пробелом
+            "is_available": "str"}
+        assert table.row_count == len(rows)
+        assert table.text_rows() == rows
+
+    def test_dictionary_encoding(self, large_rows):
+        """Тест хранения каждой строки один раз"""
+        headers, rows = large_rows
+        table = ColumnTable.from_rows(headers, rows)
+        brand = table.columns[headers.index("brand")]
+        assert len(brand.dictionary) == len({row[1] for row in rows})
+        assert brand.values.typecode == "I"
+
+    def test_column_falls_back_to_str(self, monkeypatch):
+        """Тест перевода столбца в str после выборки для схемы"""
+        monkeypatch.setattr(columnar, "CHUNK_SIZE", 2)
+        rows = [["1", "x"], ["2", "y"], ["3", "z"], ["n/a", "w"], ["5", "v"]]
+        table = ColumnTable.from_rows(["a", "b"], rows, sample_size=2)
+        assert table.schema == {"a": "str", "b": "str"}
+        assert table.text_rows() == rows
+
+    def test_short_rows_padded(self):
+        """Тест строк с недостающими ячейками"""
+        table = ColumnTable.from_rows(["a", "b"], [["1", "2"], ["3"]])
+        assert table.text_rows() == [["1", "2"], ["3", ""]]
+
+    @pytest.mark.parametrize("expression", [
+        "brand=Apple",
+        "price>500 AND rating>=4.8",
+        "price>=999.5 OR storage<128",
+        "name LIKE '%Pro' OR is_available=false",
+        "NOT release_year IN (2023, 2022)",
+        "brand>S",
+        "rating!=4.5 AND NOT (color=Black OR price<300)",
+    ])
+    def test_select_matches_row_filter(self, large_rows, expression):
+        """Тест совпадения фильтра по столбцам с фильтром по строкам"""
+        headers, rows = large_rows
+        table = ColumnTable.from_rows(headers, rows)
+        node = compile_expression(expression, headers)
+        expected = [index for index, row in enumerate(rows) if node.test(row)]
+        assert node.select(table) == expected
+
+    def test_aggregate_rows(self, large_rows):
+        """Тест строк для агрегации: числа и None вместо лишних столбцов"""
+        headers, rows = large_rows
+        table = ColumnTable.from_rows(headers, rows)
+        first = next(table.aggregate_rows([0, 1], [1, 2]))
+        assert first == (None, "Apple", 999) + (None,) * 5
@@ -0,0 +1,121 @@
+import bz2
+import gzip
+import io
+import lzma
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from compression import ThreadedReader, detect, open_text
+from csv_reader import CSVReader, QueryError
+
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+
+
+class TestCompression:
+    """Тесты чтения сжатых csv файлов"""
+
+    @pytest.fixture
+    def sample_csv_file(self):
+        """Возвращает путь к существующему CSV файлу с тестовыми данными"""
+        return str(Path(__file__).parent / "test_data" / "test.csv")
+
+    def compress(self, source, target, kind):
+        """Сжимает файл source в target форматом kind"""
+        data = Path(source).read_bytes()
+        Path(target).write_bytes(COMPRESSORS[kind](data))
+        return str(target)
+
+    @pytest.mark.parametrize("kind", sorted(COMPRESSORS))
+    def test_detect_and_read(self, sample_csv_file, tmp_path, kind):
+        """Тест: формат определяется по первым байтам, а не расширению"""
+        path = self.compress(sample_csv_file, tmp_path / "data.csv", kind)
+        assert detect(path) == kind
+        with open_text(path) as file:
+            assert file.read() == Path(sample_csv_file).read_text(
+                encoding="utf-8")
+
+    def test_plain_file(self, sample_csv_file):
+        """Тест: несжатый файл открывается как обычно"""
+        assert detect(sample_csv_file) is None
+
+    def test_zstd(self, sample_csv_file, tmp_path):
+        """Тест чтения zstd (нужен zstandard)"""
+        zstandard = pytest.importorskip("zstandard")
+        path = tmp_path / "data.csv.zst"
+        path.write_bytes(zstandard.ZstdCompressor().compress(
+            Path(sample_csv_file).read_bytes()))
+        assert detect(str(path)) == "zstd"
+        expected = CSVReader(sample_csv_file).aggregate("price=max").collect()
+        assert CSVReader(str(path)).aggregate("price=max").collect() == \
+            expected
+
+    @pytest.mark.parametrize("options", [
+        {}, {"mmap": True}, {"jobs": 2}, {"engine": "columnar", "cache": False},
+    ])
+    def test_query_same_as_plain(self, sample_csv_file, tmp_path, options):
+        """Тест: запрос к сжатому файлу дает тот же результат"""
+        path = self.compress(sample_csv_file, tmp_path / "data.csv.gz", "gzip")
+        query = CSVReader(sample_csv_file).where("price>300") \
+            .order_by("price:desc").options(**options)
+        compressed = CSVReader(path).where("price>300") \
+            .order_by("price:desc").options(**options)
+        if "mmap" in options or "jobs" in options:
+            with pytest.warns(RuntimeWarning, match="сжатого"):
+                rows = compressed.collect()
+        else:
+            rows = compressed.collect()
+        assert rows == query.collect()
+
+    def test_directory_with_compressed_files(self, sample_csv_file, tmp_path):
+        """Тест: в папке читаются и сжатые, и обычные файлы"""
+        shutil.copy(sample_csv_file, tmp_path / "a.csv")
+        self.compress(sample_csv_file, tmp_path / "b.csv.gz", "gzip")
+        self.compress(sample_csv_file, tmp_path / "c.csv.xz", "xz")
+        count = CSVReader(sample_csv_file).aggregate("price=count").collect()
+        result = CSVReader(str(tmp_path)).aggregate("price=count").collect()
+        assert int(result[0][0]) == 3 * int(count[0][0])
+
+    def test_build_index_fails(self, sample_csv_file, tmp_path):
+        """Тест: индекс для сжатого файла не строится"""
+        path = self.compress(sample_csv_file, tmp_path / "data.csv.gz", "gzip")
+        with pytest.raises(QueryError, match="сжатого"):
+            CSVReader(path).build_index("brand")
+
+
+class TestThreadedReader:
+    """Тесты распаковки в фоновом потоке"""
+
+    def test_reads_everything(self):
+        """Тест: данные читаются целиком и по порядку"""
+        data = bytes(range(256)) * 1000
+        reader = io.BufferedReader(ThreadedReader(io.BytesIO(data), 1000))
+        assert reader.read() == data
+        reader.close()
+
+    def test_error_is_raised(self):
+        """Тест: ошибка распаковки бросается при чтении"""
+        data = gzip.compress(bytes(range(256)) * 1000)
+        source = gzip.GzipFile(fileobj=io.BytesIO(data[:len(data) // 2]))
+        reader = io.BufferedReader(ThreadedReader(source))
+        with pytest.raises(EOFError):
+            reader.read()
+        reader.close()
+
+    def test_close_stops_thread(self):
+        """Тест: закрытие до конца файла останавливает поток"""
+        source = io.BytesIO(b"x" * (1 << 20))
+        reader = ThreadedReader(source, 16)
+        assert reader.read(4) == b"xxxx"
+        reader.close()
+        assert not reader.thread.is_alive()
+        assert source.closed
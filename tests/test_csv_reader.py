@@ -1,15 +1,16 @@
 import pytest
+import argparse
 import os
 import tempfile
 import csv
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import sys
 from pathlib import Path
 
 # Добавляем путь к папке src
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from csv_reader import CSVReader
+from csv_reader import CSVReader, QueryError
 
 class TestCSVReader:
     """Тесты для класса CSVReader"""
@@ -33,6 +34,14 @@ class TestCSVReader:
         assert reader.path == sample_csv_file
         assert reader.args == mock_args
 
+    def test_init_partial_namespace(self, sample_csv_file, capsys):
+        """Тест: недостающие параметры Namespace берутся по умолчанию"""
+        args = argparse.Namespace(file=sample_csv_file, where=["price>900"],
+                                  aggregate=["price=max"])
+        CSVReader(sample_csv_file, args).read()
+        assert "1199" in capsys.readouterr().out
+        assert args.stats is None and args.engine == "python"
+
     def test_get_path_valid(self, sample_csv_file, mock_args):
         """Тест получения валидного пути"""
         reader = CSVReader(sample_csv_file, mock_args)
@@ -240,3 +249,437 @@ class TestCSVReader:
 
         captured = capsys.readouterr()
         assert "Агрегация поддерживается только для чисел" in captured.out
+
+    def test_iter_filter_is_lazy(self, sample_csv_file, mock_args):
+        """Тест потоковой фильтрации: строки отбираются по мере чтения"""
+        reader = CSVReader(sample_csv_file, mock_args)
+        with open(sample_csv_file, "r", encoding="utf-8") as file:
+            reader_csv = csv.reader(file)
+            reader.headers = next(reader_csv)
+            rows = reader._iter_filter("brand=apple", reader_csv)
+            assert not isinstance(rows, list)
+            assert next(rows)[0] == "iphone 15 pro"
+
+    def test_aggregate_from_iterator(self, sample_csv_file, mock_args):
+        """Тест агрегации потока строк без чтения файла в список"""
+        reader = CSVReader(sample_csv_file, mock_args)
+        with open(sample_csv_file, "r", encoding="utf-8") as file:
+            reader_csv = csv.reader(file)
+            reader.headers = next(reader_csv)
+            rows = reader._iter_filter("price>500", reader_csv)
+            result = reader._aggregate("price=avg", rows)
+        assert result == [["919.0"]]
+
+    @pytest.mark.parametrize("expression, expected", [
+        ("price=sum", "6020.0"),
+        ("name=count", "10"),
+        ("brand=count_distinct", "3"),
+        ("rating=median", "4.55"),
+    ])
+    def test_aggregate_extended(
+            self, sample_csv_file, mock_args, expression, expected):
+        """Тест дополнительных агрегаций"""
+        reader = CSVReader(sample_csv_file, mock_args)
+        with open(sample_csv_file, "r", encoding="utf-8") as file:
+            reader_csv = csv.reader(file)
+            reader.headers = next(reader_csv)
+            result = reader._aggregate(expression, reader_csv)
+        assert result == [[expected]]
+
+    @pytest.mark.parametrize("where, aggregate", [
+        (["brand=apple"], None),
+        (["price>300 AND name LIKE '%pro'"], None),
+        (["brand!=xiaomi"], "rating=avg"),
+        (None, "brand=approx_distinct"),
+    ])
+    def test_read_mmap_matches_text(
+            self, sample_csv_file, mock_args, capsys, where, aggregate):
+        """Тест одинакового вывода с --mmap и без"""
+        mock_args.where = where
+        mock_args.aggregate = aggregate
+        CSVReader(sample_csv_file, mock_args).read()
+        expected = capsys.readouterr().out
+
+        mock_args.mmap = True
+        CSVReader(sample_csv_file, mock_args).read()
+        assert capsys.readouterr().out == expected
+
+    def test_read_select_columns(self, sample_csv_file, mock_args, capsys):
+        """Тест вывода только выбранных столбцов"""
+        mock_args.where = ["brand=xiaomi"]
+        mock_args.select = "price, name"
+        reader = CSVReader(sample_csv_file, mock_args)
+        reader.read()
+
+        captured = capsys.readouterr()
+        header_line = captured.out.splitlines()[1]
+        assert header_line.index("price") < header_line.index("name")
+        assert "brand" not in captured.out
+        assert "rating" not in captured.out
+        assert "redmi note 12" in captured.out
+
+    def test_project(self):
+        """Тест выбора столбцов из строк"""
+        rows = [["a", "b", "c"], ["d", "e", "f"]]
+        assert list(CSVReader._project(rows, [2, 0])) == [
+            ["c", "a"], ["f", "d"]]
+
+    def test_aggregate_group_by(self, sample_csv_file, mock_args):
+        """Тест нескольких агрегаций с группировкой"""
+        mock_args.group_by = "brand"
+        mock_args.aggregate = ["price=max", "rating=avg"]
+        reader = CSVReader(sample_csv_file, mock_args)
+        with open(sample_csv_file, "r", encoding="utf-8") as file:
+            reader_csv = csv.reader(file)
+            reader.headers = next(reader_csv)
+            result = reader._aggregate(mock_args.aggregate, reader_csv)
+        assert result == [
+            ["apple", "999.0", "4.55"],
+            ["samsung", "1199.0", "4.53"],
+            ["xiaomi", "299.0", "4.37"],
+        ]
+        assert reader._output_headers() == ["brand", "price=max", "rating=avg"]
+
+    @pytest.mark.parametrize("where, aggregate, group_by", [
+        (["brand=apple"], None, None),
+        (["price>300 AND name LIKE '%pro'"], None, None),
+        (["brand!=xiaomi"], ["rating=avg", "price=p90"], "brand"),
+        (None, ["brand=count_distinct"], None),
+    ])
+    def test_read_columnar_matches_python(
+            self, sample_csv_file, mock_args, capsys,
+            where, aggregate, group_by):
+        """Тест одинакового вывода с --engine columnar и без"""
+        mock_args.where = where
+        mock_args.aggregate = aggregate
+        mock_args.group_by = group_by
+        CSVReader(sample_csv_file, mock_args).read()
+        expected = capsys.readouterr().out
+
+        mock_args.engine = "columnar"
+        mock_args.cache = False
+        CSVReader(sample_csv_file, mock_args).read()
+        assert capsys.readouterr().out == expected
+
+    def test_read_numpy_without_numpy(
+            self, sample_csv_file, mock_args, capsys, monkeypatch):
+        """Тест --engine numpy без NumPy: вывод как у --engine columnar"""
+        import numpy_engine
+        monkeypatch.setattr(numpy_engine, "numpy", None)
+        mock_args.where = ["price>300"]
+        mock_args.aggregate = ["rating=avg"]
+        CSVReader(sample_csv_file, mock_args).read()
+        expected = capsys.readouterr().out
+
+        mock_args.engine = "numpy"
+        mock_args.cache = False
+        CSVReader(sample_csv_file, mock_args).read()
+        captured = capsys.readouterr()
+        assert captured.out == expected
+        assert "NumPy не установлен" in captured.err
+
+    def test_read_columnar_uses_cache(
+            self, sample_csv_file, mock_args, capsys, monkeypatch, tmp_path):
+        """Тест: повторный запрос читает таблицу из кеша без разбора csv"""
+        import columnar
+        mock_args.engine = "columnar"
+        mock_args.cache = True
+        mock_args.cache_dir = str(tmp_path / "cache")
+        mock_args.where = ["brand=apple"]
+        CSVReader(sample_csv_file, mock_args).read()
+        expected = capsys.readouterr().out
+
+        def parse(*args, **kwargs):
+            raise AssertionError("csv разобран повторно")
+        monkeypatch.setattr(columnar.ColumnTable, "from_rows", parse)
+        CSVReader(sample_csv_file, mock_args).read()
+        assert capsys.readouterr().out == expected
+
+    def test_default_engine_streams_without_cache(
+            self, sample_csv_file, mock_args, capsys, monkeypatch, tmp_path):
+        """
+        Тест: запрос без --engine не загружает таблицу из кеша,
+        даже если ее сохранил --engine columnar, и читает файл потоково
+        """
+        import table_cache
+        mock_args.cache_dir = str(tmp_path / "cache")
+        mock_args.aggregate = ["price=avg"]
+        mock_args.engine = "columnar"
+        CSVReader(sample_csv_file, mock_args).read()
+        expected = capsys.readouterr().out
+
+        def get(*args, **kwargs):
+            raise AssertionError("таблица загружена из кеша")
+        monkeypatch.setattr(table_cache.TableCache, "get", get)
+        mock_args.engine = "python"
+        CSVReader(sample_csv_file, mock_args).read()
+        assert capsys.readouterr().out == expected
+
+    def test_read_with_index(
+            self, sample_csv_file, mock_args, capsys, tmp_path):
+        """Тест: с индексом результат --where тот же, устаревший индекс
+        не используется"""
+        path = tmp_path / "test.csv"
+        path.write_bytes(Path(sample_csv_file).read_bytes())
+        sample_csv_file = str(path)
+        mock_args.where = ["brand=samsung OR price<250"]
+        CSVReader(sample_csv_file, mock_args).read()
+        expected = capsys.readouterr().out
+
+        CSVReader(sample_csv_file, mock_args).build_index("brand,price")
+        assert "bitmap" in capsys.readouterr().out
+        CSVReader(sample_csv_file, mock_args).read()
+        assert capsys.readouterr().out == expected
+
+        with open(sample_csv_file, "a", encoding="utf-8") as file:
+            file.write("nokia 3310,nokia,50,3.0\n")
+        CSVReader(sample_csv_file, mock_args).read()
+        captured = capsys.readouterr()
+        assert "nokia 3310" in captured.out
+        assert "Индекс устарел" in captured.err
+
+    def test_build_index_unknown_column(self, sample_csv_file, mock_args):
+        """Тест --build-index с несуществующим столбцом"""
+        with pytest.raises(SystemExit):
+            CSVReader(sample_csv_file, mock_args).build_index("brand,weight")
+        assert not Path(sample_csv_file + ".index").exists()
+
+    @pytest.mark.parametrize("engine, jobs, use_mmap", [
+        ("python", 1, False),
+        ("python", 2, False),
+        ("python", 1, True),
+        ("columnar", 1, False),
+    ])
+    def test_order_by_limit(
+            self, sample_csv_file, mock_args, engine, jobs, use_mmap):
+        """Тест --order-by и --limit во всех способах чтения"""
+        mock_args.engine, mock_args.jobs, mock_args.mmap = \
+            engine, jobs, use_mmap
+        mock_args.order_by = "price:desc"
+        mock_args.limit = 3
+        mock_args.select = "name,brand"
+        mock_args.where = ["brand!=apple"]
+        reader = CSVReader(sample_csv_file, mock_args)
+        with patch("csv_reader.tabulate") as mock_tabulate:
+            reader.read()
+        data = mock_tabulate.call_args[0][0]
+        assert data == [["galaxy s23 ultra", "samsung"],
+                        ["galaxy z flip 5", "samsung"],
+                        ["galaxy a54", "samsung"]]
+
+        mock_args.order_by = None
+        mock_args.limit = 2
+        with patch("csv_reader.tabulate") as mock_tabulate:
+            CSVReader(sample_csv_file, mock_args).read()
+        assert [row[0] for row in mock_tabulate.call_args[0][0]] == [
+            "galaxy s23 ultra", "redmi note 12"]
+
+    def test_order_by_aggregate(self, sample_csv_file, mock_args):
+        """Тест сортировки результата агрегации по столбцу вывода"""
+        mock_args.group_by = "brand"
+        mock_args.aggregate = ["price=max"]
+        mock_args.order_by = "price=max:desc"
+        mock_args.limit = 2
+        reader = CSVReader(sample_csv_file, mock_args)
+        with patch("csv_reader.tabulate") as mock_tabulate:
+            reader.read()
+        assert mock_tabulate.call_args[0][0] == [
+            ["samsung", "1199.0"], ["apple", "999.0"]]
+
+    @pytest.mark.parametrize("order_by, limit", [
+        ("weight:desc", None),
+        (":desc", None),
+        (None, -1),
+    ])
+    def test_order_by_invalid(
+            self, sample_csv_file, mock_args, order_by, limit):
+        """Тест ошибок --order-by и --limit"""
+        mock_args.order_by = order_by
+        mock_args.limit = limit
+        with pytest.raises(SystemExit):
+            CSVReader(sample_csv_file, mock_args).read()
+
+    def test_read_stream(self, sample_csv_file, mock_args, capsys):
+        """Тест --stream: тот же вывод, что у tabulate"""
+        mock_args.where = ["price>500"]
+        mock_args.select = "name,brand,price"
+        CSVReader(sample_csv_file, mock_args).read()
+        expected = capsys.readouterr().out
+
+        mock_args.stream = True
+        CSVReader(sample_csv_file, mock_args).read()
+        assert capsys.readouterr().out == expected
+
+    def test_read_format_csv(self, sample_csv_file, mock_args, capsys):
+        """Тест --format csv: без фильтра выводится исходный файл"""
+        mock_args.format = "csv"
+        CSVReader(sample_csv_file, mock_args).read()
+        with open(sample_csv_file, "r", encoding="utf-8") as file:
+            assert capsys.readouterr().out == file.read()
+
+    def test_read_format_jsonl_aggregate(
+            self, sample_csv_file, mock_args, capsys):
+        """Тест --format jsonl для агрегации с группировкой"""
+        mock_args.format = "jsonl"
+        mock_args.group_by = "brand"
+        mock_args.aggregate = ["price=max"]
+        CSVReader(sample_csv_file, mock_args).read()
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == '{"brand": "apple", "price=max": "999.0"}'
+        assert len(lines) == 3
+
+    def test_read_format_arrow_without_pyarrow(
+            self, sample_csv_file, mock_args, capsys, monkeypatch):
+        """Тест --format arrow без pyarrow: понятная ошибка"""
+        monkeypatch.setitem(sys.modules, "pyarrow", None)
+        mock_args.format = "arrow"
+        with pytest.raises(SystemExit):
+            CSVReader(sample_csv_file, mock_args).read()
+        assert "нужен pyarrow" in capsys.readouterr().out
+
+
+class TestQueryBuilder:
+    """Тесты использования CSVReader из кода без argparse"""
+
+    @pytest.fixture
+    def sample_csv_file(self):
+        """Возвращает путь к существующему CSV файлу с тестовыми данными"""
+        return str(Path(__file__).parent / "test_data" / "test.csv")
+
+    def test_collect(self, sample_csv_file):
+        """Тест фильтра, выбора столбцов, сортировки и лимита"""
+        query = (CSVReader(sample_csv_file)
+                 .where("brand=apple")
+                 .where("price>500")
+                 .select("name", "price")
+                 .order_by("price:desc")
+                 .limit(2))
+        assert query.collect() == [["iphone 15 pro", "999"],
+                                   ["iphone 14", "799"]]
+        assert query.columns() == ["name", "price"]
+
+    def test_aggregate(self, sample_csv_file):
+        """Тест агрегации с группировкой"""
+        query = (CSVReader(sample_csv_file)
+                 .group_by("brand")
+                 .aggregate("price=max", "rating=min"))
+        assert query.columns() == ["brand", "price=max", "rating=min"]
+        assert query.collect()[0] == ["apple", "999.0", "4.1"]
+
+    def test_queries_are_independent(self, sample_csv_file):
+        """Тест: построение запроса не меняет исходный"""
+        base = CSVReader(sample_csv_file).where("brand=xiaomi")
+        cheap = base.where("price<200")
+        assert len(base.collect()) == 3
+        assert len(cheap.collect()) == 2
+
+    def test_lazy_iter_rows(self, sample_csv_file, monkeypatch):
+        """Тест: файл не читается до iter_rows, строки идут потоком"""
+        opened = []
+        real_open = open
+
+        def tracking_open(*args, **kwargs):
+            opened.append(args[0])
+            return real_open(*args, **kwargs)
+        monkeypatch.setattr("builtins.open", tracking_open)
+
+        query = CSVReader(sample_csv_file).where("price>100").limit(1)
+        assert opened == []
+        rows = query.iter_rows()
+        assert next(rows) == ["iphone 15 pro", "apple", "999", "4.9"]
+        assert list(rows) == []
+
+    @pytest.mark.parametrize("build", [
+        lambda query: query.where("weight>1"),
+        lambda query: query.where("price>"),
+        lambda query: query.aggregate("name=avg"),
+        lambda query: query.aggregate("price=unknown"),
+        lambda query: query.select("weight"),
+        lambda query: query.limit(-1),
+    ])
+    def test_errors_raise(self, sample_csv_file, build):
+        """Тест: ошибки запроса - исключение QueryError, а не выход"""
+        with pytest.raises(QueryError):
+            build(CSVReader(sample_csv_file)).collect()
+
+    def test_missing_file(self):
+        """Тест: нет файла - QueryError"""
+        with pytest.raises(QueryError, match="не найден"):
+            CSVReader("missing.csv").collect()
+
+    def test_options(self, sample_csv_file):
+        """Тест параметров чтения и проверки их названий"""
+        query = CSVReader(sample_csv_file).where("brand=samsung")
+        assert (query.options(engine="columnar", cache=False).collect()
+                == query.options(mmap=True).collect()
+                == query.collect())
+        with pytest.raises(TypeError):
+            query.options(engnie="columnar")
+
+    def test_string_options_extended(self, sample_csv_file):
+        """Тест: where и aggregate дополняют условие, заданное строкой"""
+        query = CSVReader(sample_csv_file).options(
+            where="brand=apple", aggregate="price=max")
+        assert query.where("price<900").aggregate("price=count").collect() \
+            == [["799.0", "3"]]
+
+
+class TestMultipleFiles:
+    """Тесты чтения нескольких файлов, шаблонов и папок"""
+
+    @pytest.fixture
+    def shards(self, tmp_path):
+        """Создает папку с тремя файлами с одинаковыми заголовками"""
+        prices = {"01": [100, 300], "02": [700, 50], "03": [200]}
+        for hour, values in prices.items():
+            with open(tmp_path / f"export-{hour}.csv", "w",
+                      encoding="utf-8", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(["name", "price"])
+                for value in values:
+                    writer.writerow([f"item{hour}-{value}", str(value)])
+        return tmp_path
+
+    def test_glob_max_across_shards(self, shards):
+        """Тест: максимум по всем файлам шаблона"""
+        query = CSVReader(str(shards / "export-*.csv")).aggregate("price=max")
+        assert query.collect() == [["700.0"]]
+
+    def test_directory_keeps_file_order(self, shards):
+        """Тест: папка читается как файлы *.csv по алфавиту"""
+        rows = CSVReader(str(shards)).options(jobs=1).collect()
+        assert [row[1] for row in rows] == ["100", "300", "700", "50", "200"]
+
+    @pytest.mark.parametrize("jobs", [None, 1, 2, 5])
+    def test_jobs_give_same_result(self, shards, jobs):
+        """Тест: результат не зависит от числа процессов"""
+        query = (CSVReader([str(shards / "export-01.csv"),
+                            str(shards / "export-0[23].csv")])
+                 .where("price>60").order_by("price:desc").limit(3)
+                 .options(jobs=jobs))
+        assert [row[1] for row in query.collect()] == ["700", "300", "200"]
+
+    def test_duplicates_read_once(self, shards):
+        """Тест: файл из нескольких шаблонов читается один раз"""
+        query = CSVReader([str(shards / "export-01.csv"), str(shards)])
+        assert query.aggregate("price=count").collect() == [["5"]]
+
+    def test_headers_mismatch(self, shards):
+        """Тест: разные заголовки файлов - ошибка"""
+        (shards / "export-04.csv").write_text("name,cost\nx,1\n",
+                                              encoding="utf-8")
+        with pytest.raises(QueryError, match="не совпадают"):
+            CSVReader(str(shards)).collect()
+
+    def test_pattern_skips_index_files(self, shards):
+        """Тест: шаблон без расширения не читает индексы рядом с файлами"""
+        (shards / "export-01.csv.index").write_bytes(b"\x00index")
+        query = CSVReader(str(shards / "export-*"))
+        assert query.files() == [str(shards / f"export-0{hour}.csv")
+                                 for hour in (1, 2, 3)]
+        assert query.aggregate("price=count").collect() == [["5"]]
+
+    def test_pattern_without_matches(self, shards):
+        """Тест: шаблон без файлов - ошибка, как для отсутствующего файла"""
+        with pytest.raises(QueryError, match="не найден"):
+            CSVReader(str(shards / "import-*.csv")).collect()
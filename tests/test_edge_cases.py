@@ -241,3 +241,30 @@ class TestEdgeCases:
             assert result[0][0] == "phone1"
         finally:
             os.unlink(temp_file)
+
+    def test_invalid_filter_on_empty_file(
+            self, empty_csv_file, mock_args, capsys):
+        """Тест проверки выражения фильтра, даже если строк нет"""
+        mock_args.where = "invalid_expression"
+        mock_args.aggregate = "price=avg"
+        reader = CSVReader(empty_csv_file, mock_args)
+        with pytest.raises(SystemExit) as exc_info:
+            reader.read()
+        assert exc_info.value.code == 1
+
+        captured = capsys.readouterr()
+        assert "--where в формате" in captured.out
+
+    @pytest.mark.parametrize("select, message", [
+        ("name,weight", "Колонка weight не найдена"),
+        ("name,,price", "--select в формате"),
+    ])
+    def test_invalid_select(
+            self, mixed_data_csv_file, mock_args, capsys, select, message):
+        """Тест невалидного списка столбцов"""
+        mock_args.select = select
+        reader = CSVReader(mixed_data_csv_file, mock_args)
+        with pytest.raises(SystemExit) as exc_info:
+            reader.read()
+        assert exc_info.value.code == 1
+        assert message in capsys.readouterr().out
@@ -0,0 +1,154 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from filters import (And, ColumnNotFoundError, Condition, ExpressionError,
+                     Or, compile_expression, tokenize)
+
+
+class TestCondition:
+    """Тесты для скомпилированных условий фильтрации"""
+
+    @pytest.fixture
+    def rows(self):
+        """Строки с числовым и текстовым столбцом"""
+        return [["a", "10"], ["b", "2.5"], ["c", "n/a"], ["d", "100"]]
+
+    def test_literal_parsed_once(self):
+        """Тест разбора значения при компиляции"""
+        assert Condition("price", 1, ">", "4.5").number == 4.5
+        assert Condition("brand", 0, ">", "apple").number is None
+
+    def test_numeric_comparison(self, rows):
+        """Тест числового сравнения, а не строкового"""
+        result = list(Condition("price", 1, ">", "9").filter(rows))
+        # "n/a" не число, поэтому сравнивается со "9" как строка
+        assert [row[0] for row in result] == ["a", "c", "d"]
+
+    def test_numeric_less_than(self, rows):
+        """Тест оператора < с дробным значением"""
+        result = list(Condition("price", 1, "<", "10").filter(rows))
+        assert [row[0] for row in result] == ["b"]
+
+    def test_string_comparison(self, rows):
+        """Тест строкового сравнения для нечислового значения"""
+        result = list(Condition("name", 0, ">", "b").filter(rows))
+        assert [row[0] for row in result] == ["c", "d"]
+
+    def test_equality_is_textual(self, rows):
+        """Тест равенства как точного совпадения строк"""
+        assert list(Condition("price", 1, "=", "10").filter(rows)) == [
+            ["a", "10"]]
+        assert list(Condition("price", 1, "=", "10.0").filter(rows)) == []
+
+
+class TestExpressionParser:
+    """Тесты разбора и вычисления выражений фильтра"""
+
+    @pytest.fixture
+    def headers(self):
+        """Заголовки тестового файла"""
+        return ["name", "brand", "price", "rating"]
+
+    @pytest.fixture
+    def rows(self):
+        """Строки тестового файла"""
+        return [
+            ["iphone 15 pro", "apple", "999", "4.9"],
+            ["galaxy s23 ultra", "samsung", "1199", "4.8"],
+            ["redmi note 12", "xiaomi", "199", "4.6"],
+            ["iphone se", "apple", "429", "4.1"],
+        ]
+
+    def names(self, expression, headers, rows):
+        """Названия строк, прошедших фильтр"""
+        node = compile_expression(expression, headers)
+        return [row[0] for row in node.filter(rows)]
+
+    def test_tokenize_joins_words(self):
+        """Тест склейки слов со пробелами в одно значение"""
+        assert tokenize("name=iphone 15 pro AND price>1") == [
+            ("text", "name"), ("operator", "="), ("text", "iphone 15 pro"),
+            ("keyword", "AND"), ("text", "price"), ("operator", ">"),
+            ("text", "1")]
+
+    def test_and_or_precedence(self, headers, rows):
+        """Тест приоритета AND над OR"""
+        assert self.names("price>500 AND brand=apple OR rating>=4.8",
+                          headers, rows) == [
+            "iphone 15 pro", "galaxy s23 ultra"]
+
+    def test_parentheses_and_not(self, headers, rows):
+        """Тест скобок и отрицания"""
+        assert self.names("NOT (brand=apple OR price<200)",
+                          headers, rows) == ["galaxy s23 ultra"]
+
+    def test_comparison_operators(self, headers, rows):
+        """Тест операторов !=, <=, >="""
+        assert self.names("brand!=apple", headers, rows) == [
+            "galaxy s23 ultra", "redmi note 12"]
+        assert self.names("price<=429", headers, rows) == [
+            "redmi note 12", "iphone se"]
+        assert self.names("rating>=4.8", headers, rows) == [
+            "iphone 15 pro", "galaxy s23 ultra"]
+
+    def test_in_and_like(self, headers, rows):
+        """Тест IN, NOT IN и LIKE"""
+        assert self.names("brand IN (xiaomi, samsung)", headers, rows) == [
+            "galaxy s23 ultra", "redmi note 12"]
+        assert self.names("brand NOT IN ('apple')", headers, rows) == [
+            "galaxy s23 ultra", "redmi note 12"]
+        assert self.names("name LIKE 'iphone%'", headers, rows) == [
+            "iphone 15 pro", "iphone se"]
+        assert self.names("name LIKE '%_ pro'", headers, rows) == [
+            "iphone 15 pro"]
+
+    def test_several_expressions_joined_with_and(self, headers, rows):
+        """Тест нескольких --where"""
+        assert self.names(["brand=apple", "price<500"], headers, rows) == [
+            "iphone se"]
+
+    def test_cheap_conditions_first(self, headers):
+        """Тест порядка условий: строковое равенство раньше чисел"""
+        node = compile_expression("rating>4 AND brand=apple", headers)
+        assert isinstance(node, And)
+        assert [child.column for child in node.children] == [
+            "brand", "rating"]
+        node = compile_expression("brand=apple OR rating>4", headers)
+        assert isinstance(node, Or)
+        assert node.children[0].column == "rating"
+
+    @pytest.mark.parametrize("expression", [
+        "", "price", "price>", "price>1 AND", "(price>1", "price>1)",
+        "brand NOT apple", "price>1 brand=apple"])
+    def test_invalid_expression(self, headers, expression):
+        """Тест невалидных выражений"""
+        with pytest.raises(ExpressionError):
+            compile_expression(expression, headers)
+
+    def test_unknown_column(self, headers):
+        """Тест несуществующего столбца"""
+        with pytest.raises(ColumnNotFoundError) as exc_info:
+            compile_expression("brand=apple AND weight>1", headers)
+        assert exc_info.value.column == "weight"
+
+    @pytest.mark.parametrize("expression, needles", [
+        ("brand=apple", {"apple"}),
+        ("brand IN (apple, xiaomi)", {"apple", "xiaomi"}),
+        ("name LIKE 'iphone%'", {"iphone"}),
+        ("price>500 AND brand=apple", {"apple"}),
+        ("brand=apple OR name LIKE 'redmi%'", {"apple", "redmi"}),
+        ("brand=apple OR price>500", None),
+        ("NOT brand=apple", None),
+        ("brand!=apple", None),
+        ("name LIKE '%pro'", None),
+        ("brand=''", None),
+        ("""brand='a"b'""", None),
+    ])
+    def test_needles(self, headers, expression, needles):
+        """Тест подстрок, которые есть в каждой подходящей записи"""
+        assert compile_expression(expression, headers).needles() == needles
@@ -0,0 +1,131 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import csv_reader
+from csv_reader import CSVReader
+from follow import FileTail, complete_length
+
+
+class TestFileTail:
+    """Тесты чтения дописанных строк"""
+
+    @pytest.mark.parametrize("data, expected", [
+        (b"", 0),
+        (b"a,1\n", 4),
+        (b"a,1\nb,2", 4),
+        (b'a,"x\ny"\nb', 8),
+        (b'a,"x\n', 0),
+        (b'a,"x""\n', 0),
+    ])
+    def test_complete_length(self, data, expected):
+        """Тест: хвост без перевода строки или с открытой кавычкой ждет"""
+        assert complete_length(data) == expected
+
+    def test_reads_only_new_records(self, tmp_path):
+        """Тест: каждое чтение возвращает только дописанные записи"""
+        path = tmp_path / "data.csv"
+        path.write_text("name,price\nx,1\ny,", encoding="utf-8")
+        tail = FileTail(str(path))
+        assert list(tail.read()) == ["name,price\n", "x,1\n"]
+        assert list(tail.read()) == []
+
+        with open(path, "a", encoding="utf-8") as file:
+            file.write('2\nz,"3\n')
+        assert list(tail.read()) == ["y,2\n"]
+        with open(path, "a", encoding="utf-8") as file:
+            file.write('4"\n')
+        assert list(tail.read()) == ['z,"3\n', '4"\n']
+        assert tail.offset == path.stat().st_size
+        assert not tail.truncated()
+
+        path.write_text("name,price\n", encoding="utf-8")
+        assert tail.truncated()
+
+
+class TestFollow:
+    """Тесты --follow с обновлением агрегатов"""
+
+    @pytest.fixture
+    def growing_file(self, tmp_path, monkeypatch):
+        """
+        Файл, в который между проверками дописываются строки
+        из списка appends. Пауза между проверками не ждет.
+        """
+        path = tmp_path / "data.csv"
+        path.write_text("name,price\na,100\nb,300\n", encoding="utf-8")
+        appends = ["c,500\n", "", "d,", "700\n"]
+
+        def sleep(seconds):
+            if appends:
+                with open(path, "a", encoding="utf-8") as file:
+                    file.write(appends.pop(0))
+        monkeypatch.setattr(csv_reader.time, "sleep", sleep)
+        return str(path)
+
+    def test_aggregate_updates(self, growing_file, capsys):
+        """Тест: агрегат дополняется новыми строками, а не читается заново"""
+        query = CSVReader(growing_file).aggregate("price=avg", "price=count")
+        query.follow(updates=5)
+        output = capsys.readouterr().out
+        # Пустая дозапись и неполная строка не печатают таблицу заново
+        assert output.count("price=avg") == 3
+        for average in ("200", "300", "400"):
+            assert f" {average} |" in output
+
+    def test_new_rows_filtered(self, growing_file, capsys):
+        """Тест: без агрегации печатаются только новые подходящие строки"""
+        query = CSVReader(growing_file).where("price>200").select("name")
+        query.follow(updates=5)
+        output = capsys.readouterr().out
+        assert output.count("name") == 3
+        assert [name for name in "abcd" if f"| {name}" in output] == \
+            ["b", "c", "d"]
+
+    def test_csv_header_once(self, growing_file, capsys):
+        """Тест: заголовки csv печатаются один раз, а не на каждую дозапись"""
+        CSVReader(growing_file).options(format="csv").follow(updates=5)
+        assert capsys.readouterr().out == \
+            "name,price\na,100\nb,300\nc,500\nd,700\n"
+
+    def test_limit_stops_following(self, growing_file, capsys, monkeypatch):
+        """Тест: --limit - общее число строк, после него слежение заканчивается"""
+        checks = []
+        monkeypatch.setattr(FileTail, "truncated",
+                            lambda tail: checks.append(1) or False)
+        CSVReader(growing_file).where("price>200").limit(2) \
+            .options(format="csv").follow(updates=10)
+        assert capsys.readouterr().out == "name,price\nb,300\nc,500\n"
+        assert len(checks) == 2
+
+    def test_order_by_fails(self, growing_file):
+        """Тест: --order-by без --aggregate с --follow - ошибка запроса"""
+        with pytest.raises(csv_reader.QueryError, match="--order-by"):
+            CSVReader(growing_file).order_by("price").follow(updates=1)
+        CSVReader(growing_file).aggregate("price=max").order_by("price=max") \
+            .follow(updates=1)
+
+    def test_truncated_file_reread(self, tmp_path, monkeypatch, capsys):
+        """Тест: перезаписанный файл читается с начала"""
+        path = tmp_path / "data.csv"
+        path.write_text("name,price\na,100\nb,300\n", encoding="utf-8")
+
+        def sleep(seconds):
+            path.write_text("name,price\nc,5\n", encoding="utf-8")
+        monkeypatch.setattr(csv_reader.time, "sleep", sleep)
+        with pytest.warns(RuntimeWarning, match="короче"):
+            CSVReader(str(path)).aggregate("price=sum").follow(updates=2)
+        output = capsys.readouterr().out
+        assert " 400 |" in output
+        assert " 5 |" in output
+
+    def test_compressed_file_fails(self, tmp_path):
+        """Тест: за сжатым файлом следить нельзя"""
+        path = tmp_path / "data.csv.gz"
+        path.write_bytes(b"\x1f\x8b" + b"\x00" * 20)
+        with pytest.raises(csv_reader.QueryError, match="--follow"):
+            CSVReader(str(path)).follow(updates=1)
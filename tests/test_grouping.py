@@ -0,0 +1,98 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from aggregators import NotNumericError
+from grouping import GroupedAggregation
+
+
+def results(aggregation):
+    """Словарь ключ группы -> результаты агрегаций"""
+    return {key: [aggregator.result() for aggregator in aggregators]
+            for key, aggregators in aggregation.items()}
+
+
+class TestGroupedAggregation:
+    """Тесты агрегации с группировкой"""
+
+    @pytest.fixture
+    def rows(self):
+        """Строки: группа, подгруппа, число"""
+        return [[f"g{i % 50}", str(i % 2), str(i)] for i in range(1000)]
+
+    def expected(self, rows):
+        """Ожидаемые сумма и количество по группам"""
+        groups = {}
+        for group, _, value in rows:
+            total, count = groups.get((group,), (0.0, 0))
+            groups[(group,)] = (total + float(value), count + 1)
+        return {key: [total, count] for key, (total, count) in groups.items()}
+
+    def test_groups_in_first_seen_order(self, rows):
+        """Тест группировки в памяти"""
+        aggregation = GroupedAggregation([0], [(2, "sum"), (2, "count")])
+        result = results(aggregation.add_rows(rows))
+        assert result == self.expected(rows)
+        assert list(result)[:3] == [("g0",), ("g1",), ("g2",)]
+
+    def test_several_key_columns(self, rows):
+        """Тест группировки по двум столбцам"""
+        aggregation = GroupedAggregation([0, 1], [(2, "max")])
+        result = results(aggregation.add_rows(rows))
+        assert len(result) == 50
+        assert result[("g3", "1")] == [953.0]
+
+    def test_without_groups(self):
+        """Тест агрегации без группировки и без строк"""
+        aggregation = GroupedAggregation([], [(0, "avg"), (0, "count")])
+        assert results(aggregation.add_rows([])) == {(): [None, 0]}
+
+    def test_spill_to_disk(self, rows):
+        """Тест сброса групп на диск при превышении лимита"""
+        aggregation = GroupedAggregation(
+            [0], [(2, "sum"), (2, "count")], max_groups=8)
+        aggregation.add_rows(rows)
+        directories = list(aggregation.spill_dirs)
+        assert directories
+        assert results(aggregation) == self.expected(rows)
+        assert not any(os.path.exists(path) for path in directories)
+
+    def test_spilled_part_split_again(self, monkeypatch):
+        """Тест: часть с группами больше max_groups делится заново"""
+        rows = [[f"k{i % 1000}", str(i)] for i in range(3000)]
+        written = []
+        write_parts = GroupedAggregation._write_parts
+
+        def spy(aggregation, groups, level, files):
+            written.append((level, len(groups)))
+            write_parts(aggregation, groups, level, files)
+        monkeypatch.setattr(GroupedAggregation, "_write_parts", spy)
+
+        aggregation = GroupedAggregation([0], [(1, "count")], max_groups=8)
+        result = results(aggregation.add_rows(rows))
+        assert result == {(f"k{i}",): [3] for i in range(1000)}
+        assert max(level for level, _ in written) >= 1
+        assert max(size for _, size in written) <= 8
+        assert not aggregation.spill_dirs
+
+    def test_merge_partial_results_with_spills(self, rows):
+        """Тест объединения частичных результатов со сброшенными группами"""
+        left = GroupedAggregation([0], [(2, "sum"), (2, "count")],
+                                  max_groups=8)
+        right = GroupedAggregation([0], [(2, "sum"), (2, "count")],
+                                   max_groups=8)
+        left.add_rows(rows[:400])
+        right.add_rows(rows[400:])
+        left.merge(right)
+        assert results(left) == self.expected(rows)
+
+    def test_not_numeric(self):
+        """Тест числовой агрегации по строковому столбцу"""
+        aggregation = GroupedAggregation([0], [(1, "avg")])
+        with pytest.raises(NotNumericError):
+            aggregation.add_rows([["a", "1"], ["b", "x"]])
@@ -0,0 +1,117 @@
+import csv
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import indexes
+from filters import compile_expression
+from indexes import (BitmapIndex, FileIndex, IndexBuildError, ZoneMap,
+                     index_path, read_ranges)
+
+
+class TestFileIndex:
+    """Тесты индексов столбцов в файле рядом с csv файлом"""
+
+    @pytest.fixture(autouse=True)
+    def small_blocks(self, monkeypatch):
+        """Блоки по две строки, чтобы в маленьком файле их было много"""
+        monkeypatch.setattr(indexes, "BLOCK_ROWS", 2)
+
+    @pytest.fixture
+    def csv_file(self, tmp_path):
+        """Файл, отсортированный по бренду, с полем в кавычках"""
+        path = tmp_path / "data.csv"
+        path.write_text(
+            "name,brand,price\n"
+            "iphone 15,apple,999\n"
+            "iphone 14,apple,799\n"
+            "galaxy s23,samsung,1199\n"
+            '"galaxy\nfold",samsung,1799\n'
+            "redmi 12,xiaomi,199\n"
+            "poco x5,xiaomi,299\n"
+            "mi 13,xiaomi,nan\n", encoding="utf-8")
+        return str(path)
+
+    def rows(self, path, ranges):
+        return list(csv.reader(read_ranges(path, ranges)))
+
+    def test_build(self, csv_file):
+        """Тест блоков и типов индексов"""
+        index = FileIndex.build(csv_file, ["brand", "price"])
+        assert isinstance(index.columns["brand"], BitmapIndex)
+        assert index.columns["brand"].bitmaps == {
+            "apple": 0b1, "samsung": 0b10, "xiaomi": 0b1100}
+        assert index.offsets[-1] == os.path.getsize(csv_file)
+        # Блоки начинаются на границах записей, в том числе после
+        # поля с переводом строки
+        assert self.rows(csv_file, [(index.offsets[2], index.offsets[3])]) \
+            == [["redmi 12", "xiaomi", "199"], ["poco x5", "xiaomi", "299"]]
+
+    def test_zone_map(self, csv_file, monkeypatch):
+        """Тест зон для столбца со многими числовыми значениями"""
+        monkeypatch.setattr(indexes, "MAX_DISTINCT", 3)
+        index = FileIndex.build(csv_file, ["price"])
+        zones = index.columns["price"]
+        assert isinstance(zones, ZoneMap)
+        assert zones.minimums == [799.0, 1199.0, 199.0, None]
+        assert zones.maximums == [999.0, 1799.0, 299.0, None]
+
+    def test_high_cardinality_text(self, csv_file, monkeypatch):
+        """Тест: текстовый столбец с многими значениями не индексируется"""
+        monkeypatch.setattr(indexes, "MAX_DISTINCT", 3)
+        with pytest.raises(IndexBuildError):
+            FileIndex.build(csv_file, ["name"])
+
+    @pytest.mark.parametrize("max_distinct", [3, 100])
+    @pytest.mark.parametrize("expression", [
+        "brand=apple",
+        "brand=samsung AND price>1000",
+        "price>=1000",
+        "price<300 OR brand LIKE 'app%'",
+        "price=999",
+        "brand IN (apple, xiaomi) AND NOT name=poco",
+        "price!=999",
+    ])
+    def test_ranges_match_full_scan(
+            self, csv_file, monkeypatch, expression, max_distinct):
+        """Тест: строки выбранных блоков дают тот же результат фильтра"""
+        monkeypatch.setattr(indexes, "MAX_DISTINCT", max_distinct)
+        index = FileIndex.build(csv_file, ["brand", "price"])
+        node = compile_expression(expression, index.headers)
+        with open(csv_file, "r", encoding="utf-8") as file:
+            expected = list(node.filter(list(csv.reader(file))[1:]))
+        ranges = index.ranges(node)
+        if ranges is None:
+            return
+        assert list(node.filter(self.rows(csv_file, ranges))) == expected
+
+    def test_ranges_skip_blocks(self, csv_file):
+        """Тест: читаются только блоки с подходящими значениями"""
+        index = FileIndex.build(csv_file, ["brand"])
+        node = compile_expression("brand=samsung", index.headers)
+        assert index.ranges(node) == [(index.offsets[1], index.offsets[2])]
+        node = compile_expression("name=redmi", index.headers)
+        assert index.ranges(node) is None
+
+    def test_save_load_and_staleness(self, csv_file):
+        """Тест сохранения индекса и проверки версии файла"""
+        FileIndex.build(csv_file, ["brand", "price"]).save(csv_file)
+        assert os.path.exists(index_path(csv_file))
+        index = FileIndex.load(csv_file)
+        assert index.fresh(csv_file)
+        assert index.columns["brand"].bitmaps["xiaomi"] == 0b1100
+
+        with open(csv_file, "a", encoding="utf-8") as file:
+            file.write("pixel 8,google,699\n")
+        assert not index.fresh(csv_file)
+
+    def test_load_missing_or_corrupt(self, csv_file):
+        """Тест: нет индекса или он поврежден - None"""
+        assert FileIndex.load(csv_file) is None
+        Path(index_path(csv_file)).write_text("{", encoding="utf-8")
+        assert FileIndex.load(csv_file) is None
@@ -170,3 +170,70 @@ class TestMainIntegration:
         
         assert result.returncode == 1
         assert "только для чисел" in result.stderr or "только для чисел" in result.stdout
+
+    def test_main_with_boolean_filter(self, sample_csv_file):
+        """Тест выражения с AND/OR и нескольких --where"""
+        result = subprocess.run([
+            sys.executable,
+            str(Path(__file__).parent.parent / "src" / "main.py"),
+            "-f", sample_csv_file,
+            "-w", "brand IN (apple, samsung) AND price>=999",
+            "-w", "NOT name LIKE '%ultra'"
+        ], capture_output=True, text=True)
+
+        assert result.returncode == 0
+        assert "iphone 15 pro" in result.stdout
+        assert "galaxy z flip 5" in result.stdout
+        assert "galaxy s23 ultra" not in result.stdout
+        assert "iphone 14" not in result.stdout
+
+    def test_main_parallel_matches_sequential(self, sample_csv_file):
+        """Тест одинакового результата с --jobs и без"""
+        outputs = []
+        for jobs in ["1", "3"]:
+            result = subprocess.run([
+                sys.executable,
+                str(Path(__file__).parent.parent / "src" / "main.py"),
+                "-f", sample_csv_file,
+                "-w", "price>300",
+                "-j", jobs
+            ], capture_output=True, text=True)
+            assert result.returncode == 0
+            outputs.append(result.stdout)
+        assert outputs[0] == outputs[1]
+
+    def test_main_group_by(self, sample_csv_file):
+        """Тест группировки через main.py"""
+        result = subprocess.run([
+            sys.executable,
+            str(Path(__file__).parent.parent / "src" / "main.py"),
+            "-f", sample_csv_file,
+            "-g", "brand",
+            "-a", "price=min",
+            "-a", "name=count"
+        ], capture_output=True, text=True)
+
+        assert result.returncode == 0
+        lines = [line for line in result.stdout.splitlines()
+                 if line.startswith("| ")]
+        assert "price=min" in lines[0]
+        assert lines[1].split() == ["|", "apple", "|", "429", "|", "4", "|"]
+
+    def test_main_notice_and_sample_summary(self, sample_csv_file):
+        """Тест: предупреждения и объем выборки - строки в stderr"""
+        result = subprocess.run([
+            sys.executable,
+            str(Path(__file__).parent.parent / "src" / "main.py"),
+            "-f", sample_csv_file,
+            "-a", "price=count",
+            "--sample", "50%",
+            "--mmap",
+            "-F", "csv"
+        ], capture_output=True, text=True)
+
+        assert result.returncode == 0
+        assert result.stdout == "price=count,price=count ±\n10,0\n"
+        lines = result.stderr.splitlines()
+        assert lines[0] == "--engine, --jobs и --mmap не используются " \
+            "с --sample и --approx"
+        assert lines[1].startswith("Выборка: 1 из 1 блоков")
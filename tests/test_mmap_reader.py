@@ -0,0 +1,117 @@
+import csv
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import mmap_reader
+from csv_reader import CSVReader
+from filters import compile_expression
+from mmap_reader import decode_row, iter_records, open_mmap
+
+
+class TestMMapReader:
+    """Тесты чтения csv файла из mmap"""
+
+    @pytest.fixture
+    def rows(self):
+        """Строки с кавычками, запятыми и переводами строк в полях"""
+        rows = [["name", "note", "price"]]
+        for i in range(300):
+            note = "plain" if i % 7 else f'multi\nline, "quoted" {i}'
+            rows.append([f"товар {i}", note, str(i)])
+        return rows
+
+    def write(self, tmp_path, rows, lineterminator="\n") -> str:
+        """Записывает строки в csv файл"""
+        path = tmp_path / "data.csv"
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            csv.writer(file, lineterminator=lineterminator).writerows(rows)
+        return str(path)
+
+    @pytest.mark.parametrize("lineterminator", ["\n", "\r\n"])
+    def test_records_match_csv_module(
+            self, tmp_path, rows, monkeypatch, lineterminator):
+        """Тест совпадения записей с модулем csv на границах блоков"""
+        monkeypatch.setattr(mmap_reader, "BLOCK_SIZE", 64)
+        path = self.write(tmp_path, rows, lineterminator)
+        with open_mmap(path) as buffer:
+            records = [decode_row(row) for row in iter_records(buffer)]
+        assert records == rows
+
+    def test_raw_filter_without_decoding(self, tmp_path, rows):
+        """Тест фильтра по байтовым полям"""
+        path = self.write(tmp_path, rows)
+        with open_mmap(path) as buffer:
+            records = iter_records(buffer)
+            headers = decode_row(next(records))
+            node = compile_expression(
+                "price>=290 AND name LIKE 'товар%'", headers, raw=True)
+            result = [decode_row(row) for row in node.filter(records)]
+        assert result == [row for row in rows[1:] if int(row[2]) >= 290]
+
+    def test_empty_file(self, tmp_path):
+        """Тест пустого файла"""
+        path = tmp_path / "empty.csv"
+        path.write_bytes(b"")
+        with open_mmap(str(path)) as buffer:
+            assert list(iter_records(buffer)) == []
+
+    def test_quoted_record_in_one_line(self):
+        """Тест строки с кавычками без перевода строки внутри"""
+        buffer = b'a,b\n"x,1",2\n'
+        assert list(iter_records(buffer)) == [[b"a", b"b"], [b"x,1", b"2"]]
+
+    @pytest.mark.parametrize("record", [
+        b'"a,b",c,"d""e"',
+        b'"",x,""""',
+        b'x,"multi\nline",y',
+        b'ab"c"d,e',
+        b'"a"b,c',
+        b'"open,field',
+    ])
+    def test_quoted_like_csv(self, record):
+        """Тест разбора полей в кавычках, как у csv в текстовом режиме"""
+        data = b"h\n" + record + b"\n"
+        expected = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+        assert [decode_row(row) for row in iter_records(data)] == expected
+
+    def test_stray_quote_before_quoted_field(self, tmp_path, monkeypatch):
+        """
+        Тест: кавычка внутри поля без кавычек не открывает поле,
+        и граница записи с многострочным полем дальше не сдвигается
+        """
+        monkeypatch.setattr(mmap_reader, "BLOCK_SIZE", 8)
+        path = tmp_path / "data.csv"
+        path.write_text('name,brand,price\nphone 5" screen,apple,100\n'
+                        'x,"multi\nline",200\ny,apple,300\n',
+                        encoding="utf-8")
+        query = CSVReader(str(path)).where("brand IN (apple, multi)")
+        assert query.options(mmap=True).collect() == query.collect() == [
+            ['phone 5" screen', "apple", "100"], ["y", "apple", "300"]]
+
+    def test_crlf_inside_quoted_field(self, tmp_path):
+        """Тест: \\r\\n в поле в кавычках - \\n, как в текстовом режиме"""
+        path = tmp_path / "data.csv"
+        path.write_bytes(b'name,note\r\nx,"one\r\ntwo"\r\ny,plain\r\n')
+        with open_mmap(str(path)) as buffer:
+            records = [decode_row(row) for row in iter_records(buffer)]
+        with open(path, encoding="utf-8") as file:
+            assert records == list(csv.reader(file))
+
+    @pytest.mark.parametrize("lineterminator", ["\n", "\r\n"])
+    def test_needles_skip_lines(self, tmp_path, rows, monkeypatch,
+                                lineterminator):
+        """Тест: строки без подстрок отбрасываются, заголовки остаются"""
+        monkeypatch.setattr(mmap_reader, "BLOCK_SIZE", 64)
+        path = self.write(tmp_path, rows, lineterminator)
+        with open_mmap(path) as buffer:
+            records = [decode_row(row) for row in
+                       iter_records(buffer, {"quoted", "товар 1"})]
+        assert records[0] == rows[0]
+        assert records[1:] == [row for row in rows[1:]
+                               if "quoted" in row[1] or "товар 1" in row[0]]
@@ -0,0 +1,73 @@
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+numpy = pytest.importorskip("numpy")
+
+import numpy_engine
+from columnar import ColumnTable
+from filters import compile_expression
+from grouping import GroupedAggregation
+
+
+class TestNumpyEngine:
+    """Тесты векторного фильтра и агрегации (нужен NumPy)"""
+
+    @pytest.fixture
+    def table(self):
+        """Колоночная таблица из large_test.csv"""
+        path = Path(__file__).parent / "test_data" / "large_test.csv"
+        with open(path, "r", encoding="utf-8") as file:
+            reader = csv.reader(file)
+            return ColumnTable.from_rows(next(reader), reader)
+
+    @pytest.mark.parametrize("expression", [
+        "brand=Apple",
+        "price>500 AND rating>=4.8",
+        "price>=999.5 OR storage<128",
+        "name LIKE '%Pro' OR is_available=false",
+        "NOT release_year IN (2023, 2022)",
+        "rating=4.9",
+        "rating!=4.5 AND NOT (color=Black OR price<300)",
+    ])
+    def test_select_matches_columnar(self, table, expression):
+        """Тест совпадения маски с фильтром колоночного движка"""
+        node = compile_expression(expression, table.headers)
+        assert numpy_engine.select(node, table).tolist() == node.select(table)
+
+    def test_negative_zero_is_not_zero(self):
+        """Тест: 0.0 и -0.0 остаются разными значениями текста"""
+        table = ColumnTable.from_rows(["a"], [["0.0"], ["-0.0"], ["1.5"]])
+        node = compile_expression("a=-0.0", table.headers)
+        assert numpy_engine.select(node, table).tolist() == [1]
+
+    @pytest.mark.parametrize("names", [
+        ["min", "max", "sum", "avg", "count"],
+        ["var", "median", "count_distinct"],
+    ])
+    def test_aggregate_matches_accumulators(self, table, names):
+        """Тест совпадения редукций с аккумуляторами"""
+        index = table.headers.index("rating")
+        selection = numpy.arange(0, table.row_count, 3)
+        specs = [(index, name) for name in names]
+
+        vectorized = numpy_engine.aggregate(
+            table, selection, GroupedAggregation([], specs))
+        expected = GroupedAggregation([], specs).add_rows(
+            table.aggregate_rows(selection.tolist(), [index]))
+        assert ([aggregator.result() for aggregator in vectorized.groups[()]]
+                == [aggregator.result() for aggregator in expected.groups[()]])
+
+    def test_aggregate_empty_selection(self, table):
+        """Тест агрегации без подходящих строк"""
+        index = table.headers.index("price")
+        aggregation = numpy_engine.aggregate(
+            table, numpy.array([], dtype=numpy.int64),
+            GroupedAggregation([], [(index, "max"), (index, "count")]))
+        assert [aggregator.result() for aggregator
+                in aggregation.groups[()]] == [None, 0]
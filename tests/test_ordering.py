@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ordering import cell_key, top_rows
+
+
+class TestOrdering:
+    """Тесты сортировки строк и выбора первых N"""
+
+    ROWS = [
+        ["iphone", "999", "4.9"],
+        ["galaxy", "1199", "4.8"],
+        ["redmi", "199", "4.6"],
+        ["pixel", "n/a", "4.8"],
+        ["poco", "299", "4.6"],
+    ]
+
+    def test_numbers_compared_as_numbers(self):
+        """Тест: "1199" больше "999", числа идут перед текстом"""
+        assert cell_key("1199") > cell_key("999")
+        assert cell_key("n/a") > cell_key("1e9")
+        assert cell_key(b"10") > cell_key(b"9")
+
+    def test_descending_is_reverse(self):
+        """Тест: по убыванию порядок полностью обратный"""
+        cells = ["999", "n/a", "1199", "abc", "nan", "-5"]
+        ascending = sorted(cells, key=cell_key)
+        descending = sorted(cells, key=lambda cell: cell_key(cell, True))
+        assert ascending == ["-5", "999", "1199", "abc", "n/a", "nan"]
+        assert descending == ascending[::-1]
+
+    def test_top_rows_with_limit(self):
+        """Тест первых N строк по убыванию"""
+        assert top_rows(iter(self.ROWS), [(1, True)], 2) == [
+            ["pixel", "n/a", "4.8"], ["galaxy", "1199", "4.8"]]
+        assert top_rows(iter(self.ROWS), [(1, False)], 0) == []
+
+    def test_several_columns_and_ties(self):
+        """Тест сортировки по двум столбцам и порядка равных строк"""
+        by_rating = top_rows(self.ROWS, [(2, True)])
+        assert [row[0] for row in by_rating] == [
+            "iphone", "galaxy", "pixel", "redmi", "poco"]
+        by_rating_name = top_rows(self.ROWS, [(2, False), (0, True)], 3)
+        assert [row[0] for row in by_rating_name] == [
+            "redmi", "poco", "pixel"]
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from tabulate import tabulate
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import output
+from output import (ArrowWriter, DelimitedWriter, GridWriter,
+                    JsonLinesWriter, TsvWriter)
+
+
+class TestGridWriter:
+    """Тесты потокового вывода таблицы"""
+
+    @pytest.fixture
+    def rows(self):
+        """Заголовки и строки test.csv"""
+        path = Path(__file__).parent / "test_data" / "test.csv"
+        with open(path, "r", encoding="utf-8") as file:
+            rows = list(csv.reader(file))
+        return rows[0], rows[1:]
+
+    def write(self, rows, headers, **kwargs) -> str:
+        file = io.StringIO()
+        GridWriter(file, **kwargs).write(rows, lambda: headers)
+        return file.getvalue()
+
+    def test_matches_tabulate(self, rows):
+        """Тест: вывод совпадает с tabulate(tablefmt="grid")"""
+        headers, data = rows
+        expected = tabulate(data, headers=headers, tablefmt="grid") + "\n"
+        assert self.write(iter(data), headers) == expected
+
+    def test_empty_result(self):
+        """Тест: без строк выводятся только заголовки, как в tabulate"""
+        expected = tabulate([], headers=["name", "price"],
+                            tablefmt="grid") + "\n"
+        assert self.write([], ["name", "price"]) == expected
+
+    def test_wide_cell_after_sample(self):
+        """Тест: ячейка шире выборки выводится целиком"""
+        text = self.write([["a", "1"], ["long value", "22"]],
+                          ["name", "n"], sample_size=1)
+        lines = text.splitlines()
+        assert lines[3] == "| a      |   1 |"
+        assert lines[5] == "| long value |  22 |"
+
+    def test_text_in_numeric_column(self):
+        """Тест: текст в числовом после выборки столбце - по левому краю"""
+        text = self.write([["1"], ["n/a"]], ["value"], sample_size=1)
+        assert text.splitlines()[5] == "| n/a     |"
+
+    def test_first_rows_before_end(self, monkeypatch):
+        """Тест: первые строки выводятся до чтения остальных"""
+        monkeypatch.setattr(output, "WRITE_BATCH", 2)
+        file = io.StringIO()
+
+        def rows():
+            for number in range(3):
+                yield [str(number)]
+            raise RuntimeError("чтение файла")
+
+        with pytest.raises(RuntimeError):
+            GridWriter(file, sample_size=1).write(rows(), lambda: ["n"])
+        assert "|   1 |" in file.getvalue()
+
+
+class TestMachineWriters:
+    """Тесты вывода в csv, tsv, JSON Lines и Arrow"""
+
+    ROWS = [["iphone, 15", "999"], ['say "hi"', "1.5"], ["редми", "10"]]
+
+    def write(self, writer_class, rows, headers):
+        file = io.StringIO()
+        writer_class(file).write(iter(rows), lambda: headers)
+        return file.getvalue()
+
+    def test_csv(self):
+        """Тест csv: кавычки там, где нужны, и читается обратно"""
+        text = self.write(DelimitedWriter, self.ROWS, ["name", "price"])
+        assert list(csv.reader(io.StringIO(text))) == \
+            [["name", "price"]] + self.ROWS
+
+    def test_tsv(self):
+        """Тест разделителя табуляцией"""
+        text = self.write(TsvWriter, self.ROWS, ["name", "price"])
+        assert text.splitlines()[1] == "iphone, 15\t999"
+
+    def test_jsonl(self):
+        """Тест JSON Lines: объект на строку, значения - строки"""
+        text = self.write(JsonLinesWriter, self.ROWS, ["name", "100%"])
+        objects = [json.loads(line) for line in text.splitlines()]
+        assert objects == [{"name": name, "100%": price}
+                           for name, price in self.ROWS]
+        assert "редми" in text
+
+    def test_jsonl_short_row(self):
+        """Тест строки короче заголовков (агрегация без данных)"""
+        text = self.write(JsonLinesWriter, [["Нет данных"]], ["a", "b"])
+        assert json.loads(text) == {"a": "Нет данных"}
+
+    def test_empty(self):
+        """Тест вывода без строк"""
+        assert self.write(DelimitedWriter, [], ["a", "b"]) == "a,b\n"
+        assert self.write(JsonLinesWriter, [], ["a", "b"]) == ""
+
+    def test_arrow(self):
+        """Тест Arrow IPC (нужен pyarrow)"""
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+        file = io.BytesIO()
+        ArrowWriter(file).write(iter(self.ROWS), lambda: ["name", "price"])
+        table = pyarrow.ipc.open_stream(file.getvalue()).read_all()
+        assert table.column_names == ["name", "price"]
+        assert table.column("name").to_pylist() == [
+            row[0] for row in self.ROWS]
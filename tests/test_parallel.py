@@ -0,0 +1,113 @@
+import csv
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from grouping import GroupedAggregation
+import parallel
+from parallel import scan_parallel, split_ranges
+
+
+class TestParallelScan:
+    """Тесты параллельного чтения по диапазонам байт"""
+
+    @pytest.fixture
+    def quoted_csv_file(self):
+        """Создает CSV файл с переводами строк внутри полей в кавычках"""
+        with tempfile.NamedTemporaryFile(
+                mode='w', suffix='.csv', delete=False, encoding='utf-8',
+                newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'note', 'price'])
+            for i in range(200):
+                note = f'line one\nline "two"\n{i}' if i % 3 == 0 else 'plain'
+                writer.writerow([f'item{i}', note, str(i)])
+            temp_file = f.name
+
+        yield temp_file
+        os.unlink(temp_file)
+
+    def read_all(self, path):
+        """Читает файл обычным csv.reader"""
+        with open(path, "r", encoding="utf-8", newline="") as file:
+            rows = list(csv.reader(file))
+        return rows[0], rows[1:]
+
+    @pytest.mark.parametrize("jobs", [1, 2, 7, 64])
+    def test_ranges_align_to_records(self, quoted_csv_file, jobs):
+        """Тест границ диапазонов: записи не разрезаются"""
+        headers, expected = self.read_all(quoted_csv_file)
+        header_end, ranges = split_ranges(quoted_csv_file, jobs)
+        assert ranges[0][0] == header_end
+        assert ranges[-1][1] == os.path.getsize(quoted_csv_file)
+
+        rows = []
+        with open(quoted_csv_file, "rb") as file:
+            for start, end in ranges:
+                file.seek(start)
+                chunk = file.read(end - start).decode("utf-8")
+                rows.extend(csv.reader(chunk.splitlines(keepends=True)))
+        assert rows == expected
+
+    def test_rows_in_file_order(self, quoted_csv_file):
+        """Тест порядка строк без агрегации"""
+        headers, expected = self.read_all(quoted_csv_file)
+        result = scan_parallel(quoted_csv_file, headers, 3,
+                               where=["price>=100"])
+        assert list(result) == [row for row in expected if int(row[2]) >= 100]
+
+    def test_rows_streamed_by_range(self, quoted_csv_file, monkeypatch):
+        """Тест: строки диапазона отдаются до обработки следующих"""
+        headers, expected = self.read_all(quoted_csv_file)
+        monkeypatch.setattr(parallel, "STREAM_RANGE", 1000)
+        calls = []
+        scan_range = parallel.scan_range
+
+        def spy(path, start, end, *args):
+            calls.append(start)
+            return scan_range(path, start, end, *args)
+        monkeypatch.setattr(parallel, "scan_range", spy)
+        rows = scan_parallel(quoted_csv_file, headers, 1)
+        assert next(rows) == expected[0]
+        assert len(calls) == 1
+        assert [expected[0]] + list(rows) == expected
+        assert len(calls) > 5
+
+    def test_many_ranges_in_processes(self, quoted_csv_file, monkeypatch):
+        """Тест: диапазонов больше, чем процессов, порядок сохраняется"""
+        headers, expected = self.read_all(quoted_csv_file)
+        monkeypatch.setattr(parallel, "STREAM_RANGE", 500)
+        assert list(scan_parallel(quoted_csv_file, headers, 2)) == expected
+        rows = scan_parallel(quoted_csv_file, headers, 2)
+        assert next(rows) == expected[0]
+        rows.close()
+
+    def test_partial_aggregates_merged(self, quoted_csv_file):
+        """Тест объединения частичных агрегатов"""
+        headers, _ = self.read_all(quoted_csv_file)
+        aggregation = GroupedAggregation([], [(2, "sum"), (0, "count")])
+        result = scan_parallel(quoted_csv_file, headers, 3,
+                               where=["note=plain"], aggregate=aggregation)
+        (key, (total, count)), = result.items()
+        assert total.result() == sum(float(i) for i in range(200) if i % 3)
+        assert count.result() == 133
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_several_files(self, quoted_csv_file, jobs):
+        """Тест: несколько файлов читаются по порядку, агрегаты объединяются"""
+        headers, expected = self.read_all(quoted_csv_file)
+        paths = [quoted_csv_file, quoted_csv_file]
+        rows = scan_parallel(paths, headers, jobs, where=["price<5"])
+        assert list(rows) == expected[:5] * 2
+
+        aggregation = GroupedAggregation([], [(2, "max"), (0, "count")])
+        result = scan_parallel(paths, headers, jobs, aggregate=aggregation)
+        (key, (maximum, count)), = result.items()
+        assert maximum.result() == 199
+        assert count.result() == 400
@@ -0,0 +1,209 @@
+import argparse
+import csv
+import functools
+import gzip
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import sampling
+from csv_reader import DEFAULT_OPTIONS, CSVReader, QueryError
+from sampling import (MIN_BLOCKS, BlockTotals, choose_blocks, parse_fraction,
+                      read_block, read_header)
+
+
+@pytest.fixture
+def big_csv_file(tmp_path, monkeypatch):
+    """
+    Файл из 20000 строк со случайными брендами и ценами.
+    Блоки выборки - по 2000 байт, чтобы их было 300.
+    """
+    monkeypatch.setattr(sampling, "choose_blocks",
+                        functools.partial(choose_blocks, block_size=2000))
+    path = tmp_path / "big.csv"
+    generator = random.Random(0)
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "brand", "price"])
+        for number in range(20000):
+            brand = generator.choice(["apple", "samsung", "xiaomi"])
+            writer.writerow([f"phone, {number}", brand,
+                             generator.randint(100, 2000)])
+    return str(path)
+
+
+class TestBlocks:
+    """Тесты выбора и чтения блоков"""
+
+    @pytest.mark.parametrize("value, expected", [
+        ("1%", 0.01), ("0.25", 0.25), (" 100% ", 1.0), (0.5, 0.5)])
+    def test_parse_fraction(self, value, expected):
+        """Тест разбора доли выборки"""
+        assert parse_fraction(value) == pytest.approx(expected)
+
+    @pytest.mark.parametrize("value", ["0", "150%", "-1%", "half"])
+    def test_parse_fraction_invalid(self, value):
+        """Тест: доля вне (0, 1] или не число - ValueError"""
+        with pytest.raises(ValueError):
+            parse_fraction(value)
+
+    def test_every_record_in_one_block(self, big_csv_file):
+        """Тест: записи всех блоков - это все записи файла ровно один раз"""
+        size = Path(big_csv_file).stat().st_size
+        with open(big_csv_file, "rb") as file:
+            headers, data_start = read_header(file)
+            blocks, total = choose_blocks(
+                [(big_csv_file, data_start, size)], 1.0, block_size=1000)
+            rows = [row for _, start, end in blocks
+                    for row in read_block(file, start, end, 3, data_start)]
+        with open(big_csv_file, encoding="utf-8") as file:
+            expected = list(csv.reader(file))
+        assert total == len(blocks) > 100
+        assert [headers] + rows == expected
+
+    def test_skipped_rows_counted(self, tmp_path):
+        """Тест: строки с другим числом полей пропускаются и считаются"""
+        path = tmp_path / "data.csv"
+        path.write_bytes(b"a,b\n1,2\n3\n4,5,6\n7,8\n")
+        skipped = [0]
+        with open(path, "rb") as file:
+            _, data_start = read_header(file)
+            rows = list(read_block(file, data_start, path.stat().st_size,
+                                   2, data_start, skipped))
+        assert rows == [["1", "2"], ["7", "8"]]
+        assert skipped == [2]
+
+    def test_choose_blocks(self):
+        """Тест: доля блоков, но не меньше MIN_BLOCKS, seed повторяет выбор"""
+        files = [("a.csv", 10, 10 + 1000 * 100), ("b.csv", 10, 10 + 1000 * 100)]
+        blocks, total = choose_blocks(files, 0.1, seed=1, block_size=100)
+        assert total == 2000
+        assert len(blocks) == 200
+        assert blocks == choose_blocks(files, 0.1, seed=1, block_size=100)[0]
+        assert blocks == sorted(blocks)
+        assert len(choose_blocks(files, 0.001, block_size=100)[0]) == \
+            MIN_BLOCKS
+        assert len(choose_blocks([("c.csv", 10, 500)], 0.01,
+                                 block_size=100)[0]) == 5
+
+    def test_full_sample_is_exact(self):
+        """Тест: если выбраны все блоки, оценка точная и интервал нулевой"""
+        totals = BlockTotals()
+        for count, total in [(2, 10.0), (3, 30.0), (0, 0.0)]:
+            totals.add(count, total)
+        assert totals.estimate_total(3, 3) == (5, 0.0)
+        assert totals.estimate_total(3, 3, "total") == (40.0, 0.0)
+        assert totals.estimate_mean(3, 3) == (8.0, 0.0)
+        estimate, error = totals.estimate_total(3, 300)
+        assert estimate == 500
+        assert error > 0
+
+
+class TestReadSample:
+    """Тесты --sample и --approx"""
+
+    @pytest.fixture
+    def sample_csv_file(self):
+        """Возвращает путь к существующему CSV файлу с тестовыми данными"""
+        return str(Path(__file__).parent / "test_data" / "test.csv")
+
+    @pytest.fixture
+    def mock_args(self):
+        """Аргументы командной строки по умолчанию"""
+        return argparse.Namespace(**DEFAULT_OPTIONS)
+
+    def exact(self, path, *aggregates, **query):
+        reader = CSVReader(path).aggregate(*aggregates)
+        if "where" in query:
+            reader = reader.where(query["where"])
+        return [float(value) for value in reader.collect()[0]]
+
+    def test_estimates_with_intervals(self, big_csv_file):
+        """Тест: оценки близки к точным и попадают в интервал"""
+        exact = self.exact(big_csv_file, "price=avg", "price=count",
+                           "price=sum", where="price>1000")
+        query = (CSVReader(big_csv_file).where("price>1000")
+                 .aggregate("price=avg", "price=count", "price=sum")
+                 .options(sample="10%", seed=3))
+        assert query.columns() == ["price=avg", "price=avg ±", "price=count",
+                                   "price=count ±", "price=sum",
+                                   "price=sum ±"]
+        row = [float(value) for value in query.collect()[0]]
+        for value, error, expected in zip(row[::2], row[1::2], exact):
+            assert 0 < error < expected * 0.2
+            assert abs(value - expected) <= error
+        assert query.sample["blocks"] == MIN_BLOCKS
+        assert query.sample["bytes"] < Path(big_csv_file).stat().st_size / 2
+
+    def test_other_aggregates_from_sample(self, big_csv_file):
+        """Тест: min и max считаются по выборке без интервала"""
+        query = CSVReader(big_csv_file).group_by("brand") \
+            .aggregate("price=max", "price=count") \
+            .order_by("price=count:desc").options(approx=True, seed=1)
+        assert query.columns() == ["brand", "price=max", "price=count",
+                                   "price=count ±"]
+        rows = query.collect()
+        assert sorted(row[0] for row in rows) == ["apple", "samsung",
+                                                  "xiaomi"]
+        assert [int(row[2]) for row in rows] == \
+            sorted((int(row[2]) for row in rows), reverse=True)
+        assert all(float(row[1]) <= 2000 for row in rows)
+
+    def test_whole_file_sample_is_exact(self, sample_csv_file):
+        """Тест: маленький файл - один блок, ответ точный"""
+        query = CSVReader(sample_csv_file).aggregate("price=avg", "price=count")
+        avg, count = query.collect()[0]
+        assert query.options(sample="1%").collect() == [[avg, "0.0", count, "0"]]
+
+    def test_rows_without_aggregation(self, big_csv_file):
+        """Тест: без агрегации - строки файла из выбранных блоков"""
+        rows = CSVReader(big_csv_file).where("brand=apple") \
+            .select("name", "brand").options(sample="5%", seed=2).collect()
+        with open(big_csv_file, encoding="utf-8") as file:
+            names = {row[0] for row in csv.reader(file)}
+        assert 0 < len(rows) < 20000 * 0.2
+        assert all(row[1] == "apple" and row[0] in names for row in rows)
+        assert rows == sorted(rows, key=lambda row: int(row[0].split()[1]))
+
+    def test_cli_notice(self, sample_csv_file, mock_args, capsys):
+        """Тест: в командной строке в stderr печатается объем выборки"""
+        mock_args.aggregate = ["price=count"]
+        mock_args.format = "csv"
+        mock_args.sample = "50%"
+        CSVReader(sample_csv_file, mock_args).read()
+        captured = capsys.readouterr()
+        assert captured.out == "price=count,price=count ±\n10,0\n"
+        assert "Выборка: 1 из 1 блоков (100.0% файла), прочитано строк: 10. " \
+            in captured.err
+
+    def test_summary_reports_skipped_rows(self, tmp_path):
+        """Тест: объем выборки сообщает о пропущенных строках"""
+        path = tmp_path / "data.csv"
+        path.write_text("name,price\nx,1\ny\nz,3\n", encoding="utf-8")
+        query = CSVReader(str(path)).aggregate("price=count") \
+            .options(sample="100%")
+        assert query.collect() == [["2", "0"]]
+        assert ", пропущено строк с другим числом полей: 1. " \
+            in query.sample_summary()
+        path.write_text("name,price\nx,1\nz,3\n", encoding="utf-8")
+        query.collect()
+        assert "пропущено" not in query.sample_summary()
+
+    @pytest.mark.parametrize("options", [{"sample": "0"},
+                                         {"sample": "many"}])
+    def test_invalid_sample(self, sample_csv_file, options):
+        """Тест: неверная доля выборки - ошибка запроса"""
+        with pytest.raises(QueryError, match="--sample"):
+            CSVReader(sample_csv_file).options(**options).collect()
+
+    def test_compressed_file(self, sample_csv_file, tmp_path):
+        """Тест: из сжатого файла выборку сделать нельзя"""
+        path = tmp_path / "data.csv.gz"
+        path.write_bytes(gzip.compress(Path(sample_csv_file).read_bytes()))
+        with pytest.raises(QueryError, match="сжатого"):
+            CSVReader(str(path)).options(approx=True).collect()
@@ -0,0 +1,186 @@
+import asyncio
+import http.client
+import json
+import os
+import shutil
+import sys
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from server import QueryServer
+from table_cache import MemoryTables
+
+
+class TestMemoryTables:
+    """Тесты таблиц в памяти"""
+
+    def test_lru_and_version(self):
+        """Тест: лишние таблицы удаляются по LRU, другая версия - промах"""
+        tables = MemoryTables(max_tables=2)
+        tables.put("a.csv", {"size": 1}, "table a")
+        tables.put("b.csv", {"size": 1}, "table b")
+        assert tables.get("a.csv", {"size": 1}) == "table a"
+        tables.put("c.csv", {"size": 1}, "table c")
+        assert tables.get("b.csv", {"size": 1}) is None
+        assert tables.get("a.csv", {"size": 1}) == "table a"
+        assert tables.get("a.csv", {"size": 2}) is None
+
+
+class TestQueryServer:
+    """Тесты сервера запросов на localhost"""
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        """Папка сервера с копией тестового файла"""
+        shutil.copy(Path(__file__).parent / "test_data" / "test.csv",
+                    tmp_path / "test.csv")
+        return tmp_path
+
+    @pytest.fixture
+    def server(self, data_dir):
+        """Сервер в отдельном потоке на свободном порту"""
+        query_server = QueryServer(str(data_dir), max_tables=1)
+        loop = asyncio.new_event_loop()
+        started = loop.run_until_complete(query_server.start(port=0))
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        port = started.sockets[0].getsockname()[1]
+        query_server.url = f"http://127.0.0.1:{port}"
+        yield query_server
+        started.close()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(started.wait_closed())
+        loop.close()
+
+    def get(self, server, path, **params):
+        """GET запрос: код ответа и тело"""
+        url = f"{server.url}{path}?{urlencode(params, doseq=True)}"
+        try:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                return response.status, response.read().decode("utf-8")
+        except urllib.error.HTTPError as error:
+            return error.code, error.read().decode("utf-8")
+
+    def test_query(self, server):
+        """Тест запроса с фильтром, группировкой и сортировкой"""
+        status, body = self.get(
+            server, "/query", file="test.csv", where=["price>500"],
+            group_by="brand", aggregate="price=max", order_by="brand")
+        assert status == 200
+        assert json.loads(body) == {
+            "columns": ["brand", "price=max"],
+            "rows": [["apple", "999.0"], ["samsung", "1199.0"]]}
+
+    def test_csv_format(self, server):
+        """Тест ответа в формате csv"""
+        status, body = self.get(server, "/query", file="test.csv",
+                                select="name", limit=2, format="csv")
+        assert status == 200
+        assert body == "name\niphone 15 pro\ngalaxy s23 ultra\n"
+
+    @pytest.mark.parametrize("params, status", [
+        ({"file": "test.csv", "where": "weight>1"}, 400),
+        ({"file": "test.csv", "limit": "many"}, 400),
+        ({"file": "missing.csv"}, 400),
+        ({}, 400),
+        ({"file": "../test.csv"}, 403),
+    ])
+    def test_errors(self, server, params, status):
+        """Тест: ошибки запроса - код ответа и сообщение"""
+        code, body = self.get(server, "/query", **params)
+        assert code == status
+        assert json.loads(body)["error"]
+
+    @pytest.mark.parametrize("file, status", [
+        ("*/outside.csv", 403), ("links/*", 403), ("links", 403),
+        ("links/outside.csv", 403), ("*/hostname", 400)])
+    def test_symlink_outside_root(self, server, data_dir, tmp_path_factory,
+                                  file, status):
+        """
+        Тест: шаблон или папка через ссылку вне папки сервера - 403.
+        Шаблон не находит файлы без расширения csv - 400.
+        """
+        outside = tmp_path_factory.mktemp("outside")
+        (outside / "hostname").write_text("secret\n", encoding="utf-8")
+        (outside / "outside.csv").write_text("secret\n1\n", encoding="utf-8")
+        (data_dir / "etclink").symlink_to(outside, target_is_directory=True)
+        (data_dir / "links").mkdir()
+        (data_dir / "links" / "outside.csv").symlink_to(outside / "outside.csv")
+        code, body = self.get(server, "/query", file=file)
+        assert code == status
+        assert "secret" not in body
+
+    def test_unknown_page(self, server):
+        """Тест: неизвестная страница - 404"""
+        assert self.get(server, "/drop")[0] == 404
+
+    def test_table_kept_and_reloaded(self, server, data_dir):
+        """Тест: таблица разбирается один раз и заново после изменения"""
+        body = self.get(server, "/query", file="test.csv",
+                        aggregate="price=count")[1]
+        assert json.loads(body)["rows"] == [["10"]]
+        tables = json.loads(self.get(server, "/tables")[1])["tables"]
+        assert [table["rows"] for table in tables] == [10]
+
+        with open(data_dir / "test.csv", "a", encoding="utf-8") as file:
+            file.write("pixel 9,google,899,4.7\n")
+        body = self.get(server, "/query", file="test.csv",
+                        aggregate="price=count")[1]
+        assert json.loads(body)["rows"] == [["11"]]
+
+    def test_lru_eviction(self, server, data_dir):
+        """Тест: с max_tables=1 в памяти остается последняя таблица"""
+        shutil.copy(data_dir / "test.csv", data_dir / "other.csv")
+        self.get(server, "/query", file="test.csv", limit=1)
+        self.get(server, "/query", file="other.csv", limit=1)
+        tables = json.loads(self.get(server, "/tables")[1])["tables"]
+        assert [os.path.basename(table["path"]) for table in tables] == \
+            ["other.csv"]
+
+    def test_files_read_without_processes(self, server, data_dir,
+                                          monkeypatch):
+        """Тест: несколько файлов читаются без процессов, в потоке запроса"""
+        import concurrent.futures
+
+        def no_processes(*args, **kwargs):
+            raise AssertionError("ProcessPoolExecutor в сервере")
+        monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor",
+                            no_processes)
+        monkeypatch.setattr(os, "cpu_count", lambda: 4)
+        shutil.copy(data_dir / "test.csv", data_dir / "other.csv")
+        body = self.get(server, "/query", file="*.csv",
+                        aggregate="price=count")[1]
+        assert json.loads(body)["rows"] == [["20"]]
+
+    def test_concurrent_requests(self, server):
+        """Тест: параллельные запросы получают свои ответы"""
+        brands = ["apple", "samsung", "xiaomi"] * 10
+
+        def count(brand):
+            body = self.get(server, "/query", file="test.csv",
+                            where=f"brand={brand}",
+                            aggregate="price=count")[1]
+            return json.loads(body)["rows"][0][0]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(count, brands))
+        assert results == ["4", "3", "3"] * 10
+
+    def test_keep_alive(self, server):
+        """Тест: несколько запросов в одном соединении"""
+        port = int(server.url.rsplit(":", 1)[1])
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        for limit in (1, 2):
+            connection.request("GET", f"/query?file=test.csv&limit={limit}")
+            response = connection.getresponse()
+            assert len(json.loads(response.read())["rows"]) == limit
+        connection.close()
@@ -0,0 +1,124 @@
+import json
+import pstats
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from csv_reader import CSVReader
+from stats import Stats
+
+
+class TestStats:
+    """Тесты счетчиков этапов"""
+
+    def test_nested_time_is_exclusive(self):
+        """Тест: время вложенного этапа не входит во время внешнего"""
+        stats = Stats()
+        stats.start()
+
+        def slow_rows():
+            for row in range(3):
+                time.sleep(0.02)
+                yield [row]
+        with stats.stage("output"):
+            rows = list(stats.count("parse", slow_rows()))
+        stats.stop()
+        report = {stage["stage"]: stage for stage in stats.report()["stages"]}
+        assert len(rows) == 3
+        assert report["parse"]["rows_out"] == 3
+        assert report["parse"]["wall_seconds"] >= 0.06
+        assert report["output"]["wall_seconds"] < 0.02
+        assert report["output"]["rows_in"] == 3
+
+    def test_pipeline_order(self):
+        """Тест: этапы в отчете идут от чтения к выводу"""
+        stats = Stats()
+        stats.start()
+        with stats.stage("output"):
+            list(stats.count("filter", stats.count("parse", [[1], [2]])))
+        stats.stop()
+        names = [stage["stage"] for stage in stats.report()["stages"]]
+        assert names == ["parse", "filter", "output"]
+
+    def test_trace_memory(self):
+        """Тест: пик памяти tracemalloc только по запросу"""
+        for trace_memory in (False, True):
+            stats = Stats(trace_memory)
+            stats.start()
+            data = [bytes(1000) for _ in range(1000)]
+            stats.stop()
+            peak = stats.report()["total"]["peak_memory_bytes"]
+            if trace_memory:
+                assert peak >= 1_000_000
+            else:
+                assert peak is None
+            del data
+
+    def test_peak_rss(self, monkeypatch):
+        """Тест: пик памяти процесса в байтах, без resource - None"""
+        import stats
+        if stats.resource is None:
+            pytest.skip("нет модуля resource")
+        peak = stats.peak_rss_bytes()
+        assert peak > 1 << 20
+        monkeypatch.setattr(stats, "resource", None)
+        assert stats.peak_rss_bytes() is None
+
+
+class TestReadStats:
+    """Тесты --stats и --profile"""
+
+    @pytest.fixture
+    def sample_csv_file(self):
+        """Возвращает путь к существующему CSV файлу с тестовыми данными"""
+        return str(Path(__file__).parent / "test_data" / "test.csv")
+
+    # С --mmap строки без "apple" отбрасываются до разбора
+    @pytest.mark.parametrize("options, expected, rows", [
+        ({}, ["read", "parse", "filter", "aggregate", "output"], 10),
+        ({"mmap": True}, ["read", "parse", "filter", "aggregate", "output"],
+         4),
+        ({"engine": "columnar", "cache": False},
+         ["read", "load", "filter", "aggregate", "output"], 10),
+    ])
+    def test_stats_json(self, sample_csv_file, capsys, options, expected,
+                        rows):
+        """Тест: этапы и строки в JSON отчете, результат в stdout"""
+        query = (CSVReader(sample_csv_file).where("brand=apple")
+                 .aggregate("price=max")
+                 .options(stats="json", **options))
+        query.read()
+        captured = capsys.readouterr()
+        assert "999" in captured.out
+        report = json.loads(captured.err)
+        stages = {stage["stage"]: stage for stage in report["stages"]}
+        assert list(stages) == expected
+        assert stages["filter"]["rows_out"] == 4
+        assert stages["aggregate"]["rows_in"] == 4
+        assert stages["aggregate"]["rows_out"] == 1
+        assert report["total"]["rows"] == rows
+        assert report["total"]["bytes_read"] == \
+            Path(sample_csv_file).stat().st_size
+
+    def test_stats_table(self, sample_csv_file, capsys):
+        """Тест: таблица этапов с выбором столбцов и лимитом"""
+        CSVReader(sample_csv_file).select("name").limit(2) \
+            .options(stats="table", format="csv").read()
+        captured = capsys.readouterr()
+        assert captured.out.count("\n") == 3
+        assert "| order" in captured.err
+        assert "| select" in captured.err
+        assert "Прочитано байт" in captured.err
+
+    def test_profile(self, sample_csv_file, tmp_path, capsys):
+        """Тест: профиль cProfile сохраняется и читается pstats"""
+        path = tmp_path / "read.prof"
+        CSVReader(sample_csv_file).options(profile=str(path)).read()
+        functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+        assert "_read_text" in functions
+        assert capsys.readouterr().err == ""
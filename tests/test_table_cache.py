@@ -0,0 +1,99 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем путь к папке src
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from columnar import ColumnTable
+from table_cache import TableCache, fingerprint
+
+
+class TestTableCache:
+    """Тесты кеша колоночных таблиц"""
+
+    @pytest.fixture
+    def csv_file(self, tmp_path):
+        """Небольшой csv файл со столбцами всех типов"""
+        path = tmp_path / "data.csv"
+        path.write_text("name,price,rating,ok\n"
+                        "iphone,999,4.9,true\n"
+                        "galaxy,1199,4.8,false\n"
+                        "redmi,199,4.6,true\n", encoding="utf-8")
+        return str(path)
+
+    @pytest.fixture
+    def table(self, csv_file):
+        """Таблица из csv_file"""
+        lines = Path(csv_file).read_text(encoding="utf-8").splitlines()
+        rows = [line.split(",") for line in lines]
+        return ColumnTable.from_rows(rows[0], rows[1:])
+
+    def test_round_trip(self, tmp_path, csv_file, table):
+        """Тест: из кеша читается та же таблица"""
+        cache = TableCache(str(tmp_path / "cache"))
+        source = fingerprint(csv_file)
+        assert cache.get(csv_file, source) is None
+
+        cache.put(csv_file, source, table)
+        cached = cache.get(csv_file, source)
+        assert cached.schema == table.schema
+        assert cached.text_rows() == table.text_rows()
+        # Словарь строк восстановлен вместе с поиском по нему
+        column = cached.columns[0]
+        assert column.extend(["redmi", "pixel"]) is column
+        assert column.dictionary == ["iphone", "galaxy", "redmi", "pixel"]
+
+    def test_changed_file_is_miss(self, tmp_path, csv_file, table):
+        """Тест: перезапись с тем же размером и временем - промах"""
+        cache = TableCache(str(tmp_path / "cache"))
+        cache.put(csv_file, fingerprint(csv_file), table)
+        stat = os.stat(csv_file)
+        text = Path(csv_file).read_text(encoding="utf-8")
+        Path(csv_file).write_text(text.replace("999", "899"),
+                                  encoding="utf-8")
+        os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert cache.get(csv_file, fingerprint(csv_file)) is None
+
+    def test_corrupt_entry_is_miss(self, tmp_path, csv_file, table):
+        """Тест: поврежденный файл кеша не приводит к ошибке"""
+        cache = TableCache(str(tmp_path / "cache"))
+        source = fingerprint(csv_file)
+        cache.put(csv_file, source, table)
+        entry = cache.entry(csv_file)
+        Path(entry).write_bytes(Path(entry).read_bytes()[:-5])
+        assert cache.get(csv_file, source) is None
+        Path(entry).write_bytes(b"garbage")
+        assert cache.get(csv_file, source) is None
+
+    def test_lru_eviction(self, tmp_path, table):
+        """Тест: при превышении размера удаляются давно не читанные"""
+        directory = tmp_path / "cache"
+        files = []
+        for number in range(3):
+            path = tmp_path / f"{number}.csv"
+            path.write_text("a\n1\n", encoding="utf-8")
+            files.append(str(path))
+        cache = TableCache(str(directory), max_bytes=10 ** 9)
+        for number, path in enumerate(files):
+            cache.put(path, fingerprint(path), table)
+            os.utime(cache.entry(path), ns=(number, number))
+        # Первый файл прочитан последним
+        cache.get(files[0], fingerprint(files[0]))
+        entry_size = os.path.getsize(cache.entry(files[0]))
+
+        cache.max_bytes = 2 * entry_size
+        cache.evict()
+        assert os.path.exists(cache.entry(files[0]))
+        assert not os.path.exists(cache.entry(files[1]))
+        assert os.path.exists(cache.entry(files[2]))
+
+    def test_unwritable_directory(self, tmp_path, csv_file, table):
+        """Тест: ошибка записи кеша не мешает запросу"""
+        blocker = tmp_path / "file"
+        blocker.write_text("", encoding="utf-8")
+        cache = TableCache(str(blocker / "cache"))
+        cache.put(csv_file, fingerprint(csv_file), table)
+        assert cache.get(csv_file, fingerprint(csv_file)) is None